@@ -2,6 +2,8 @@
 ASGI config for DjangoProject project.
 
 It exposes the ASGI callable as a module-level variable named ``application``.
+Serve the app with it (e.g. ``uvicorn DjangoProject.asgi:application``) to
+enable the community chat message streams, which need an async server.
 
 For more information on this file, see
 https://docs.djangoproject.com/en/5.2/howto/deployment/asgi/
@@ -51,6 +51,7 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
+    'ecotrack.middleware.MetricsMiddleware',  # First, so its timings cover the whole stack
     'django.middleware.security.SecurityMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
@@ -79,6 +80,7 @@ TEMPLATES = [
 ]
 
 WSGI_APPLICATION = 'DjangoProject.wsgi.application'
+ASGI_APPLICATION = 'DjangoProject.asgi.application'
 
 
 # Database
@@ -92,6 +94,30 @@ DATABASES = {
 }
 
 
+# Cache
+# https://docs.djangoproject.com/en/5.2/topics/cache/
+# Local memory by default (per process, LRU culling). Point CACHE_BACKEND/CACHE_LOCATION at
+# the file backend, Memcached or Redis to share entries between worker processes. Not the
+# database backend: view query budgets assume cache reads cost no queries (check ecotrack.E001).
+
+CACHES = {
+    'default': {
+        'BACKEND': os.getenv('CACHE_BACKEND', 'django.core.cache.backends.locmem.LocMemCache'),
+        'LOCATION': os.getenv('CACHE_LOCATION', 'ecotrack'),
+        'TIMEOUT': 300,
+        'OPTIONS': {
+            'MAX_ENTRIES': int(os.getenv('CACHE_MAX_ENTRIES', '5000')),
+        },
+    }
+}
+
+# Seconds a Gemini habit suggestion response is reused for identical habit sets
+SUGGESTIONS_CACHE_TTL = int(os.getenv('SUGGESTIONS_CACHE_TTL', str(6 * 60 * 60)))
+
+# Seconds a serialized get_user_data payload is kept (entries are also replaced on every write)
+DASHBOARD_CACHE_TTL = int(os.getenv('DASHBOARD_CACHE_TTL', str(24 * 60 * 60)))
+
+
 # Password validation
 # https://docs.djangoproject.com/en/5.2/ref/settings/#auth-password-validators
 
@@ -155,4 +181,52 @@ VAPID_CLAIMS_EMAIL = "mailto:admin@ecotrack.com"
 
 # Cron dispatch security token (used by external schedulers like cron-job.org)
 # Set environment variable CRON_SECRET to a strong random value in production.
-CRON_SECRET = os.getenv('CRON_SECRET', '')
\ No newline at end of file
+CRON_SECRET = os.getenv('CRON_SECRET', '')
+
+# Request/DB/FCM/Gemini timings served at /api/metrics (Prometheus text format) to callers
+# presenting METRICS_SECRET (defaults to CRON_SECRET) as ?token= or a Bearer header
+METRICS_ENABLED = os.getenv('METRICS_ENABLED', 'true').lower() in ('1', 'true', 'yes')
+METRICS_SECRET = os.getenv('METRICS_SECRET', '') or CRON_SECRET
+
+# What to do when a view decorated with @query_budget runs more queries than it declares:
+# 'warn' logs it, 'raise' fails the request (set it when running tests and load tests), 'off' skips counting
+QUERY_BUDGET_MODE = os.getenv('QUERY_BUDGET_MODE', 'warn')
+
+# Community chat streams (server-sent events, served by the ASGI app). Streams send a keep-alive
+# comment every CHAT_STREAM_HEARTBEAT_SECONDS and close after CHAT_STREAM_MAX_SECONDS (clients reconnect).
+# Set CHAT_STREAM_CATCHUP when running several ASGI processes: new messages are published in-process only,
+# so idle streams then also check the database for missed messages once per heartbeat.
+CHAT_STREAM_HEARTBEAT_SECONDS = int(os.getenv('CHAT_STREAM_HEARTBEAT_SECONDS', '15'))
+CHAT_STREAM_MAX_SECONDS = int(os.getenv('CHAT_STREAM_MAX_SECONDS', '300'))
+CHAT_STREAM_CATCHUP = os.getenv('CHAT_STREAM_CATCHUP', 'false').lower() in ('1', 'true', 'yes')
+
+# Daily reminders missed by more than this many minutes (e.g. scheduler downtime)
+# are skipped until the next day instead of being delivered late.
+REMINDER_CATCHUP_MINUTES = int(os.getenv('REMINDER_CATCHUP_MINUTES', '10'))
+
+# Maximum number of FCM multicast chunks (500 tokens each) sent at once
+FCM_MAX_CONCURRENCY = int(os.getenv('FCM_MAX_CONCURRENCY', '4'))
+
+# Seconds a dispatch worker may hold claimed devices before another worker takes them over
+DISPATCH_LEASE_SECONDS = int(os.getenv('DISPATCH_LEASE_SECONDS', '300'))
+
+# Gemini gateway (ecotrack/llm_service.py): per-call deadline, calls in flight per process,
+# and the circuit breaker that serves fallbacks while Gemini keeps failing
+LLM_TIMEOUT_SECONDS = float(os.getenv('LLM_TIMEOUT_SECONDS', '10'))
+LLM_MAX_CONCURRENCY = int(os.getenv('LLM_MAX_CONCURRENCY', '4'))
+LLM_QUEUE_TIMEOUT_SECONDS = float(os.getenv('LLM_QUEUE_TIMEOUT_SECONDS', '2'))
+LLM_BREAKER_THRESHOLD = int(os.getenv('LLM_BREAKER_THRESHOLD', '5'))
+LLM_BREAKER_COOLDOWN_SECONDS = float(os.getenv('LLM_BREAKER_COOLDOWN_SECONDS', '30'))
+
+# Seconds between each process's checks for a newer EmissionFactorSet version
+EMISSION_FACTORS_RELOAD_SECONDS = float(os.getenv('EMISSION_FACTORS_RELOAD_SECONDS', '60'))
+
+# 'fake' swaps Firebase / Gemini for the in-process stand-ins in ecotrack/fake_transports.py
+# (load tests and local development); the FAKE_* values shape their behaviour.
+FCM_TRANSPORT = os.getenv('FCM_TRANSPORT', 'firebase')
+LLM_TRANSPORT = os.getenv('LLM_TRANSPORT', 'gemini')
+FAKE_FCM_LATENCY_MS = float(os.getenv('FAKE_FCM_LATENCY_MS', '50'))
+FAKE_FCM_QUOTA_PER_SECOND = int(os.getenv('FAKE_FCM_QUOTA_PER_SECOND', '0'))  # 0: unlimited
+FAKE_FCM_UNREGISTERED_PREFIX = os.getenv('FAKE_FCM_UNREGISTERED_PREFIX', 'unregistered-')
+FAKE_GEMINI_LATENCY_MS = float(os.getenv('FAKE_GEMINI_LATENCY_MS', '800'))
+FAKE_GEMINI_ERROR_RATE = float(os.getenv('FAKE_GEMINI_ERROR_RATE', '0'))
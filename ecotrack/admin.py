@@ -1,5 +1,5 @@
 from django.contrib import admin
-from .models import User, Community, CommunityMembership, CommunityMessage, CommunityTask, TaskParticipation, AndroidDevice
+from .models import User, Habit, HabitCompletion, FootprintMeasurement, EmissionFactorSet, Community, CommunityMembership, CommunityMessage, CommunityTask, TaskParticipation, AndroidDevice, DispatchJob, ReminderCopy, DailyQuestionSet
 
 
 @admin.register(Community)
@@ -68,5 +68,65 @@ class AndroidDeviceAdmin(admin.ModelAdmin):
     )
 
 
+@admin.register(DispatchJob)
+class DispatchJobAdmin(admin.ModelAdmin):
+    list_display = ['scheduled_for', 'status', 'total_candidates', 'sent', 'failed', 'attempts', 'started_at', 'finished_at']
+    list_filter = ['status']
+    readonly_fields = ['created_at', 'started_at', 'finished_at']
+
+
+@admin.register(ReminderCopy)
+class ReminderCopyAdmin(admin.ModelAdmin):
+    list_display = ['text', 'scheduled_for', 'last_used_on', 'created_at']
+    search_fields = ['text']
+    readonly_fields = ['text_hash', 'created_at']
+
+
+@admin.register(Habit)
+class HabitAdmin(admin.ModelAdmin):
+    list_display = ['user', 'text', 'created_at']
+    search_fields = ['user__username', 'text']
+
+
+@admin.register(HabitCompletion)
+class HabitCompletionAdmin(admin.ModelAdmin):
+    list_display = ['habit', 'date', 'created_at']
+    list_filter = ['date']
+    search_fields = ['habit__user__username', 'habit__text']
+
+
+@admin.register(FootprintMeasurement)
+class FootprintMeasurementAdmin(admin.ModelAdmin):
+    list_display = ['user', 'value', 'recorded_at']
+    list_filter = ['recorded_at']
+    search_fields = ['user__username']
+
+
+@admin.register(EmissionFactorSet)
+class EmissionFactorSetAdmin(admin.ModelAdmin):
+    list_display = ['version', 'note', 'created_at']
+    readonly_fields = ['created_at']
+    
+    def get_readonly_fields(self, request, obj=None):
+        if obj:  # versions are immutable; add a new one instead
+            return ['version', 'config', 'initial_score_config', 'created_at']
+        return self.readonly_fields
+    
+    def get_changeform_initial_data(self, request):
+        # Start a new version from the latest one
+        latest = EmissionFactorSet.objects.first()
+        if latest is None:
+            return super().get_changeform_initial_data(request)
+        return {'config': latest.config, 'initial_score_config': latest.initial_score_config}
+
+
+@admin.register(DailyQuestionSet)
+class DailyQuestionSetAdmin(admin.ModelAdmin):
+    list_display = ['user', 'date', 'created_at']
+    list_filter = ['date']
+    search_fields = ['user__username']
+    readonly_fields = ['habits_fingerprint', 'created_at']
+
+
 # Register your models here.
 admin.site.register(User)
\ No newline at end of file
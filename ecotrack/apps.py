@@ -1,6 +1,16 @@
 from django.apps import AppConfig
+from django.db.backends.signals import connection_created
+from django.db.models.signals import post_migrate
 
 
 class EcotrackConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'ecotrack'
+
+    def ready(self):
+        from . import checks  # noqa: F401 (registers the system checks)
+        from .middleware import install_async_query_timer
+        from .search import ensure_search_indexes_after_migrate
+
+        post_migrate.connect(ensure_search_indexes_after_migrate, sender=self)
+        connection_created.connect(install_async_query_timer)
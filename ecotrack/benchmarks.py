@@ -0,0 +1,310 @@
+"""
+Micro/macro benchmarks for the scoring and footprint engines.
+
+Each case runs one engine over N synthetic records (1k, 100k or 1M) and records
+throughput (ops/sec) plus peak and retained allocations, measured on a separate
+tracemalloc pass over at most ALLOCATION_SAMPLE records so tracing does not
+distort the timings. Records are drawn from a seeded pool of distinct surveys,
+so runs are reproducible and a 1M-record run does not hold 1M dicts in memory.
+
+All cases score with DEFAULT_FACTORS, so results do not depend on the database.
+Run them with the benchmark_scoring management command; --baseline compares a
+run against a saved one and fails on throughput regressions.
+"""
+
+import gc
+import itertools
+import json
+import platform
+import random
+import time
+import tracemalloc
+from datetime import date, datetime, timedelta
+
+from django.utils import timezone
+
+from .emission_factors import DEFAULT_FACTORS
+from .footprint_batch import calculate_carbon_footprint_batch
+from .utils import (
+    calculate_initial_sustainability_score,
+    calculate_personal_carbon_footprint,
+    calculate_sustainability_score,
+    check_achievements,
+)
+
+SIZES = {'1k': 1_000, '100k': 100_000, '1m': 1_000_000}
+
+# Distinct records generated per run; larger runs cycle through them
+POOL_SIZE = 10_000
+
+# Records traced per case for the allocation figures
+ALLOCATION_SAMPLE = 1_000
+
+# Records per call for the batch calculator, as rescore_footprints' default chunk
+BATCH_CHUNK_SIZE = 5_000
+
+DEFAULT_THRESHOLD = 0.2
+
+# Answer options the survey form offers, per categorical question
+SURVEY_CHOICES = {
+    "what_type_of_home_do_you_live_in": ["Apartment", "Semi-detached House", "Detached House", "Other"],
+    "what_is_the_size_of_your_home": ["Small", "Medium", "Large"],
+    "is_your_electricity_from_renewable_sources": ["Yes", "Partially", "No"],
+    "what_is_your_primary_heating_source": ["Natural Gas", "Electricity", "Oil", "Propane", "Wood", "Other"],
+    "do_you_use_energy_saving_appliances_or_lightbulbs": ["Yes", "No"],
+    "how_often_do_you_use_public_transport": ["Daily", "Weekly", "Rarely", "Never"],
+    "what_best_describes_your_diet": ["Vegan", "Vegetarian", "Pescatarian", "Omnivore", "High Meat"],
+    "how_much_of_your_food_is_organic_local": ["All", "Most", "Some", "None"],
+    "how_much_food_do_you_waste": ["Very little", "Below average", "Average", "Above average"],
+    "how_much_of_your_food_is_packaged_processed": ["Very little", "Below average", "Average", "Above average"],
+    "do_you_compost_food_waste": ["All", "Some", "None"],
+    "how_often_do_you_buy_new_clothes_electronics_or_appliances": ["Rarely", "Sometimes", "Often"],
+    "do_you_buy_second_hand_or_repair_items": ["Yes", "Sometimes", "Rarely", "No"],
+    "do_you_use_water_saving_devices": ["Yes", "No"],
+    "do_you_offset_your_carbon_emissions": ["Yes", "No"],
+}
+VEHICLE_TYPES = ["Gasoline", "Diesel", "Hybrid", "Electric"]
+FLIGHT_TYPES = ["Short-haul (<3h)", "Medium-haul (3-6h)", "Long-haul (>6h)"]
+RECYCLING_MATERIALS = ["glass", "metal", "plastic", "paper"]
+
+DAILY_CHOICES = {
+    "transport_mode": ["Bicycle", "Walk", "Public Transport", "Personal Vehicle", "Worked from Home"],
+    "main_meal_type": ["Vegan", "Vegetarian", "Pescatarian", "Omnivore", "High Meat"],
+    "purchased_new_item": ["Yes", "No"],
+    "extra_recycling_composting": ["Yes", "No"],
+    "used_reusable_containers": ["Yes", "No"],
+}
+
+
+def generate_survey(rng):
+    """One synthetic onboarding survey, shaped like User.user_data."""
+    survey = {key: rng.choice(options) for key, options in SURVEY_CHOICES.items()}
+    survey["how_many_people_are_in_your_household"] = rng.randint(1, 6)
+    survey["how_much_electricity_does_your_household_use_per_month"] = rng.randint(50, 1500)
+    survey["what_percentage_of_your_monthly_electricity_consumption_do_you_think_is_used_for_heating"] = rng.randint(0, 60)
+    survey["how_much_distance_do_you_commute_in_public_transport_per_week_on_average"] = rng.randint(0, 300)
+    survey["how_much_water_does_your_household_use_per_month_in_litres"] = rng.randint(500, 20000)
+
+    vehicles = rng.randint(0, 3)
+    survey["how_many_vehicles_are_in_your_household"] = vehicles
+    for i in range(1, vehicles + 1):
+        survey[f"vehicle_{i}_type"] = rng.choice(VEHICLE_TYPES)
+        survey[f"vehicle_{i}_mileage"] = rng.randint(1000, 30000)
+
+    flights = rng.randint(0, 6)
+    survey["how_many_flights_have_you_taken_in_the_past_year"] = flights
+    for i in range(1, flights + 1):
+        survey[f"flight_{i}_type"] = rng.choice(FLIGHT_TYPES)
+
+    for material in RECYCLING_MATERIALS:
+        if rng.random() < 0.5:
+            survey[f"do_you_recycle_the_following_check_all_that_apply_{material}"] = "on"
+    return survey
+
+
+def generate_daily_survey(rng):
+    """One synthetic daily check-in, as calculate_sustainability_score takes it."""
+    survey = {key: rng.choice(options) for key, options in DAILY_CHOICES.items()}
+    survey["transport_distance_km"] = rng.randint(0, 50)
+    return survey
+
+
+class AchievementStats:
+    """The User fields check_achievements reads, without a model instance per record."""
+
+    __slots__ = ('date_joined', 'last_checkin', 'streak', 'habits_today', 'sustainability_score')
+
+    def __init__(self, date_joined, last_checkin, streak, habits_today, sustainability_score):
+        self.date_joined = date_joined
+        self.last_checkin = last_checkin
+        self.streak = streak
+        self.habits_today = habits_today
+        self.sustainability_score = sustainability_score
+
+
+def generate_user_stats(rng, today=date(2026, 1, 1)):
+    """One synthetic set of stored user stats for check_achievements (fixed `today`, for reproducible pools)."""
+    joined = today - timedelta(days=rng.randint(0, 400))
+    last_checkin = None if rng.random() < 0.1 else joined + timedelta(days=rng.randint(0, (today - joined).days))
+    return AchievementStats(
+        date_joined=timezone.make_aware(datetime.combine(joined, datetime.min.time())),
+        last_checkin=last_checkin,
+        streak=rng.choice([0, 1, 2, 3, 5, 7, 12, 30, 45, 60, 120]),
+        habits_today=rng.randint(0, 8),
+        sustainability_score=rng.randint(0, 100),
+    )
+
+
+def generate_pool(generate, size=POOL_SIZE, seed=0):
+    """`size` records from `generate(rng)` with a fixed seed."""
+    rng = random.Random(seed)
+    return [generate(rng) for _ in range(size)]
+
+
+def _records(pool, count):
+    return itertools.islice(itertools.cycle(pool), count)
+
+
+def _chunks(pool, count, chunk_size):
+    records = _records(pool, count)
+    while True:
+        chunk = list(itertools.islice(records, chunk_size))
+        if not chunk:
+            return
+        yield chunk
+
+
+class Case:
+    """
+    One benchmarked engine. `run(pools, count)` processes `count` records and
+    returns how many operations it performed.
+    """
+
+    def __init__(self, name, description, run):
+        self.name = name
+        self.description = description
+        self.run = run
+
+
+def _run_footprint(pools, count):
+    for survey in _records(pools['surveys'], count):
+        calculate_personal_carbon_footprint(survey, DEFAULT_FACTORS)
+    return count
+
+
+def _run_footprint_batch(pools, count):
+    for chunk in _chunks(pools['surveys'], count, BATCH_CHUNK_SIZE):
+        calculate_carbon_footprint_batch(chunk, DEFAULT_FACTORS).monthly_co2e_kg()
+    return count
+
+
+def _run_sustainability_score(pools, count):
+    for survey, daily in _records(pools['surveys_with_daily'], count):
+        calculate_sustainability_score(survey, daily)
+    return count
+
+
+def _run_initial_score(pools, count):
+    for survey in _records(pools['surveys'], count):
+        calculate_initial_sustainability_score(survey, DEFAULT_FACTORS)
+    return count
+
+
+def _run_achievements(pools, count):
+    for stats in _records(pools['user_stats'], count):
+        check_achievements(stats)
+    return count
+
+
+CASES = [
+    Case('footprint', 'calculate_personal_carbon_footprint, one survey per call', _run_footprint),
+    Case('footprint_batch', f'calculate_carbon_footprint_batch, {BATCH_CHUNK_SIZE} surveys per call',
+         _run_footprint_batch),
+    Case('sustainability_score', 'calculate_sustainability_score, one check-in per call', _run_sustainability_score),
+    Case('initial_score', 'calculate_initial_sustainability_score, one survey per call', _run_initial_score),
+    Case('achievements', 'check_achievements, one user per call', _run_achievements),
+]
+CASES_BY_NAME = {case.name: case for case in CASES}
+
+
+def build_pools(seed=0, size=POOL_SIZE):
+    """The synthetic record pools every case draws from."""
+    surveys = generate_pool(generate_survey, size, seed)
+    daily = generate_pool(generate_daily_survey, size, seed + 1)
+    return {
+        'surveys': surveys,
+        'surveys_with_daily': list(zip(surveys, daily)),
+        'user_stats': generate_pool(generate_user_stats, size, seed + 2),
+    }
+
+
+def _measure_allocations(case, pools, count):
+    gc.collect()
+    tracemalloc.start()
+    try:
+        before, _ = tracemalloc.get_traced_memory()
+        ops = case.run(pools, count)
+        after, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+
+    return {
+        'peak_kib': round((peak - before) / 1024, 1),  # Largest working set while the case ran
+        'retained_bytes_per_op': round((after - before) / ops, 1),  # Memory still held afterwards
+    }
+
+
+def run_case(case, pools, count, repeat=3):
+    """Best-of-`repeat` throughput of one case over `count` records, plus its allocations."""
+    best = None
+    for _ in range(repeat):
+        gc.collect()
+        started = time.perf_counter()
+        ops = case.run(pools, count)
+        elapsed = time.perf_counter() - started
+        if best is None or elapsed < best[1]:
+            best = (ops, elapsed)
+
+    ops, elapsed = best
+    result = {
+        'records': count,
+        'seconds': round(elapsed, 4),
+        'ops_per_sec': round(ops / elapsed, 1) if elapsed else float('inf'),
+    }
+    result.update(_measure_allocations(case, pools, min(count, ALLOCATION_SAMPLE)))
+    return result
+
+
+def run_benchmarks(case_names=None, sizes=('1k',), seed=0, repeat=3, on_result=None):
+    """
+    Run the named cases (default: all) at each size label in SIZES.
+
+    Returns:
+        dict: 'meta' (seed, python, machine) and 'results' as {case: {size: metrics}}
+    """
+    pools = build_pools(seed)
+    results = {}
+    for name in case_names or [case.name for case in CASES]:
+        case = CASES_BY_NAME[name]
+        for size in sizes:
+            # One repeat at the largest sizes keeps a 1M run to minutes
+            result = run_case(case, pools, SIZES[size], repeat=repeat if SIZES[size] <= 100_000 else 1)
+            results.setdefault(name, {})[size] = result
+            if on_result:
+                on_result(name, size, result)
+    return {
+        'meta': {
+            'seed': seed,
+            'python': platform.python_version(),
+            'machine': platform.machine(),
+            'created_at': timezone.now().isoformat(),
+        },
+        'results': results,
+    }
+
+
+def find_regressions(results, baseline, threshold=DEFAULT_THRESHOLD):
+    """
+    (case, size, ops_per_sec, baseline_ops_per_sec) for every result whose throughput
+    dropped by more than `threshold` (a fraction) against the baseline run.
+    Cases or sizes missing from the baseline are not compared.
+    """
+    regressions = []
+    for name, by_size in results['results'].items():
+        for size, result in by_size.items():
+            previous = baseline.get('results', {}).get(name, {}).get(size)
+            if not previous:
+                continue
+            if result['ops_per_sec'] < previous['ops_per_sec'] * (1 - threshold):
+                regressions.append((name, size, result['ops_per_sec'], previous['ops_per_sec']))
+    return regressions
+
+
+def load_results(path):
+    with open(path) as f:
+        return json.load(f)
+
+
+def save_results(results, path):
+    with open(path, 'w') as f:
+        json.dump(results, f, indent=2, sort_keys=True)
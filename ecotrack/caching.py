@@ -0,0 +1,88 @@
+"""
+Cache helpers for EcoTrack's expensive, reusable responses.
+
+Entries live in Django's cache framework (settings.CACHES), so the backend can be
+local memory, file, Memcached or Redis without changing callers. It must not be
+the database backend (system check ecotrack.E001): the views reading these caches
+have query budgets that count no cache queries.
+"""
+
+import hashlib
+import json
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.db.models import F
+
+# Bump when the get_suggestions prompt changes so old responses stop being served
+SUGGESTIONS_PROMPT_VERSION = 1
+
+SUGGESTIONS_CACHE_TTL = getattr(settings, 'SUGGESTIONS_CACHE_TTL', 6 * 60 * 60)
+
+DASHBOARD_CACHE_TTL = getattr(settings, 'DASHBOARD_CACHE_TTL', 24 * 60 * 60)
+
+
+def _normalize_text(text):
+    return ' '.join(str(text).lower().split())
+
+
+def habits_fingerprint(habits):
+    """
+    Hash the user's habit texts, ignoring order, case and spacing, so users with
+    equivalent habit sets (including the many with none) share cache entries.
+    """
+    texts = sorted(
+        _normalize_text(habit.get('text'))
+        for habit in habits or []
+        if isinstance(habit, dict) and habit.get('text')
+    )
+    return hashlib.sha256(json.dumps(texts).encode('utf-8')).hexdigest()
+
+
+def suggestions_cache_key(category, habits):
+    """
+    Key suggestions on (prompt version, category, habits fingerprint). Editing a
+    habit changes the fingerprint, so the next request misses and regenerates.
+    """
+    return f"suggestions:v{SUGGESTIONS_PROMPT_VERSION}:{category}:{habits_fingerprint(habits)}"
+
+
+def get_cached_suggestions(category, habits):
+    return cache.get(suggestions_cache_key(category, habits))
+
+
+def set_cached_suggestions(category, habits, suggestions):
+    cache.set(suggestions_cache_key(category, habits), suggestions, SUGGESTIONS_CACHE_TTL)
+
+
+def bump_dashboard_version(user):
+    """
+    Invalidate the user's cached get_user_data payload (and its ETag). Call after
+    any write that changes the payload; the increment is done in the database so
+    concurrent writers never reuse a version. That only holds if no write saves a
+    loaded dashboard_version back: save users with update_fields that leave it out.
+    """
+    get_user_model().objects.filter(pk=user.pk).update(dashboard_version=F('dashboard_version') + 1)
+    user.dashboard_version += 1
+
+
+def dashboard_etag(user, day):
+    """
+    ETag of the user's dashboard payload. The local day is part of it because
+    streaks and daily counts are derived from it at read time.
+    """
+    return f"{user.pk}-{user.dashboard_version}-{day.isoformat()}"
+
+
+def dashboard_cache_key(user, day):
+    return f"dashboard:{dashboard_etag(user, day)}"
+
+
+def get_cached_dashboard(user, day):
+    """Return the pre-serialized payload for the user's current version, or None."""
+    return cache.get(dashboard_cache_key(user, day))
+
+
+def set_cached_dashboard(user, day, payload):
+    cache.set(dashboard_cache_key(user, day), payload, DASHBOARD_CACHE_TTL)
@@ -0,0 +1,200 @@
+"""
+Server-sent events for community chat.
+
+send_message publishes each new CommunityMessage (after its transaction commits)
+to an in-process broker. The community_message_stream view holds one
+text/event-stream response per open chat and forwards the messages of its
+community as `message` events whose id is the message id, so a reconnecting
+EventSource resumes from Last-Event-ID. An idle stream is an asyncio queue
+waiting on the event loop: no thread, no query, and a comment line every
+CHAT_STREAM_HEARTBEAT_SECONDS to keep proxies from closing it.
+
+Streams need an ASGI server (DjangoProject/asgi.py). The broker only sees the
+messages sent through its own process: when several ASGI processes serve the
+app, set CHAT_STREAM_CATCHUP so idle streams also check the database for
+missed messages once per heartbeat.
+"""
+
+import asyncio
+import json
+import threading
+import time
+
+from django.conf import settings
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db import transaction
+
+from .models import CommunityMessage
+
+# Messages a subscriber may fall behind by before its stream is closed (the
+# client then reconnects and catches up from the database)
+SUBSCRIBER_QUEUE_SIZE = 100
+
+# Messages sent to a reconnecting client that missed them
+BACKFILL_LIMIT = 100
+
+# Tells a stream that its queue overflowed
+_OVERFLOW = object()
+
+
+def heartbeat_seconds() -> float:
+    return float(getattr(settings, 'CHAT_STREAM_HEARTBEAT_SECONDS', 15))
+
+
+def max_stream_seconds() -> float:
+    """Lifetime of one stream; the client reconnects, which re-checks membership."""
+    return float(getattr(settings, 'CHAT_STREAM_MAX_SECONDS', 300))
+
+
+def catchup_enabled() -> bool:
+    return bool(getattr(settings, 'CHAT_STREAM_CATCHUP', False))
+
+
+def serialize_message(message):
+    """The JSON shape the community chat API uses for a message."""
+    return {
+        'id': message.id,
+        'content': message.content,
+        'message_type': message.message_type,
+        'metadata': message.metadata,
+        'sender': message.sender.username,
+        'sender_id': message.sender_id,
+        'created_at': message.created_at.isoformat(),
+        'is_pinned': message.is_pinned,
+    }
+
+
+class Subscription:
+    """One stream's queue, bound to the event loop the stream runs on."""
+
+    def __init__(self, community_id, loop):
+        self.community_id = community_id
+        self.loop = loop
+        self.queue = asyncio.Queue(maxsize=SUBSCRIBER_QUEUE_SIZE)
+        self.overflowed = False
+
+    def push(self, payload):
+        # Runs on self.loop
+        if self.overflowed:
+            return
+        if self.queue.full():
+            self.overflowed = True
+            while not self.queue.empty():
+                self.queue.get_nowait()
+            self.queue.put_nowait(_OVERFLOW)
+        else:
+            self.queue.put_nowait(payload)
+
+
+class ChatBroker:
+    """Fan-out of new messages to the streams subscribed to their community."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._subscribers = {}  # community_id -> set of Subscription
+
+    def subscribe(self, community_id):
+        """Subscribe the calling coroutine's event loop to `community_id`."""
+        subscription = Subscription(community_id, asyncio.get_running_loop())
+        with self._lock:
+            self._subscribers.setdefault(community_id, set()).add(subscription)
+        return subscription
+
+    def unsubscribe(self, subscription):
+        with self._lock:
+            subscribers = self._subscribers.get(subscription.community_id)
+            if subscribers is not None:
+                subscribers.discard(subscription)
+                if not subscribers:
+                    del self._subscribers[subscription.community_id]
+
+    def publish(self, community_id, payload):
+        """Hand `payload` to every subscriber of `community_id`; safe to call from any thread."""
+        with self._lock:
+            subscribers = list(self._subscribers.get(community_id, ()))
+        for subscription in subscribers:
+            try:
+                subscription.loop.call_soon_threadsafe(subscription.push, payload)
+            except RuntimeError:
+                # The subscriber's loop has closed
+                self.unsubscribe(subscription)
+
+    def subscriber_count(self, community_id=None):
+        with self._lock:
+            if community_id is not None:
+                return len(self._subscribers.get(community_id, ()))
+            return sum(len(subscribers) for subscribers in self._subscribers.values())
+
+
+broker = ChatBroker()
+
+
+def publish_message(message):
+    """Publish a new message to the open streams once the current transaction commits."""
+    payload = serialize_message(message)
+    transaction.on_commit(lambda: broker.publish(message.community_id, payload))
+
+
+def format_event(payload):
+    data = json.dumps(payload, cls=DjangoJSONEncoder)
+    return f"id: {payload['id']}\nevent: message\ndata: {data}\n\n"
+
+
+async def messages_after(community_id, last_id, limit=BACKFILL_LIMIT):
+    """Up to `limit` messages of the community with an id above `last_id`, oldest first."""
+    queryset = (
+        CommunityMessage.objects.filter(community_id=community_id, id__gt=last_id)
+        .select_related('sender')
+        .order_by('id')[:limit]
+    )
+    return [serialize_message(message) async for message in queryset]
+
+
+async def message_events(community_id, last_id=None):
+    """
+    The event stream of one chat: a retry hint, the messages after `last_id`
+    (if given), then every new message until max_stream_seconds() elapse.
+
+    Args:
+        community_id (int): Community whose messages to stream
+        last_id (int, optional): Id of the last message the client already has
+
+    Yields:
+        str: Server-sent event frames
+    """
+    # Subscribe before the backfill query so nothing sent in between is missed
+    subscription = broker.subscribe(community_id)
+    try:
+        yield f'retry: {int(heartbeat_seconds() * 1000)}\n\n'
+
+        if last_id is not None:
+            for payload in await messages_after(community_id, last_id):
+                last_id = payload['id']
+                yield format_event(payload)
+
+        deadline = time.monotonic() + max_stream_seconds()
+        while True:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                return
+            try:
+                payload = await asyncio.wait_for(
+                    subscription.queue.get(), timeout=min(heartbeat_seconds(), remaining)
+                )
+            except asyncio.TimeoutError:
+                if catchup_enabled() and last_id is not None:
+                    for payload in await messages_after(community_id, last_id):
+                        last_id = payload['id']
+                        yield format_event(payload)
+                yield ': keep-alive\n\n'
+                continue
+
+            if payload is _OVERFLOW:
+                # Too slow to keep up: the client reconnects and backfills from Last-Event-ID
+                return
+            if last_id is not None and payload['id'] <= last_id:
+                continue  # Already sent by the backfill
+            last_id = payload['id']
+            yield format_event(payload)
+    finally:
+        broker.unsubscribe(subscription)
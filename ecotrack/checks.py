@@ -0,0 +1,30 @@
+"""
+System checks for deployment settings the app's performance guarantees depend on.
+"""
+
+from django.conf import settings
+from django.core.checks import Error, Tags, register
+
+# Backends that store entries in the app's own database
+DATABASE_CACHE_BACKENDS = ('django.core.cache.backends.db.DatabaseCache',)
+
+
+@register(Tags.caches)
+def check_dashboard_cache_backend(app_configs, **kwargs):
+    """
+    The dashboard payload cache must live outside the database: get_user_data's
+    query_budget counts its habits and footprint history reads only, and a
+    DatabaseCache would add a read and several writes per request.
+    """
+    backend = settings.CACHES.get('default', {}).get('BACKEND')
+    if backend in DATABASE_CACHE_BACKENDS:
+        return [
+            Error(
+                'The default cache uses the database backend.',
+                hint='Use a cache outside the database (local memory, file, Memcached or Redis): '
+                     'get_user_data and get_suggestions are budgeted as if cache reads cost no queries.',
+                obj='CACHES',
+                id='ecotrack.E001',
+            )
+        ]
+    return []
@@ -0,0 +1,106 @@
+"""
+Batch maintenance of per-user daily stats: streak lapses, the habits_today reset
+and achievement unlocks. Run nightly from management commands so request handlers
+never have to write these values.
+"""
+
+import time
+from datetime import timedelta
+
+from django.db.models import Case, F, PositiveIntegerField, Q, Value, When
+from django.utils import timezone
+
+from .models import User
+from .utils import check_achievements, merge_achievements
+
+# Columns check_achievements reads, so the recompute only loads what it needs
+ACHIEVEMENT_FIELDS = [
+    'id',
+    'date_joined',
+    'last_checkin',
+    'streak',
+    'habits_today',
+    'sustainability_score',
+    'achievements',
+    'dashboard_version',
+]
+
+
+def roll_over_daily_stats(today=None):
+    """
+    Persist lapsed streaks and the habits_today reset with a single UPDATE that only
+    touches rows whose stored values change. Returns the number of rows updated.
+    """
+    today = today or timezone.localdate()
+    yesterday = today - timedelta(days=1)
+
+    return User.objects.filter(
+        Q(last_checkin__lt=yesterday, streak__gt=0)
+        | (Q(last_checkin__lt=today) | Q(last_checkin__isnull=True)) & Q(habits_today__gt=0)
+    ).update(
+        streak=Case(
+            When(last_checkin__lt=yesterday, then=Value(0)),
+            default=F('streak'),
+            output_field=PositiveIntegerField(),
+        ),
+        habits_today=Case(
+            When(Q(last_checkin__lt=today) | Q(last_checkin__isnull=True), then=Value(0)),
+            default=F('habits_today'),
+            output_field=PositiveIntegerField(),
+        ),
+    )
+
+
+def recompute_achievements(since=None, chunk_size=2000, on_progress=None):
+    """
+    Unlock achievements earned by users' stored stats, streaming users in primary
+    key chunks so memory stays bounded by `chunk_size` whatever the table size.
+
+    Achievements are only ever added. Changed users are written back per chunk with
+    one bulk_update, which also bumps their dashboard_version.
+
+    Args:
+        since: Only consider users who joined or checked in on or after this date
+        chunk_size: Users loaded and written per batch
+        on_progress: Optional callable(scanned, updated, elapsed_seconds) called per chunk
+
+    Returns:
+        dict: scanned, updated and elapsed_seconds
+    """
+    users = User.objects.only(*ACHIEVEMENT_FIELDS).order_by('pk')
+    if since is not None:
+        users = users.filter(Q(last_checkin__gte=since) | Q(date_joined__date__gte=since))
+
+    started = time.monotonic()
+    scanned = 0
+    updated = 0
+    last_pk = 0
+
+    # Keyset chunks rather than one long iterator() cursor: SQLite gives no isolation
+    # between a cursor and writes to the same table on one connection
+    while True:
+        chunk = list(users.filter(pk__gt=last_pk)[:chunk_size])
+        if not chunk:
+            break
+        last_pk = chunk[-1].pk
+        scanned += len(chunk)
+
+        changed = []
+        for user in chunk:
+            merged = merge_achievements(user.achievements, check_achievements(user))
+            if merged != list(user.achievements or []):
+                user.achievements = merged
+                user.dashboard_version = F('dashboard_version') + 1
+                changed.append(user)
+
+        if changed:
+            User.objects.bulk_update(changed, ['achievements', 'dashboard_version'])
+            updated += len(changed)
+        if on_progress:
+            on_progress(scanned, updated, time.monotonic() - started)
+
+    return {
+        'scanned': scanned,
+        'updated': updated,
+        'elapsed_seconds': time.monotonic() - started,
+    }
@@ -0,0 +1,130 @@
+"""
+Public community discovery: communities ranked by a precomputed activity score,
+paged with a keyset cursor and optionally narrowed by a full-text search.
+
+activity_score = MESSAGE_POINTS per message in the last ACTIVITY_WINDOW_DAYS
+               + MEMBER_POINTS per active member
+
+refresh_activity_scores recomputes it in batches (the refresh_community_activity
+command); listing reads the stored value through the
+(is_private, activity_score, id) index and never aggregates per request.
+"""
+
+import time
+from datetime import timedelta
+
+from django.db.models import Count, Q
+from django.utils import timezone
+
+from .models import Community, CommunityMembership, CommunityMessage
+from .search import COMMUNITY_INDEX, search_filter
+
+ACTIVITY_WINDOW_DAYS = 14
+MESSAGE_POINTS = 1
+MEMBER_POINTS = 3
+
+# Communities per discovery page (?limit= may ask for up to MAX_PAGE_SIZE)
+PAGE_SIZE = 20
+MAX_PAGE_SIZE = 50
+
+
+def activity_score(recent_messages, member_count):
+    return MESSAGE_POINTS * recent_messages + MEMBER_POINTS * member_count
+
+
+def refresh_activity_scores(now=None, chunk_size=2000, on_progress=None):
+    """
+    Recompute every community's activity_score in primary key chunks, writing
+    only the scores that changed.
+
+    Args:
+        now: End of the activity window (default: now)
+        chunk_size: Communities scored and written per batch
+        on_progress: Optional callable(scanned, updated, elapsed_seconds) called per chunk
+
+    Returns:
+        dict: scanned, updated and elapsed_seconds
+    """
+    since = (now or timezone.now()) - timedelta(days=ACTIVITY_WINDOW_DAYS)
+    communities = Community.objects.order_by('pk').only('id', 'member_count', 'activity_score')
+
+    started = time.monotonic()
+    scanned = 0
+    updated = 0
+    last_pk = 0
+
+    # Keyset chunks, as in daily_stats.recompute_achievements
+    while True:
+        chunk = list(communities.filter(pk__gt=last_pk)[:chunk_size])
+        if not chunk:
+            break
+        last_pk = chunk[-1].pk
+        scanned += len(chunk)
+
+        # One grouped count per chunk, served by the (community, created_at, id) index
+        recent = dict(
+            CommunityMessage.objects.filter(
+                community_id__in=[community.pk for community in chunk],
+                created_at__gte=since,
+            ).order_by().values('community_id').annotate(count=Count('id')).values_list('community_id', 'count')
+        )
+        changed = []
+        for community in chunk:
+            score = activity_score(recent.get(community.pk, 0), community.member_count)
+            if community.activity_score != score:
+                community.activity_score = score
+                changed.append(community)
+
+        if changed:
+            Community.objects.bulk_update(changed, ['activity_score'])
+        updated += len(changed)
+        if on_progress:
+            on_progress(scanned, updated, time.monotonic() - started)
+
+    return {
+        'scanned': scanned,
+        'updated': updated,
+        'elapsed_seconds': time.monotonic() - started,
+    }
+
+
+def format_cursor(community):
+    return f'{community.activity_score}-{community.pk}'
+
+
+def parse_cursor(cursor):
+    """(activity_score, id) from a format_cursor() string; raises ValueError if malformed."""
+    score, _, pk = cursor.partition('-')
+    return int(score), int(pk)
+
+
+def public_communities_page(user, query='', cursor=None, limit=None):
+    """
+    One page of the public communities `user` has not joined, most active first.
+
+    Args:
+        user: Member whose communities are left out
+        query: Optional search text matched against names and descriptions
+        cursor: next_cursor of the previous page (from format_cursor)
+        limit: Communities per page (default PAGE_SIZE, at most MAX_PAGE_SIZE)
+
+    Returns:
+        tuple: (communities, next_cursor), next_cursor being None on the last page
+
+    Raises:
+        ValueError: If the cursor is malformed
+    """
+    limit = min(max(limit or PAGE_SIZE, 1), MAX_PAGE_SIZE)
+    communities = Community.objects.filter(is_private=False).exclude(
+        pk__in=CommunityMembership.objects.filter(user=user, is_active=True).values('community_id')
+    )
+    if query:
+        communities = search_filter(communities, COMMUNITY_INDEX, query)
+    if cursor:
+        score, pk = parse_cursor(cursor)
+        # The redundant activity_score bound lets the index serve the range scan
+        communities = communities.filter(Q(activity_score__lt=score) | Q(pk__lt=pk), activity_score__lte=score)
+
+    page = list(communities.order_by('-activity_score', '-pk')[:limit + 1])
+    next_cursor = format_cursor(page[limit - 1]) if len(page) > limit else None
+    return page[:limit], next_cursor
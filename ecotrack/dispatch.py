@@ -0,0 +1,344 @@
+"""
+Daily reminder fan-out for EcoTrack push notifications.
+Selects the Android devices due in the current UTC minute and delivers their
+reminders in FCM-sized batches, writing delivery bookkeeping back per batch.
+
+Dispatches run from a DB-table queue (DispatchJob): cron_dispatch enqueues one job
+per minute and run_dispatch_worker processes drain it. Devices are leased to a
+worker before sending, so overlapping workers split a minute's cohort.
+"""
+
+import logging
+import os
+import socket
+from datetime import timedelta
+from uuid import uuid4
+
+from django.conf import settings
+from django.db import connection, transaction
+from django.db.models import F, Q
+from django.utils import timezone
+
+from .firebase_service import FCMService, FCM_BATCH_SIZE
+from .models import AndroidDevice, DispatchJob
+from .reminder_copy import get_reminder_body
+
+logger = logging.getLogger(__name__)
+
+# How late a daily reminder may still be delivered when a cron tick was missed
+REMINDER_CATCHUP_MINUTES = getattr(settings, 'REMINDER_CATCHUP_MINUTES', 10)
+
+# How long a worker may hold claimed devices before another worker can take them over
+DISPATCH_LEASE_SECONDS = getattr(settings, 'DISPATCH_LEASE_SECONDS', 300)
+
+REMINDER_TITLE = 'EcoTrack Reminder'
+
+# Columns written back for every device in a batch
+BOOKKEEPING_FIELDS = [
+    'total_notifications_sent',
+    'last_notification_sent',
+    'last_sent_date',
+    'last_sent_time',
+    'next_fire_at',
+    'is_active',
+    'dispatch_lease_owner',
+    'dispatch_lease_expires_at',
+]
+
+
+def reschedule_stale_devices(window_start, now, chunk_size=2000):
+    """
+    Move reminders missed by more than the catch-up window (e.g. scheduler downtime)
+    to their next occurrence instead of firing them hours late.
+
+    Only devices the dispatcher would send to are considered, in primary key chunks
+    of `chunk_size`, so a long outage never loads the whole table at once.
+    """
+    stale_devices = AndroidDevice.objects.filter(
+        is_active=True,
+        daily_reminders_enabled=True,
+        next_fire_at__lt=window_start,
+    ).only(
+        'id', 'notification_time', 'timezone', 'is_active', 'daily_reminders_enabled', 'next_fire_at',
+    ).order_by('pk')
+
+    rescheduled = 0
+    last_pk = 0
+
+    # Keyset chunks, as in daily_stats.recompute_achievements
+    while True:
+        chunk = list(stale_devices.filter(pk__gt=last_pk)[:chunk_size])
+        if not chunk:
+            break
+        last_pk = chunk[-1].pk
+        for device in chunk:
+            device.schedule_next_reminder(after=now)
+        AndroidDevice.objects.bulk_update(chunk, ['next_fire_at'], batch_size=FCM_BATCH_SIZE)
+        rescheduled += len(chunk)
+    return rescheduled
+
+
+def _send_batch(devices, body, now):
+    """Send one batch of reminders and persist its bookkeeping with a single bulk_update."""
+    devices_by_token = {}
+    failed_ids = []
+
+    for device in devices:
+        if device.has_valid_fcm_token():
+            devices_by_token[device.get_fcm_token()] = device
+        else:
+            failed_ids.append(device.id)
+
+    result = FCMService.send_multicast(
+        tokens=list(devices_by_token),
+        title=REMINDER_TITLE,
+        body=body,
+        data={'type': 'daily_reminder'},
+    )
+    failed_tokens = set(result['failed_tokens'])
+    unregistered_tokens = set(result['unregistered_tokens'])
+
+    for token, device in devices_by_token.items():
+        if token in failed_tokens:
+            failed_ids.append(device.id)
+            if token in unregistered_tokens:
+                # FCM will never accept this token again; stop scheduling the device
+                device.is_active = False
+        else:
+            device.mark_reminder_sent(device.next_fire_at, sent_at=now)
+
+    # Advance the schedule whether or not the send succeeded, as the minute has passed,
+    # and release the leases in the same write
+    for device in devices:
+        device.schedule_next_reminder(after=device.next_fire_at)
+        device.dispatch_lease_owner = ''
+        device.dispatch_lease_expires_at = None
+
+    AndroidDevice.objects.bulk_update(devices, BOOKKEEPING_FIELDS)
+    return result['success_count'], failed_ids
+
+
+def _claim_batch(due, owner, now, limit=FCM_BATCH_SIZE):
+    """
+    Atomically lease up to `limit` due devices to `owner`.
+
+    Databases with SKIP LOCKED (PostgreSQL, MySQL 8, Oracle) lock candidate rows and
+    skip rows another worker holds. Elsewhere (SQLite) the claim is a conditional
+    UPDATE that re-checks the lease predicate, so only one worker's update can match
+    a row; a worker that loses the race for every row it picked retries. Either way
+    concurrent workers split the cohort instead of duplicating it, and an empty batch
+    means nothing claimable is left.
+    """
+    lease_expires_at = now + timedelta(seconds=DISPATCH_LEASE_SECONDS)
+    claimable = due.filter(
+        Q(dispatch_lease_expires_at__isnull=True) | Q(dispatch_lease_expires_at__lt=now)
+    )
+
+    if connection.features.has_select_for_update_skip_locked:
+        with transaction.atomic():
+            ids = list(
+                claimable.select_for_update(skip_locked=True).values_list('id', flat=True)[:limit]
+            )
+            AndroidDevice.objects.filter(id__in=ids).update(
+                dispatch_lease_owner=owner,
+                dispatch_lease_expires_at=lease_expires_at,
+            )
+    else:
+        while True:
+            ids = list(claimable.values_list('id', flat=True)[:limit])
+            claimed = claimable.filter(id__in=ids).update(
+                dispatch_lease_owner=owner,
+                dispatch_lease_expires_at=lease_expires_at,
+            )
+            # Another worker leased every picked row first; pick again while any are left,
+            # since an empty batch tells send_daily_reminders the cohort is done
+            if claimed or not ids or not claimable.exists():
+                break
+
+    return list(
+        AndroidDevice.objects.filter(id__in=ids, dispatch_lease_owner=owner).order_by('next_fire_at', 'id')
+    )
+
+
+def _release_batch(devices, owner):
+    """Give back leases on devices that could not be processed."""
+    AndroidDevice.objects.filter(
+        id__in=[device.id for device in devices],
+        dispatch_lease_owner=owner,
+    ).update(dispatch_lease_owner='', dispatch_lease_expires_at=None)
+
+
+def new_lease_owner(job=None):
+    """Build a lease owner token identifying this worker process (and its job)."""
+    prefix = f"job{job.pk}" if job is not None else "adhoc"
+    return f"{prefix}:{socket.gethostname()}:{os.getpid()}:{uuid4().hex[:8]}"[:64]
+
+
+def due_devices(now):
+    """Devices whose reminder falls in the catch-up window ending with the minute of `now`."""
+    current_minute = now.replace(second=0, microsecond=0)
+    return AndroidDevice.objects.filter(
+        is_active=True,
+        daily_reminders_enabled=True,
+        next_fire_at__gte=current_minute - timedelta(minutes=REMINDER_CATCHUP_MINUTES),
+        next_fire_at__lt=current_minute + timedelta(minutes=1),
+    ).order_by('next_fire_at', 'id')
+
+
+def send_daily_reminders(now=None, on_progress=None, owner=None):
+    """
+    Deliver every daily reminder due at `now` (default: current time).
+
+    Devices are selected by their precomputed UTC next_fire_at bucket and leased
+    FCM_BATCH_SIZE at a time to `owner`; each processed batch moves past the current
+    minute and releases its leases, so the loop always claims the next unprocessed
+    batch and concurrent workers never pick the same device.
+
+    Args:
+        now: Time to dispatch for
+        on_progress: Optional callable(total, sent, failed) invoked with each batch's counts
+        owner: Lease owner token (default: a fresh one from new_lease_owner)
+
+    Returns:
+        dict: Counters for the run (total_candidates, sent, failed, failed_ids, rescheduled)
+    """
+    now = now or timezone.now()
+    owner = owner or new_lease_owner()
+    current_minute = now.replace(second=0, microsecond=0)
+    window_start = current_minute - timedelta(minutes=REMINDER_CATCHUP_MINUTES)
+
+    rescheduled = reschedule_stale_devices(window_start, now)
+    due = due_devices(now)
+
+    total = 0
+    sent = 0
+    failed_ids = []
+    body = None
+
+    while True:
+        devices = _claim_batch(due, owner, now)
+        if not devices:
+            break
+
+        try:
+            if body is None:
+                # Pre-generated copy for the UTC day: one indexed read, no LLM call
+                body = get_reminder_body(current_minute.date())
+            batch_sent, batch_failed_ids = _send_batch(devices, body, now)
+        except Exception:
+            _release_batch(devices, owner)
+            raise
+
+        total += len(devices)
+        sent += batch_sent
+        failed_ids.extend(batch_failed_ids)
+        if on_progress:
+            on_progress(len(devices), batch_sent, len(batch_failed_ids))
+
+    return {
+        'total_candidates': total,
+        'sent': sent,
+        'failed': len(failed_ids),
+        'failed_ids': failed_ids,
+        'rescheduled': rescheduled,
+    }
+
+
+def has_leased_devices(now=None):
+    """Return True while another worker still holds unexpired leases on due devices."""
+    now = now or timezone.now()
+    return AndroidDevice.objects.filter(
+        next_fire_at__lt=now.replace(second=0, microsecond=0) + timedelta(minutes=1),
+        dispatch_lease_expires_at__gte=now,
+    ).exists()
+
+
+def enqueue_dispatch(now=None):
+    """
+    Queue a dispatch for the minute containing `now`. Repeated calls for the same
+    minute (scheduler retries) return the existing job instead of adding another.
+
+    Returns:
+        tuple: (DispatchJob, created)
+    """
+    now = now or timezone.now()
+    scheduled_for = now.replace(second=0, microsecond=0)
+    # get_or_create falls back to a get if a concurrent request inserted the row first
+    return DispatchJob.objects.get_or_create(scheduled_for=scheduled_for)
+
+
+def claim_next_job(now=None):
+    """
+    Pick the newest pending or running job for this worker.
+
+    A pending job is moved to running with a conditional update; a running job is
+    joined, and the workers split its cohort through device leases. Older pending
+    jobs are marked skipped, since one dispatch run already covers every reminder
+    due up to now, so a backlog never turns into several dispatches over the same
+    devices.
+
+    Returns:
+        DispatchJob or None
+    """
+    now = now or timezone.now()
+    while True:
+        job = DispatchJob.objects.filter(
+            status__in=['pending', 'running'],
+        ).order_by('-scheduled_for').first()
+        if job is None:
+            return None
+
+        if job.status == 'pending':
+            # Conditional update so only one worker moves the job to running
+            claimed = DispatchJob.objects.filter(pk=job.pk, status='pending').update(
+                status='running',
+                started_at=now,
+            )
+            if not claimed:
+                continue
+
+        DispatchJob.objects.filter(pk=job.pk).update(attempts=F('attempts') + 1)
+        DispatchJob.objects.filter(
+            status='pending',
+            scheduled_for__lt=job.scheduled_for,
+        ).update(status='skipped', finished_at=now)
+
+        job.refresh_from_db()
+        return job
+
+
+def run_dispatch_job(job, owner=None):
+    """
+    Work on a claimed job, adding this worker's progress to the job row as batches
+    complete. The job is marked done once no due device is left unclaimed or leased
+    to another worker; until then the other workers finish it.
+    """
+    owner = owner or new_lease_owner(job)
+
+    def record_progress(total, sent, failed):
+        DispatchJob.objects.filter(pk=job.pk).update(
+            total_candidates=F('total_candidates') + total,
+            sent=F('sent') + sent,
+            failed=F('failed') + failed,
+        )
+
+    try:
+        result = send_daily_reminders(timezone.now(), on_progress=record_progress, owner=owner)
+    except Exception as e:
+        logger.error(f"Dispatch job {job.pk} failed: {e}")
+        DispatchJob.objects.filter(pk=job.pk).update(
+            status='failed',
+            error=str(e),
+            finished_at=timezone.now(),
+        )
+        raise
+
+    now = timezone.now()
+    if not has_leased_devices(now):
+        DispatchJob.objects.filter(pk=job.pk, status='running').update(status='done', finished_at=now)
+        # Older jobs still marked running (e.g. their worker died) are covered by this run
+        DispatchJob.objects.filter(
+            status='running',
+            scheduled_for__lt=job.scheduled_for,
+        ).update(status='skipped', finished_at=now)
+    return result
@@ -0,0 +1,193 @@
+"""
+Emission factors and initial-score points, compiled for fast lookups.
+
+CONFIG and INITIAL_SCORE_CONFIG below are the built-in defaults; they seed
+EmissionFactorSet version 1, and new factors are added as EmissionFactorSet rows
+(e.g. from the admin) without a deploy. Each process compiles the latest set once
+into an EmissionFactors object, where every categorical answer table becomes a
+dict of answer codes plus a tuple of values and every constant an attribute.
+get_active_factors looks for a newer version at most every
+EMISSION_FACTORS_RELOAD_SECONDS and recompiles when it changes.
+
+Footprints record the version they were calculated with; rescore_footprints
+recalculates the ones computed with an older version.
+"""
+
+import threading
+import time
+
+from django.conf import settings
+
+CONFIG = {
+    "factors": {
+        "EF_ELECTRICITY": {"Yes": 0.05, "Partially": 0.25, "No": 0.475},
+        "EF_HEATING": {
+            "Natural Gas": 0.2, "Electricity": 0.45, "Oil": 0.27,
+            "Propane": 0.24, "Wood": 0.015, "Other": 0.3
+        },
+        "EF_VEHICLE_PER_KM": {
+            "Gasoline": 0.18, "Diesel": 0.17, "Hybrid": 0.12, "Electric": 0.05
+        },
+        "EF_FLIGHT": {"Short-haul (<3h)": 1100, "Medium-haul (3-6h)": 3000, "Long-haul (>6h)": 8000},
+        "EF_FLIGHT_PER_KM": 0.15,
+        "EF_DIET": {
+            "Vegan": 1600 / 12, "Vegetarian": 1900 / 12, "Pescatarian": 2100 / 12,
+            "Omnivore": 2500 / 12, "High Meat": 3300 / 12
+        },
+        "EF_PUBLIC_TRANSPORT_PER_KM": 0.1,
+        "EF_WASTE_LANDFILL": 0.45,
+        "EF_WATER_PER_LITRE": 0.0005
+    },
+    "multipliers": {
+        "FOOD_WASTE": {"Very little": 0.9, "Below average": 1.0, "Average": 1.2, "Above average": 1.5},
+        "FOOD_PACKAGING": {"Very little": 0.9, "Below average": 1.0, "Average": 1.3, "Above average": 1.6},
+        "SHOPPING": {"Rarely": 50, "Sometimes": 100, "Often": 200}
+    },
+    "constants": {
+        "HOUSEHOLD_SIZE_DEFAULT": 1,
+        "WEEKS_PER_MONTH": 4.33,
+        "MONTHS_PER_YEAR": 12,
+        "DAYS_PER_MONTH": 30,
+        "WASTE_PER_PERSON_PER_DAY_KG": 1.2,
+        "RECYCLING_DIVERSION_PER_ITEM": 0.05,
+        "COMPOST_DIVERSION": 0.15,
+        "OFFSET_PERCENTAGE": 0.10
+    }
+}
+
+
+INITIAL_SCORE_CONFIG = {
+    # Home & Energy
+    "what_type_of_home_do_you_live_in": {"Apartment": 10, "Semi-detached House": 5, "Detached House": 0, "Other": 5},
+    "what_is_the_size_of_your_home": {"Small": 10, "Medium": 5, "Large": 0},
+    "is_your_electricity_from_renewable_sources": {"Yes": 20, "Partially": 10, "No": 0},
+    "do_you_use_energy_saving_appliances_or_lightbulbs": {"Yes": 10, "No": 0},
+    # Transportation
+    "how_often_do_you_use_public_transport": {"Daily": 10, "Weekly": 5, "Rarely": 0, "Never": -5},
+    # Diet
+    "what_best_describes_your_diet": {"Vegan": 20, "Vegetarian": 15, "Pescatarian": 10, "Omnivore": 5, "High Meat": 0},
+    "how_much_of_your_food_is_organic_local": {"All": 10, "Most": 7, "Some": 3, "None": 0},
+    "how_much_food_do_you_waste": {"Very little": 15, "Below average": 10, "Average": 5, "Above average": 0},
+    "how_much_of_your_food_is_packaged_processed": {"Very little": 10, "Below average": 7, "Average": 3, "Above average": 0},
+    # Waste
+    "do_you_compost_food_waste": {"All": 10, "Some": 5, "None": 0},
+    "recycling_items_count": {0: 0, 1: 3, 2: 6, 3: 9, 4: 12}, # Points based on how many materials are recycled
+    # Consumption
+    "how_often_do_you_buy_new_clothes_electronics_or_appliances": {"Rarely": 15, "Sometimes": 5, "Often": 0},
+    "do_you_buy_second_hand_or_repair_items": {"Yes": 10, "Sometimes": 5, "Rarely": 2, "No": 0},
+    # Water
+    "do_you_use_water_saving_devices": {"Yes": 10, "No": 0},
+    # Offsetting
+    "do_you_offset_your_carbon_emissions": {"Yes": 5, "No": 0}
+}
+
+
+class FactorTable:
+    """Values of a categorical answer table by answer code; answers not in the table map to `fallback`."""
+
+    __slots__ = ('codes', 'values', 'fallback_code')
+
+    def __init__(self, table, fallback):
+        self.codes = {answer: code for code, answer in enumerate(table)}
+        self.values = tuple(table.values()) + (fallback,)
+        self.fallback_code = len(table)
+
+    def code(self, answer):
+        return self.codes.get(answer, self.fallback_code)
+
+    def value(self, answer):
+        return self.values[self.codes.get(answer, self.fallback_code)]
+
+
+class EmissionFactors:
+    """
+    One version of CONFIG and INITIAL_SCORE_CONFIG, compiled into flat lookup tables.
+    Raises KeyError, TypeError or ValueError if either config is incomplete.
+    """
+
+    def __init__(self, version, config, initial_score_config):
+        factors = config["factors"]
+        multipliers = config["multipliers"]
+        constants = config["constants"]
+
+        self.version = version
+
+        # Categorical answers, with the scalar helpers' defaults for unknown answers
+        self.electricity = FactorTable(factors["EF_ELECTRICITY"], factors["EF_ELECTRICITY"]["No"])
+        self.heating = FactorTable(factors["EF_HEATING"], factors["EF_HEATING"]["Natural Gas"])
+        self.vehicle = FactorTable(factors["EF_VEHICLE_PER_KM"], factors["EF_VEHICLE_PER_KM"]["Gasoline"])
+        self.flight = FactorTable(factors["EF_FLIGHT"], 2000)
+        self.diet = FactorTable(factors["EF_DIET"], factors["EF_DIET"]["Omnivore"])
+        self.food_waste = FactorTable(multipliers["FOOD_WASTE"], 1.2)
+        self.food_packaging = FactorTable(multipliers["FOOD_PACKAGING"], 1.3)
+        self.shopping = FactorTable(multipliers["SHOPPING"], 100)
+
+        self.flight_per_km = factors["EF_FLIGHT_PER_KM"]
+        self.public_transport_per_km = factors["EF_PUBLIC_TRANSPORT_PER_KM"]
+        self.waste_landfill = factors["EF_WASTE_LANDFILL"]
+        self.water_per_litre = factors["EF_WATER_PER_LITRE"]
+
+        self.household_size_default = constants["HOUSEHOLD_SIZE_DEFAULT"]
+        self.weeks_per_month = constants["WEEKS_PER_MONTH"]
+        self.months_per_year = constants["MONTHS_PER_YEAR"]
+        self.days_per_month = constants["DAYS_PER_MONTH"]
+        self.waste_per_person_per_day_kg = constants["WASTE_PER_PERSON_PER_DAY_KG"]
+        self.recycling_diversion_per_item = constants["RECYCLING_DIVERSION_PER_ITEM"]
+        self.compost_diversion = constants["COMPOST_DIVERSION"]
+        self.offset_percentage = constants["OFFSET_PERCENTAGE"]
+
+        # (survey key, points by answer) in config order, which is the feedback order.
+        # Recycled item counts come back from JSON as strings, so they are re-keyed by int
+        self.initial_score_points = tuple(
+            (key, {int(count): points for count, points in mapping.items()})
+            if key == "recycling_items_count" else (key, dict(mapping))
+            for key, mapping in initial_score_config.items()
+        )
+
+
+DEFAULT_FACTORS = EmissionFactors(0, CONFIG, INITIAL_SCORE_CONFIG)
+
+_lock = threading.Lock()
+_active = None
+_checked_at = None
+
+
+def reload_seconds() -> float:
+    """How often a process checks for a newer EmissionFactorSet."""
+    return float(getattr(settings, 'EMISSION_FACTORS_RELOAD_SECONDS', 60))
+
+
+def get_active_factors() -> EmissionFactors:
+    """
+    Return the compiled latest EmissionFactorSet (DEFAULT_FACTORS, version 0, if there
+    is none). Compiled once per process and recompiled when a newer version appears.
+    """
+    global _active, _checked_at
+    active = _active
+    if active is not None and time.monotonic() - _checked_at < reload_seconds():
+        return active
+
+    with _lock:
+        if _active is None or time.monotonic() - _checked_at >= reload_seconds():
+            _active = _load_latest(_active)
+            _checked_at = time.monotonic()
+        return _active
+
+
+def invalidate_active_factors():
+    """Make this process look for a newer version on its next get_active_factors() call."""
+    global _checked_at
+    with _lock:
+        if _active is not None:
+            _checked_at = float('-inf')
+
+
+def _load_latest(current):
+    from .models import EmissionFactorSet
+
+    latest = EmissionFactorSet.objects.order_by('-version').values_list('version', flat=True).first()
+    if latest is None:
+        return DEFAULT_FACTORS
+    if current is not None and current.version == latest:
+        return current
+    return EmissionFactorSet.objects.get(version=latest).compile()
@@ -0,0 +1,217 @@
+"""
+In-process stand-ins for FCM and Gemini, for load tests and local development.
+
+Set FCM_TRANSPORT = 'fake' and LLM_TRANSPORT = 'fake' and FCMService / LLMService
+talk to these objects instead of Firebase and Gemini. They return the same
+response types the real SDKs do, after a configurable latency:
+
+- FakeMessaging mimics the firebase_admin.messaging calls FCMService makes. Tokens
+  starting with FAKE_FCM_UNREGISTERED_PREFIX fail with UnregisteredError, and
+  requests beyond FAKE_FCM_QUOTA_PER_SECOND fail with QuotaExceededError.
+- FakeGenAIClient mimics client.models.generate_content and answers each of the
+  app's prompts with a canned JSON payload of the shape the caller expects;
+  FAKE_GEMINI_ERROR_RATE of the calls raise instead.
+
+Both keep counters (stats()) that the load_test command reports.
+"""
+
+import itertools
+import json
+import random
+import re
+import threading
+import time
+from collections import Counter
+
+from django.conf import settings
+from firebase_admin import messaging
+
+
+def fcm_latency_seconds() -> float:
+    """Simulated round trip of one FCM HTTP request."""
+    return float(getattr(settings, 'FAKE_FCM_LATENCY_MS', 50)) / 1000
+
+
+def fcm_quota_per_second() -> int:
+    """FCM requests accepted per second before QuotaExceededError (0: unlimited)."""
+    return int(getattr(settings, 'FAKE_FCM_QUOTA_PER_SECOND', 0))
+
+
+def fcm_unregistered_prefix() -> str:
+    return getattr(settings, 'FAKE_FCM_UNREGISTERED_PREFIX', 'unregistered-')
+
+
+def gemini_latency_seconds() -> float:
+    """Simulated duration of one generate_content call."""
+    return float(getattr(settings, 'FAKE_GEMINI_LATENCY_MS', 800)) / 1000
+
+
+def gemini_error_rate() -> float:
+    """Fraction of generate_content calls that fail."""
+    return float(getattr(settings, 'FAKE_GEMINI_ERROR_RATE', 0))
+
+
+class FakeMessaging:
+    """The subset of firebase_admin.messaging that FCMService uses."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._ids = itertools.count(1)
+        self._window_start = 0.0
+        self._window_requests = 0
+        self.counters = Counter()
+
+    def _request(self):
+        """One simulated HTTP request: latency, then the per-second quota check."""
+        time.sleep(fcm_latency_seconds())
+        quota = fcm_quota_per_second()
+        with self._lock:
+            self.counters['requests'] += 1
+            now = time.monotonic()
+            if now - self._window_start >= 1:
+                self._window_start = now
+                self._window_requests = 0
+            self._window_requests += 1
+            if quota and self._window_requests > quota:
+                self.counters['quota_exceeded'] += 1
+                return messaging.QuotaExceededError('Fake FCM quota exceeded')
+        return None
+
+    def _deliver(self, token):
+        """Message id for `token`, or the exception FCM would report for it."""
+        if token.startswith(fcm_unregistered_prefix()):
+            with self._lock:
+                self.counters['unregistered'] += 1
+            return messaging.UnregisteredError('Requested entity was not found.')
+        with self._lock:
+            self.counters['delivered'] += 1
+        return f'projects/fake/messages/{next(self._ids)}'
+
+    def send(self, message, dry_run=False):
+        error = self._request()
+        if error is not None:
+            raise error
+        if not message.token:  # Topic messages always succeed
+            return f'projects/fake/messages/{next(self._ids)}'
+        result = self._deliver(message.token)
+        if isinstance(result, Exception):
+            raise result
+        return result
+
+    def send_each_for_multicast(self, multicast_message, dry_run=False):
+        # send_each sends its messages concurrently: about one round trip per call
+        error = self._request()
+        responses = []
+        for token in multicast_message.tokens:
+            result = error or self._deliver(token)
+            if isinstance(result, Exception):
+                responses.append(messaging.SendResponse(None, result))
+            else:
+                responses.append(messaging.SendResponse({'name': result}, None))
+        return messaging.BatchResponse(responses)
+
+    def subscribe_to_topic(self, tokens, topic):
+        return self._topic_response(tokens)
+
+    def unsubscribe_from_topic(self, tokens, topic):
+        return self._topic_response(tokens)
+
+    def _topic_response(self, tokens):
+        self._request()
+        return messaging.TopicManagementResponse({'results': [{} for _ in tokens]})
+
+    def stats(self):
+        with self._lock:
+            return dict(self.counters)
+
+
+SUGGESTIONS = [
+    {
+        "title": "Batch Your Errands",
+        "reason": "Combining trips cuts the distance you drive each week.",
+        "carbonReduction": "3-6 kg CO2e/month",
+    },
+    {
+        "title": "Cook Plant-Based Twice a Week",
+        "reason": "Replacing two meat meals with plant-based ones lowers your diet's footprint.",
+        "carbonReduction": "4-8 kg CO2e/month",
+    },
+    {
+        "title": "Line-Dry Your Laundry",
+        "reason": "Skipping the dryer saves a large share of laundry electricity.",
+        "carbonReduction": "2-5 kg CO2e/month",
+    },
+]
+
+QUESTIONS = [
+    {
+        "id": "q1",
+        "question": "How did you get around today?",
+        "options": [
+            {"text": "🚶 Walk/Cycle", "value": "Walk/Cycle", "eco_positive": True},
+            {"text": "🚌 Public Transport", "value": "Public Transport", "eco_positive": True},
+            {"text": "🚗 Car", "value": "Car", "eco_positive": False},
+        ],
+    },
+    {
+        "id": "q2",
+        "question": "Did you avoid single-use plastic today?",
+        "options": [
+            {"text": "✅ Yes", "value": "Yes", "eco_positive": True},
+            {"text": "❌ No", "value": "No", "eco_positive": False},
+        ],
+    },
+]
+
+
+def _canned_response(prompt):
+    """A response in the shape the prompt's caller parses."""
+    if 'notification messages' in prompt:
+        match = re.search(r'Generate (\d+)', prompt)
+        count = int(match.group(1)) if match else 10
+        return json.dumps([f"🌱 Day {i + 1}: fill your EcoTrack check-in now!" for i in range(count)])
+    if 'Return the total score' in prompt:
+        return json.dumps({"score": random.randint(0, 5)})
+    if 'questions based on' in prompt:
+        return json.dumps(QUESTIONS)
+    if 'suggestions of habits' in prompt:
+        return json.dumps(SUGGESTIONS)
+    return '[]'
+
+
+class _FakeResponse:
+    def __init__(self, text):
+        self.text = text
+
+
+class _FakeModels:
+    def __init__(self, client):
+        self._client = client
+
+    def generate_content(self, model, contents, config=None):
+        client = self._client
+        time.sleep(gemini_latency_seconds())
+        with client._lock:
+            client.counters['calls'] += 1
+        if random.random() < gemini_error_rate():
+            with client._lock:
+                client.counters['errors'] += 1
+            raise RuntimeError('Fake Gemini error')
+        return _FakeResponse(_canned_response(str(contents)))
+
+
+class FakeGenAIClient:
+    """Stands in for google.genai.Client; only models.generate_content is implemented."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.counters = Counter()
+        self.models = _FakeModels(self)
+
+    def stats(self):
+        with self._lock:
+            return dict(self.counters)
+
+
+fake_messaging = FakeMessaging()
+fake_genai_client = FakeGenAIClient()
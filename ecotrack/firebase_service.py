@@ -7,20 +7,41 @@ import firebase_admin
 from firebase_admin import credentials, messaging
 from django.conf import settings
 import logging
+from concurrent.futures import ThreadPoolExecutor
 from typing import List, Dict, Optional
 import json
 
+from .metrics import count_fcm_messages, external_call
+
 logger = logging.getLogger(__name__)
 
+# FCM accepts at most 500 messages per send_each call
+FCM_BATCH_SIZE = 500
+
 
 class FCMService:
     """Firebase Cloud Messaging service for sending push notifications."""
     
     _app = None
     
+    @classmethod
+    def uses_fake_transport(cls) -> bool:
+        """True when settings.FCM_TRANSPORT selects the in-process stand-in (fake_transports)."""
+        return getattr(settings, 'FCM_TRANSPORT', 'firebase') == 'fake'
+    
+    @classmethod
+    def transport(cls):
+        """The messaging API to send through: firebase_admin.messaging or its stand-in."""
+        if cls.uses_fake_transport():
+            from .fake_transports import fake_messaging
+            return fake_messaging
+        return messaging
+    
     @classmethod
     def initialize(cls):
         """Initialize Firebase Admin SDK."""
+        if cls.uses_fake_transport():
+            return
         if cls._app is None:
             try:
                 # Initialize with service account key
@@ -31,6 +52,11 @@ class FCMService:
                 logger.error(f"Failed to initialize Firebase Admin SDK: {e}")
                 raise
     
+    @classmethod
+    def max_concurrency(cls) -> int:
+        """Maximum number of multicast chunks (of up to FCM_BATCH_SIZE tokens) sent at once."""
+        return max(1, int(getattr(settings, 'FCM_MAX_CONCURRENCY', 4)))
+    
     @classmethod
     def send_notification(cls, token: str, title: str, body: str, data: Optional[Dict] = None) -> bool:
         """
@@ -85,7 +111,8 @@ class FCMService:
             )
             
             # Send message
-            response = messaging.send(message)
+            with external_call('fcm', 'send'):
+                response = cls.transport().send(message)
             logger.info(f"FCM notification sent successfully. Response: {response}")
             return True
             
@@ -113,6 +140,9 @@ class FCMService:
         """
         Send FCM notification to multiple tokens.
         
+        Tokens are split into chunks of FCM_BATCH_SIZE, FCM's send_each_for_multicast
+        limit, and at most FCM_MAX_CONCURRENCY chunks are sent at once.
+        
         Args:
             tokens: List of FCM registration tokens
             title: Notification title
@@ -120,66 +150,85 @@ class FCMService:
             data: Optional data payload
         
         Returns:
-            dict: Results with success_count, failure_count, and failed_tokens
+            dict: Results with success_count, failure_count, failed_tokens and
+                unregistered_tokens (tokens FCM reports as no longer valid)
         """
         cls.initialize()
         
         if not tokens:
-            return {'success_count': 0, 'failure_count': 0, 'failed_tokens': []}
+            return {'success_count': 0, 'failure_count': 0, 'failed_tokens': [], 'unregistered_tokens': []}
         
-        try:
-            # Create notification
-            notification = messaging.Notification(
+        # Create notification
+        notification = messaging.Notification(
+            title=title,
+            body=body
+        )
+        
+        # Create data payload if provided
+        data_payload = data if data else {}
+        
+        android_config = messaging.AndroidConfig(
+            ttl=3600,
+            priority='high',
+            notification=messaging.AndroidNotification(
                 title=title,
-                body=body
-            )
-            
-            # Create data payload if provided
-            data_payload = data if data else {}
-            
-            # Create multicast message
+                body=body,
+                icon='ic_notification',
+                color='#4CAF50',
+                sound='default',
+                click_action='FLUTTER_NOTIFICATION_CLICK',
+                channel_id='ecotrack_notifications'
+            ),
+            collapse_key='ecotrack_reminder',
+        )
+        
+        transport = cls.transport()
+        
+        def send_chunk(chunk):
             message = messaging.MulticastMessage(
                 notification=notification,
                 data=data_payload,
-                tokens=tokens,
-                android=messaging.AndroidConfig(
-                    ttl=3600,
-                    priority='high',
-                    notification=messaging.AndroidNotification(
-                        title=title,
-                        body=body,
-                        icon='ic_notification',
-                        color='#4CAF50',
-                        sound='default',
-                        click_action='FLUTTER_NOTIFICATION_CLICK',
-                        channel_id='ecotrack_notifications'
-                    ),
-                    collapse_key='ecotrack_reminder',
-                )
+                tokens=chunk,
+                android=android_config,
             )
-            
-            # Send multicast message
-            response = messaging.send_multicast(message)
+            with external_call('fcm', 'send_each_for_multicast'):
+                return transport.send_each_for_multicast(message)
+        
+        chunks = [tokens[start:start + FCM_BATCH_SIZE] for start in range(0, len(tokens), FCM_BATCH_SIZE)]
+        with ThreadPoolExecutor(max_workers=min(len(chunks), cls.max_concurrency())) as executor:
+            futures = [executor.submit(send_chunk, chunk) for chunk in chunks]
+        
+        success_count = 0
+        failed_tokens = []
+        unregistered_tokens = []
+        
+        for chunk, future in zip(chunks, futures):
+            try:
+                response = future.result()
+            except Exception as e:
+                logger.error(f"Failed to send multicast FCM batch of {len(chunk)}: {e}")
+                failed_tokens.extend(chunk)
+                continue
             
             # Process response
-            failed_tokens = []
+            success_count += response.success_count
             for i, resp in enumerate(response.responses):
                 if not resp.success:
-                    failed_tokens.append(tokens[i])
-                    logger.warning(f"Failed to send to token {tokens[i][:20]}...: {resp.exception}")
-            
-            result = {
-                'success_count': response.success_count,
-                'failure_count': response.failure_count,
-                'failed_tokens': failed_tokens
-            }
-            
-            logger.info(f"Multicast FCM sent. Success: {result['success_count']}, Failed: {result['failure_count']}")
-            return result
-            
-        except Exception as e:
-            logger.error(f"Failed to send multicast FCM notification: {e}")
-            return {'success_count': 0, 'failure_count': len(tokens), 'failed_tokens': tokens}
+                    failed_tokens.append(chunk[i])
+                    if isinstance(resp.exception, messaging.UnregisteredError):
+                        unregistered_tokens.append(chunk[i])
+                    logger.warning(f"Failed to send to token {chunk[i][:20]}...: {resp.exception}")
+        
+        count_fcm_messages(success_count, len(failed_tokens))
+        result = {
+            'success_count': success_count,
+            'failure_count': len(failed_tokens),
+            'failed_tokens': failed_tokens,
+            'unregistered_tokens': unregistered_tokens,
+        }
+        
+        logger.info(f"Multicast FCM sent. Success: {result['success_count']}, Failed: {result['failure_count']}")
+        return result
     
     @classmethod
     def send_to_topic(cls, topic: str, title: str, body: str, data: Optional[Dict] = None) -> bool:
@@ -228,7 +277,8 @@ class FCMService:
             )
             
             # Send message
-            response = messaging.send(message)
+            with external_call('fcm', 'send_to_topic'):
+                response = cls.transport().send(message)
             logger.info(f"FCM topic notification sent successfully. Response: {response}")
             return True
             
@@ -260,7 +310,8 @@ class FCMService:
             )
             
             # This will validate the token without actually sending
-            messaging.send(message, dry_run=True)
+            with external_call('fcm', 'validate_token'):
+                cls.transport().send(message, dry_run=True)
             return True
         except messaging.UnregisteredError:
             logger.warning("validate_token: Unregistered token")
@@ -295,7 +346,8 @@ class FCMService:
                 )
             )
             
-            response = messaging.send(message)
+            with external_call('fcm', 'send_data_message'):
+                response = cls.transport().send(message)
             logger.info(f"FCM data message sent successfully. Response: {response}")
             return True
             
@@ -318,7 +370,8 @@ class FCMService:
         cls.initialize()
         
         try:
-            response = messaging.subscribe_to_topic(tokens, topic)
+            with external_call('fcm', 'subscribe_to_topic'):
+                response = cls.transport().subscribe_to_topic(tokens, topic)
             logger.info(f"Subscribed {response.success_count} devices to topic '{topic}'")
             return {
                 'success_count': response.success_count,
@@ -343,7 +396,8 @@ class FCMService:
         cls.initialize()
         
         try:
-            response = messaging.unsubscribe_from_topic(tokens, topic)
+            with external_call('fcm', 'unsubscribe_from_topic'):
+                response = cls.transport().unsubscribe_from_topic(tokens, topic)
             logger.info(f"Unsubscribed {response.success_count} devices from topic '{topic}'")
             return {
                 'success_count': response.success_count,
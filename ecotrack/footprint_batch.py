@@ -0,0 +1,387 @@
+"""
+Batch version of calculate_personal_carbon_footprint, used to re-score stored
+surveys after an emission factor changes.
+
+Each survey is encoded once into numeric columns and integer codes for its
+categorical answers; every category is then computed as NumPy column operations
+over the whole batch. The operations are applied in the same order as the scalar
+helpers in utils.py, so results are identical to calling
+calculate_personal_carbon_footprint on each survey.
+
+rescore_footprints applies the batch calculator to the stored surveys whose
+footprint was computed with an older emission factor version; run it with the
+rescore_footprints management command.
+"""
+
+import time
+
+import numpy as np
+from django.db.models import F
+
+from .emission_factors import EmissionFactors, get_active_factors
+from .models import User
+from .utils import _get_numeric_input
+
+RECYCLING_MATERIALS = ["glass", "metal", "plastic", "paper"]
+
+# Errors calculate_personal_carbon_footprint raises on malformed answers (e.g. a
+# vehicle count of "nan"); the batch returns None for those surveys instead
+ENCODING_ERRORS = (AttributeError, OverflowError, TypeError, ValueError)
+
+
+class _Lookup:
+    """A FactorTable's answer codes, with its values as a NumPy array indexed by code."""
+
+    def __init__(self, table):
+        self.values = table.values
+        self.encode = table.code
+        self.array = np.array(table.values, dtype=np.float64)
+
+
+def _build_lookups(factors: EmissionFactors):
+    return {
+        name: _Lookup(getattr(factors, name))
+        for name in ('electricity', 'heating', 'vehicle', 'flight', 'diet', 'food_waste', 'food_packaging', 'shopping')
+    }
+
+
+# Survey keys, looked up once per survey
+HOUSEHOLD_SIZE_KEY = "how_many_people_are_in_your_household"
+ELECTRICITY_KEY = "how_much_electricity_does_your_household_use_per_month"
+HEATING_PERCENT_KEY = "what_percentage_of_your_monthly_electricity_consumption_do_you_think_is_used_for_heating"
+PUBLIC_TRANSPORT_KEY = "how_much_distance_do_you_commute_in_public_transport_per_week_on_average"
+WATER_KEY = "how_much_water_does_your_household_use_per_month_in_litres"
+VEHICLE_COUNT_KEY = "how_many_vehicles_are_in_your_household"
+FLIGHT_COUNT_KEY = "how_many_flights_have_you_taken_in_the_past_year"
+RECYCLING_KEYS = [f"do_you_recycle_the_following_check_all_that_apply_{material}" for material in RECYCLING_MATERIALS]
+
+
+class _EncodedBatch:
+    """Column-oriented encoding of a batch of surveys."""
+
+    def __init__(self, lookups, factors):
+        self.lookups = lookups
+        self.household_size_default = factors.household_size_default
+        self.rows = 0
+        self.household_size, self.electricity_kwh, self.heating_percent = [], [], []
+        self.electricity, self.heating, self.public_km_per_week = [], [], []
+        self.diet, self.food_waste, self.food_packaging, self.shopping = [], [], [], []
+        self.compost, self.water_litres, self.offset = [], [], []
+        self.recycled = [[] for _ in RECYCLING_KEYS]
+        # Vehicles and flights vary in number per survey: one entry per item, with the
+        # survey's row index and the item's position within the survey
+        self.vehicle_row, self.vehicle_pos, self.vehicle_code, self.vehicle_km = [], [], [], []
+        self.flight_row, self.flight_pos, self.flight_code = [], [], []
+
+    def add(self, data):
+        """
+        Encode one survey, with the same lookups and defaults as the scalar helpers.
+        Everything that can raise runs before the first append, so a malformed survey
+        leaves the batch unchanged.
+        """
+        lookups = self.lookups
+        get = data.get
+        household_size = max(1, int(_get_numeric_input(data, HOUSEHOLD_SIZE_KEY, self.household_size_default)))
+        electricity_kwh = _get_numeric_input(data, ELECTRICITY_KEY)
+        heating_percent = _get_numeric_input(data, HEATING_PERCENT_KEY)
+        electricity = lookups['electricity'].encode(get("is_your_electricity_from_renewable_sources", "No"))
+        heating = lookups['heating'].encode(get("what_is_your_primary_heating_source", "Natural Gas"))
+        public_km_per_week = _get_numeric_input(data, PUBLIC_TRANSPORT_KEY)
+        diet = lookups['diet'].encode(get("what_best_describes_your_diet", "Omnivore"))
+        food_waste = lookups['food_waste'].encode(get("how_much_food_do_you_waste", "Average"))
+        food_packaging = lookups['food_packaging'].encode(get("how_much_of_your_food_is_packaged_processed", "Average"))
+        shopping = lookups['shopping'].encode(
+            get("how_often_do_you_buy_new_clothes_electronics_or_appliances", "Sometimes"))
+        water_litres = _get_numeric_input(data, WATER_KEY)
+
+        vehicle_code = lookups['vehicle'].encode
+        vehicles = [
+            (vehicle_code(get(f"vehicle_{i}_type", "Gasoline")), _get_numeric_input(data, f"vehicle_{i}_mileage"))
+            for i in range(1, int(_get_numeric_input(data, VEHICLE_COUNT_KEY)) + 1)
+        ]
+        flight_code = lookups['flight'].encode
+        flights = [
+            flight_code(get(f"flight_{i}_type", "Short-haul (<3h)"))
+            for i in range(1, int(_get_numeric_input(data, FLIGHT_COUNT_KEY)) + 1)
+        ]
+
+        row = self.rows
+        self.household_size.append(household_size)
+        self.electricity_kwh.append(electricity_kwh)
+        self.heating_percent.append(heating_percent)
+        self.electricity.append(electricity)
+        self.heating.append(heating)
+        self.public_km_per_week.append(public_km_per_week)
+        self.diet.append(diet)
+        self.food_waste.append(food_waste)
+        self.food_packaging.append(food_packaging)
+        self.shopping.append(shopping)
+        self.compost.append(get("do_you_compost_food_waste") in ["Some", "All"])
+        self.water_litres.append(water_litres)
+        self.offset.append(get("do_you_offset_your_carbon_emissions") == "Yes")
+        for recycled, key in zip(self.recycled, RECYCLING_KEYS):
+            recycled.append(get(key) == "on")
+        for pos, (code, km) in enumerate(vehicles):
+            self.vehicle_row.append(row)
+            self.vehicle_pos.append(pos)
+            self.vehicle_code.append(code)
+            self.vehicle_km.append(km)
+        for pos, code in enumerate(flights):
+            self.flight_row.append(row)
+            self.flight_pos.append(pos)
+            self.flight_code.append(code)
+        self.rows += 1
+
+
+def _accumulate(rows, pos, terms, size):
+    """Sum per-item terms into their rows in item order, as the scalar loops do."""
+    total = np.zeros(size)
+    if len(rows):
+        for position in range(int(pos.max()) + 1):
+            selected = pos == position
+            target = rows[selected]
+            total[target] = total[target] + terms[selected]
+    return total
+
+
+class FootprintBatch:
+    """
+    Results of a batch calculation as NumPy columns, one entry per valid survey.
+    Use results() for the scalar function's dict format, or monthly_co2e_kg() when
+    only the headline number is needed.
+    """
+
+    def __init__(self, valid, household_size, breakdown, consumption_values, total_before_offset,
+                 total_after_offset, offsets_applied):
+        self.valid = valid
+        self.household_size = household_size
+        self.breakdown = breakdown
+        self.consumption_values = consumption_values
+        self.total_before_offset = total_before_offset
+        self.total_after_offset = total_after_offset
+        self.offsets_applied = offsets_applied
+
+    def _align(self, values):
+        """Spread per-valid-survey values over all input surveys, with None for malformed ones."""
+        values = iter(values)
+        return [next(values) if is_valid else None for is_valid in self.valid]
+
+    def monthly_co2e_kg(self):
+        """personal_monthly_co2e_kg for each input survey (None where malformed)."""
+        # Python's round(), not NumPy's, which rounds some halves differently
+        return self._align(round(value, 2) for value in self.total_after_offset.tolist())
+
+    def results(self):
+        """Full results for each input survey, in calculate_personal_carbon_footprint's format."""
+        breakdown_lists = {key: values.tolist() for key, values in self.breakdown.items()}
+        # Shopping multipliers keep their configured type (ints stay ints in the output)
+        breakdown_lists["consumption"] = self.consumption_values
+        total_before = self.total_before_offset.tolist()
+        total_after = self.total_after_offset.tolist()
+        offsets = self.offsets_applied.tolist()
+        sizes = self.household_size.tolist()
+
+        results = []
+        for i in range(len(total_after)):
+            row_breakdown = {key: values[i] for key, values in breakdown_lists.items()}
+            if total_before[i] == 0:
+                percent_breakdown = {k: "0.0%" for k in row_breakdown}
+            else:
+                percent_breakdown = {
+                    k: f"{(v / total_before[i] * 100):.1f}%" for k, v in row_breakdown.items()
+                }
+            results.append({
+                "summary": {
+                    "personal_monthly_co2e_kg": round(total_after[i], 2),
+                    "offsets_applied": offsets[i],
+                    "household_size_used": sizes[i],
+                },
+                "breakdown_kg_co2e": {k: round(v, 2) for k, v in row_breakdown.items()},
+                "category_percentages": percent_breakdown,
+            })
+        return self._align(results)
+
+
+def calculate_carbon_footprint_batch(surveys, factors: EmissionFactors = None):
+    """
+    Calculate calculate_personal_carbon_footprint for many surveys at once.
+
+    Args:
+        surveys: Iterable of survey answer dicts (as stored in User.user_data)
+        factors: Emission factors to score with (default: the active set)
+
+    Returns:
+        FootprintBatch: Surveys on which the scalar function would raise (malformed
+            answers) are marked invalid instead
+    """
+    factors = factors or get_active_factors()
+    lookups = _build_lookups(factors)
+    batch = _EncodedBatch(lookups, factors)
+    valid = []
+    for data in surveys:
+        try:
+            batch.add(data)
+            valid.append(True)
+        except ENCODING_ERRORS:
+            valid.append(False)
+    return _compute(batch, valid, lookups, factors)
+
+
+def calculate_carbon_footprints(surveys, factors: EmissionFactors = None):
+    """Batch equivalent of [calculate_personal_carbon_footprint(s) for s in surveys], with None for malformed surveys."""
+    return calculate_carbon_footprint_batch(surveys, factors).results()
+
+
+def _compute(batch, valid, lookups, factors):
+    n = batch.rows
+    household_size = np.array(batch.household_size, dtype=np.int64)
+    household_size_f = household_size.astype(np.float64)
+    electricity = np.array(batch.electricity, dtype=np.intp)
+    heating = np.array(batch.heating, dtype=np.intp)
+    diet_codes = np.array(batch.diet, dtype=np.intp)
+    food_waste = np.array(batch.food_waste, dtype=np.intp)
+    food_packaging = np.array(batch.food_packaging, dtype=np.intp)
+    shopping = np.array(batch.shopping, dtype=np.intp)
+    offset = np.array(batch.offset, dtype=bool)
+
+    with np.errstate(all='ignore'):
+        # Household energy
+        electricity_kwh = np.array(batch.electricity_kwh, dtype=np.float64)
+        electricity_emissions = electricity_kwh * lookups['electricity'].array[electricity]
+        heating_kwh_equivalent = electricity_kwh * (np.array(batch.heating_percent, dtype=np.float64) / 100)
+        household_energy = electricity_emissions + heating_kwh_equivalent * lookups['heating'].array[heating]
+
+        # Personal transportation
+        vehicle_terms = (
+            np.array(batch.vehicle_km, dtype=np.float64)
+            * lookups['vehicle'].array[np.array(batch.vehicle_code, dtype=np.intp)]
+        ) / factors.months_per_year
+        vehicle_emissions = _accumulate(
+            np.array(batch.vehicle_row, dtype=np.intp), np.array(batch.vehicle_pos, dtype=np.intp), vehicle_terms, n)
+        public_km_per_month = np.array(batch.public_km_per_week, dtype=np.float64) * factors.weeks_per_month
+        public_transport_emissions = public_km_per_month * factors.public_transport_per_km
+        flight_terms = (
+            lookups['flight'].array[np.array(batch.flight_code, dtype=np.intp)] * factors.flight_per_km
+        ) / factors.months_per_year
+        flight_emissions = _accumulate(
+            np.array(batch.flight_row, dtype=np.intp), np.array(batch.flight_pos, dtype=np.intp), flight_terms, n)
+        transportation = vehicle_emissions + public_transport_emissions + flight_emissions
+
+        # Personal diet
+        food_multiplier = lookups['food_waste'].array[food_waste] * lookups['food_packaging'].array[food_packaging]
+        diet = lookups['diet'].array[diet_codes] * food_multiplier
+
+        # Household waste
+        total_waste = factors.waste_per_person_per_day_kg * household_size_f * factors.days_per_month
+        diversion_rate = np.zeros(n)
+        for recycled in batch.recycled:
+            diversion_rate = diversion_rate + np.where(
+                np.array(recycled, dtype=bool), factors.recycling_diversion_per_item, 0.0)
+        diversion_rate = diversion_rate + np.where(
+            np.array(batch.compost, dtype=bool), factors.compost_diversion, 0.0)
+        household_waste = (total_waste * (1 - diversion_rate)) * factors.waste_landfill
+
+        consumption = lookups['shopping'].array[shopping]
+        household_water = np.array(batch.water_litres, dtype=np.float64) * factors.water_per_litre
+
+        breakdown = {
+            "home_energy": household_energy / household_size_f,
+            "transportation": transportation,
+            "diet": diet,
+            "waste": household_waste / household_size_f,
+            "consumption": consumption,
+            "water": household_water / household_size_f,
+        }
+
+        # Summed category by category, in the order sum(breakdown.values()) adds them
+        total_before_offset = np.zeros(n)
+        for values in breakdown.values():
+            total_before_offset = total_before_offset + values
+        offset_percent = np.where(offset, factors.offset_percentage, 0.0)
+        total_after_offset = total_before_offset * (1 - offset_percent)
+
+    shopping_values = lookups['shopping'].values
+    return FootprintBatch(
+        valid=valid,
+        household_size=household_size,
+        breakdown=breakdown,
+        consumption_values=[shopping_values[code] for code in batch.shopping],
+        total_before_offset=total_before_offset,
+        total_after_offset=total_after_offset,
+        offsets_applied=offset_percent > 0,
+    )
+
+
+def rescore_footprints(factors: EmissionFactors = None, stale_only=True, chunk_size=5000, dry_run=False,
+                       on_progress=None):
+    """
+    Recalculate carbon_footprint from answered surveys, streaming users in primary
+    key chunks and scoring each chunk with one batch calculation.
+
+    By default only footprints computed with a different factor version are scanned.
+    Changed users are written back per chunk with one bulk_update, which also bumps
+    their dashboard_version; unchanged ones only get the new footprint_factor_version.
+    Surveys the scalar calculator cannot score are skipped.
+
+    Args:
+        factors: Emission factors to score with (default: the active set)
+        stale_only: Skip users whose footprint_factor_version is already factors.version
+        chunk_size: Users loaded and written per batch
+        dry_run: Count changes without writing them
+        on_progress: Optional callable(scanned, updated, elapsed_seconds) called per chunk
+
+    Returns:
+        dict: version, scanned, updated, skipped and elapsed_seconds
+    """
+    factors = factors or get_active_factors()
+    users = User.objects.filter(survey_answered=True, survey_skipped=False)
+    if stale_only:
+        users = users.exclude(footprint_factor_version=factors.version)
+    users = users.only(
+        'id', 'user_data', 'carbon_footprint', 'dashboard_version', 'footprint_factor_version',
+    ).order_by('pk')
+
+    started = time.monotonic()
+    scanned = 0
+    updated = 0
+    skipped = 0
+    last_pk = 0
+
+    # Keyset chunks, as in daily_stats.recompute_achievements
+    while True:
+        chunk = list(users.filter(pk__gt=last_pk)[:chunk_size])
+        if not chunk:
+            break
+        last_pk = chunk[-1].pk
+        scanned += len(chunk)
+
+        totals = calculate_carbon_footprint_batch([user.user_data for user in chunk], factors).monthly_co2e_kg()
+        changed = []
+        restamped = []
+        for user, total in zip(chunk, totals):
+            if total is None:
+                skipped += 1
+            elif user.carbon_footprint != total:
+                user.carbon_footprint = total
+                user.footprint_factor_version = factors.version
+                user.dashboard_version = F('dashboard_version') + 1
+                changed.append(user)
+            elif user.footprint_factor_version != factors.version:
+                restamped.append(user.pk)
+
+        if not dry_run:
+            if changed:
+                User.objects.bulk_update(changed, ['carbon_footprint', 'footprint_factor_version', 'dashboard_version'])
+            if restamped:
+                User.objects.filter(pk__in=restamped).update(footprint_factor_version=factors.version)
+        updated += len(changed)
+        if on_progress:
+            on_progress(scanned, updated, time.monotonic() - started)
+
+    return {
+        'version': factors.version,
+        'scanned': scanned,
+        'updated': updated,
+        'skipped': skipped,
+        'elapsed_seconds': time.monotonic() - started,
+    }
@@ -0,0 +1,202 @@
+"""
+Gemini gateway for EcoTrack.
+Every LLM call in the app goes through LLMService, which shares one lazily created
+client (and its connection pool) per process, applies a per-call deadline, caps the
+number of calls in flight and trips a circuit breaker when Gemini keeps failing,
+so callers can serve their fallbacks instead of tying up workers.
+"""
+
+import json
+import logging
+import threading
+import time
+from typing import Optional
+
+from django.conf import settings
+from google import genai
+from google.genai import types
+
+from .metrics import external_call
+
+logger = logging.getLogger(__name__)
+
+GEMINI_MODEL = "gemini-2.5-flash"
+
+
+class LLMUnavailable(Exception):
+    """Raised when a Gemini call is rejected, times out or fails; callers should fall back."""
+
+
+class LLMService:
+    """Shared Gemini client with timeouts, a concurrency limit and a circuit breaker."""
+
+    _client = None
+    _semaphore = None
+    _lock = threading.Lock()
+
+    # Circuit breaker state: consecutive failures, and when the breaker opened
+    _failures = 0
+    _opened_at = None
+    _probe_in_flight = False
+
+    @classmethod
+    def timeout_seconds(cls) -> float:
+        """Deadline for a single Gemini call."""
+        return float(getattr(settings, 'LLM_TIMEOUT_SECONDS', 10))
+
+    @classmethod
+    def max_concurrency(cls) -> int:
+        """Maximum number of Gemini calls in flight per process."""
+        return max(1, int(getattr(settings, 'LLM_MAX_CONCURRENCY', 4)))
+
+    @classmethod
+    def queue_timeout_seconds(cls) -> float:
+        """How long a call may wait for a free slot before failing fast."""
+        return float(getattr(settings, 'LLM_QUEUE_TIMEOUT_SECONDS', 2))
+
+    @classmethod
+    def breaker_threshold(cls) -> int:
+        """Consecutive failures that open the circuit breaker."""
+        return max(1, int(getattr(settings, 'LLM_BREAKER_THRESHOLD', 5)))
+
+    @classmethod
+    def breaker_cooldown_seconds(cls) -> float:
+        """How long the breaker stays open before letting a probe call through."""
+        return float(getattr(settings, 'LLM_BREAKER_COOLDOWN_SECONDS', 30))
+
+    @classmethod
+    def get_client(cls):
+        """Return the shared client, creating it on first use."""
+        if getattr(settings, 'LLM_TRANSPORT', 'gemini') == 'fake':
+            from .fake_transports import fake_genai_client
+            return fake_genai_client
+        if cls._client is None:
+            with cls._lock:
+                if cls._client is None:
+                    try:
+                        cls._client = genai.Client(
+                            api_key=getattr(settings, 'GEMINI_API_KEY', None) or None,
+                            http_options=types.HttpOptions(timeout=int(cls.timeout_seconds() * 1000)),
+                        )
+                    except Exception as e:
+                        logger.error(f"Failed to create Gemini client: {e}")
+                        raise LLMUnavailable(f"Gemini client not configured: {e}") from e
+        return cls._client
+
+    @classmethod
+    def _get_semaphore(cls):
+        if cls._semaphore is None:
+            with cls._lock:
+                if cls._semaphore is None:
+                    cls._semaphore = threading.BoundedSemaphore(cls.max_concurrency())
+        return cls._semaphore
+
+    @classmethod
+    def is_available(cls) -> bool:
+        """False while the circuit breaker is open."""
+        with cls._lock:
+            if cls._opened_at is None:
+                return True
+            return time.monotonic() - cls._opened_at >= cls.breaker_cooldown_seconds() and not cls._probe_in_flight
+
+    @classmethod
+    def _before_call(cls):
+        """Reject the call while the breaker is open; after the cooldown let one probe through."""
+        with cls._lock:
+            if cls._opened_at is None:
+                return
+            if time.monotonic() - cls._opened_at < cls.breaker_cooldown_seconds() or cls._probe_in_flight:
+                raise LLMUnavailable("Gemini circuit breaker is open")
+            cls._probe_in_flight = True
+
+    @classmethod
+    def _record_success(cls):
+        with cls._lock:
+            if cls._opened_at is not None:
+                logger.info("Gemini recovered, closing circuit breaker")
+            cls._failures = 0
+            cls._opened_at = None
+            cls._probe_in_flight = False
+
+    @classmethod
+    def _record_failure(cls):
+        with cls._lock:
+            cls._failures += 1
+            cls._probe_in_flight = False
+            if cls._opened_at is not None or cls._failures >= cls.breaker_threshold():
+                if cls._opened_at is None:
+                    logger.warning(f"Opening Gemini circuit breaker after {cls._failures} consecutive failures")
+                cls._opened_at = time.monotonic()
+
+    @classmethod
+    def generate(cls, prompt: str, model: str = GEMINI_MODEL, timeout: Optional[float] = None) -> str:
+        """
+        Run one Gemini generate_content call.
+
+        Args:
+            prompt: Prompt text
+            model: Gemini model name
+            timeout: Deadline in seconds (default: settings.LLM_TIMEOUT_SECONDS)
+
+        Returns:
+            str: The response text
+
+        Raises:
+            LLMUnavailable: If the breaker is open, no slot frees up in time, or the call fails
+        """
+        cls._before_call()
+
+        semaphore = cls._get_semaphore()
+        if not semaphore.acquire(timeout=cls.queue_timeout_seconds()):
+            # Only release a probe slot; saturation is not a Gemini failure
+            with cls._lock:
+                cls._probe_in_flight = False
+            raise LLMUnavailable("Too many Gemini calls in flight")
+
+        try:
+            client = cls.get_client()
+            timeout_ms = int((timeout or cls.timeout_seconds()) * 1000)
+            with external_call('gemini', 'generate_content'):
+                response = client.models.generate_content(
+                    model=model,
+                    contents=prompt,
+                    config=types.GenerateContentConfig(http_options=types.HttpOptions(timeout=timeout_ms)),
+                )
+        except LLMUnavailable:
+            cls._record_failure()
+            raise
+        except Exception as e:
+            cls._record_failure()
+            logger.error(f"Gemini call failed: {e}")
+            raise LLMUnavailable(str(e)) from e
+        finally:
+            semaphore.release()
+
+        cls._record_success()
+        return (response.text or '').strip()
+
+    @classmethod
+    def generate_json(cls, prompt: str, model: str = GEMINI_MODEL, timeout: Optional[float] = None):
+        """
+        Run a Gemini call that should return JSON, tolerating text around a JSON array.
+
+        Returns:
+            The parsed value, or None if the response was not valid JSON
+
+        Raises:
+            LLMUnavailable: As for generate()
+        """
+        raw_text = cls.generate(prompt, model=model, timeout=timeout)
+        if not raw_text:
+            return None
+        try:
+            return json.loads(raw_text)
+        except json.JSONDecodeError:
+            start = raw_text.find("[")
+            end = raw_text.rfind("]")
+            if start != -1 and end != -1 and end > start:
+                try:
+                    return json.loads(raw_text[start : end + 1])
+                except json.JSONDecodeError:
+                    return None
+        return None
@@ -0,0 +1,316 @@
+"""
+Load-test harness for the Django endpoints that call FCM or Gemini.
+
+seed_load_test_data creates synthetic users (with survey answers and habits),
+Android devices due for a reminder this minute and communities with members, all
+named with LOAD_TEST_PREFIX so cleanup_load_test_data can remove them again.
+run_load_test then drives each endpoint from `concurrency` threads through the
+Django test client, with one logged-in client per synthetic user, and reports
+p50/p95/p99 latency and throughput per endpoint; run_dispatch times one
+run of the dispatch worker over the seeded devices.
+
+Only run it with the fake transports (FCM_TRANSPORT = LLM_TRANSPORT = 'fake'),
+which the load_test management command enforces.
+"""
+
+import json
+import math
+import queue
+import random
+import threading
+import time
+
+from django.contrib.auth.hashers import make_password
+from django.db import connection
+from django.test import Client
+from django.urls import reverse
+from django.utils import timezone
+
+from .benchmarks import generate_survey
+from .dispatch import new_lease_owner, send_daily_reminders
+from .fake_transports import fcm_unregistered_prefix
+from .models import AndroidDevice, Community, CommunityMembership, Habit, User
+
+LOAD_TEST_PREFIX = 'loadtest-'
+
+BULK_BATCH_SIZE = 1000
+
+HABIT_TEXTS = [
+    "Cycle to work",
+    "Eat a plant-based lunch",
+    "Carry a reusable bottle",
+    "Turn off standby devices",
+    "Take shorter showers",
+    "Buy local produce",
+]
+
+SUGGESTION_CATEGORIES = ["general", "food", "travel"]
+
+
+def cleanup_load_test_data():
+    """Delete every synthetic user and, through cascades, their devices, communities and messages."""
+    deleted, _ = User.objects.filter(username__startswith=LOAD_TEST_PREFIX).delete()
+    return deleted
+
+
+def seed_load_test_data(users=1000, devices_per_user=1, communities=20, members_per_community=50,
+                        unregistered_fraction=0.05, seed=0):
+    """
+    Replace any earlier synthetic data with a fresh data set.
+
+    User i is a member of community i % communities (so every user can post), plus
+    random members up to `members_per_community`. Every device is due this minute;
+    `unregistered_fraction` of them have tokens the fake FCM reports as unregistered.
+
+    Returns:
+        dict: Counts of the created users, habits, devices, communities and memberships
+    """
+    rng = random.Random(seed)
+    cleanup_load_test_data()
+
+    # One shared unusable password hash: hashing per user would dominate seeding
+    password = make_password(None)
+    User.objects.bulk_create(
+        [
+            User(
+                username=f'{LOAD_TEST_PREFIX}user-{i}',
+                email=f'{LOAD_TEST_PREFIX}user-{i}@example.com',
+                password=password,
+                survey_answered=True,
+                user_data=generate_survey(rng),
+            )
+            for i in range(users)
+        ],
+        batch_size=BULK_BATCH_SIZE,
+    )
+    user_ids = list(
+        User.objects.filter(username__startswith=LOAD_TEST_PREFIX).order_by('id').values_list('id', flat=True)
+    )
+
+    habits = [
+        Habit(user_id=user_id, text=text)
+        for user_id in user_ids
+        for text in rng.sample(HABIT_TEXTS, rng.randint(0, 2))
+    ]
+    Habit.objects.bulk_create(habits, batch_size=BULK_BATCH_SIZE)
+
+    due_at = timezone.now().replace(second=0, microsecond=0)
+    unregistered_prefix = fcm_unregistered_prefix()
+    devices = []
+    for user_id in user_ids:
+        for _ in range(devices_per_user):
+            n = len(devices)
+            token_prefix = unregistered_prefix if rng.random() < unregistered_fraction else ''
+            devices.append(AndroidDevice(
+                user_id=user_id,
+                fcm_token=f'{token_prefix}{LOAD_TEST_PREFIX}token-{n}',
+                device_id=f'{LOAD_TEST_PREFIX}device-{n}',
+                device_name=f'Load test device {n}',
+                next_fire_at=due_at,  # bulk_create skips save(), which would schedule it
+            ))
+    AndroidDevice.objects.bulk_create(devices, batch_size=BULK_BATCH_SIZE)
+
+    community_count = min(communities, len(user_ids))
+    Community.objects.bulk_create(
+        [
+            Community(
+                name=f'{LOAD_TEST_PREFIX}community-{i}',
+                description='Synthetic community for load tests',
+                creator_id=user_ids[i],
+                join_code=f'L{i:07d}',  # bulk_create skips save(), which would generate one
+            )
+            for i in range(community_count)
+        ],
+        batch_size=BULK_BATCH_SIZE,
+    )
+    community_ids = list(
+        Community.objects.filter(name__startswith=LOAD_TEST_PREFIX).order_by('id').values_list('id', flat=True)
+    )
+
+    members = {community_id: {} for community_id in community_ids}
+    for i, user_id in enumerate(user_ids):
+        if community_ids:
+            members[community_ids[i % len(community_ids)]][user_id] = 'member'
+    for i, community_id in enumerate(community_ids):
+        members[community_id][user_ids[i]] = 'admin'
+        extra = max(0, members_per_community - len(members[community_id]))
+        for user_id in rng.sample(user_ids, min(extra, len(user_ids))):
+            members[community_id].setdefault(user_id, 'member')
+
+    memberships = [
+        CommunityMembership(community_id=community_id, user_id=user_id, role=role)
+        for community_id, by_user in members.items()
+        for user_id, role in by_user.items()
+    ]
+    CommunityMembership.objects.bulk_create(memberships, batch_size=BULK_BATCH_SIZE)
+    for community_id, by_user in members.items():
+        Community.objects.filter(pk=community_id).update(member_count=len(by_user))
+
+    return {
+        'users': len(user_ids),
+        'habits': len(habits),
+        'devices': len(devices),
+        'communities': len(community_ids),
+        'memberships': len(memberships),
+    }
+
+
+class VirtualUser:
+    """A logged-in test client for one synthetic user."""
+
+    def __init__(self, user, community_ids):
+        self.client = Client(raise_request_exception=False)
+        self.client.force_login(user)
+        self.community_ids = community_ids
+
+
+def build_virtual_users(count):
+    """Log in the first `count` synthetic users."""
+    users = list(User.objects.filter(username__startswith=LOAD_TEST_PREFIX).order_by('id')[:count])
+    communities = {}
+    for user_id, community_id in CommunityMembership.objects.filter(
+        user__in=users, is_active=True,
+    ).values_list('user_id', 'community_id'):
+        communities.setdefault(user_id, []).append(community_id)
+    return [VirtualUser(user, communities.get(user.id, [])) for user in users]
+
+
+def _cron_dispatch(virtual_user, rng, cron_secret):
+    return virtual_user.client.get(reverse('cron_dispatch'), {'token': cron_secret})
+
+
+def _send_message(virtual_user, rng, cron_secret):
+    return virtual_user.client.post(
+        reverse('send_message'),
+        data=json.dumps({
+            'community_id': rng.choice(virtual_user.community_ids),
+            'content': f'Load test message {rng.randint(0, 1_000_000)}',
+        }),
+        content_type='application/json',
+    )
+
+
+def _get_suggestions(virtual_user, rng, cron_secret):
+    return virtual_user.client.post(
+        reverse('get_suggestions'),
+        data=json.dumps({'category': rng.choice(SUGGESTION_CATEGORIES)}),
+        content_type='application/json',
+    )
+
+
+def _get_user_data(virtual_user, rng, cron_secret):
+    return virtual_user.client.get(reverse('get_user_data'))
+
+
+ENDPOINTS = {
+    'cron_dispatch': _cron_dispatch,
+    'send_message': _send_message,
+    'get_suggestions': _get_suggestions,
+    'get_user_data': _get_user_data,
+}
+
+
+def percentile(sorted_values, fraction):
+    """Nearest-rank percentile of an already sorted list."""
+    if not sorted_values:
+        return None
+    rank = math.ceil(fraction * len(sorted_values))
+    return sorted_values[min(len(sorted_values), max(1, rank)) - 1]
+
+
+def summarize(latencies, errors, elapsed):
+    """Latency percentiles (ms) and throughput for one endpoint run."""
+    latencies = sorted(latencies)
+    requests = len(latencies)
+    return {
+        'requests': requests,
+        'errors': errors,
+        'seconds': round(elapsed, 3),
+        'throughput_rps': round(requests / elapsed, 1) if elapsed else None,
+        'p50_ms': round(percentile(latencies, 0.50) * 1000, 1) if latencies else None,
+        'p95_ms': round(percentile(latencies, 0.95) * 1000, 1) if latencies else None,
+        'p99_ms': round(percentile(latencies, 0.99) * 1000, 1) if latencies else None,
+    }
+
+
+def run_endpoint(name, virtual_users, requests, concurrency, cron_secret='', seed=0):
+    """
+    Send `requests` requests to one endpoint from `concurrency` threads. Each request
+    borrows a virtual user, so a client is never used by two threads at once.
+    Responses with status >= 400 (and exceptions) count as errors.
+    """
+    call = ENDPOINTS[name]
+    if name == 'send_message':
+        virtual_users = [virtual_user for virtual_user in virtual_users if virtual_user.community_ids]
+
+    available = queue.Queue()
+    for virtual_user in virtual_users:
+        available.put(virtual_user)
+
+    remaining = iter(range(requests))
+    remaining_lock = threading.Lock()
+    results_lock = threading.Lock()
+    latencies = []
+    errors = [0]
+
+    def worker(worker_index):
+        rng = random.Random(seed * 1000 + worker_index)
+        try:
+            while True:
+                with remaining_lock:
+                    if next(remaining, None) is None:
+                        return
+                virtual_user = available.get()
+                started = time.perf_counter()
+                try:
+                    response = call(virtual_user, rng, cron_secret)
+                    failed = response.status_code >= 400
+                except Exception:
+                    failed = True
+                finally:
+                    available.put(virtual_user)
+                duration = time.perf_counter() - started
+                with results_lock:
+                    latencies.append(duration)
+                    errors[0] += failed
+        finally:
+            connection.close()
+
+    threads = [threading.Thread(target=worker, args=(i,)) for i in range(max(1, concurrency))]
+    started = time.perf_counter()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    return summarize(latencies, errors[0], time.perf_counter() - started)
+
+
+def run_load_test(endpoints=None, virtual_user_count=200, requests=500, concurrency=16, cron_secret='',
+                  seed=0, on_result=None):
+    """
+    Run every endpoint in `endpoints` (default: all) in turn against the seeded data.
+
+    Returns:
+        dict: {endpoint: summary} as produced by summarize()
+    """
+    virtual_users = build_virtual_users(virtual_user_count)
+    results = {}
+    for name in endpoints or list(ENDPOINTS):
+        results[name] = run_endpoint(name, virtual_users, requests, concurrency, cron_secret, seed)
+        if on_result:
+            on_result(name, results[name])
+    return results
+
+
+def run_dispatch():
+    """Time one dispatch worker run over every device due now (the seeded ones included)."""
+    started = time.perf_counter()
+    result = send_daily_reminders(timezone.now(), owner=new_lease_owner())
+    elapsed = time.perf_counter() - started
+    return {
+        'devices': result['total_candidates'],
+        'sent': result['sent'],
+        'failed': result['failed'],
+        'seconds': round(elapsed, 3),
+        'devices_per_sec': round(result['total_candidates'] / elapsed, 1) if elapsed else None,
+    }
@@ -0,0 +1,104 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from ecotrack.benchmarks import (
+    CASES,
+    CASES_BY_NAME,
+    DEFAULT_THRESHOLD,
+    SIZES,
+    find_regressions,
+    load_results,
+    run_benchmarks,
+    save_results,
+)
+
+
+class Command(BaseCommand):
+    help = 'Benchmark the footprint, scoring and achievement engines on synthetic records (run before deploys)'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--case',
+            action='append',
+            choices=sorted(CASES_BY_NAME),
+            dest='cases',
+            help='Case to run (repeatable; default: all)',
+        )
+        parser.add_argument(
+            '--size',
+            action='append',
+            choices=list(SIZES),
+            dest='sizes',
+            help='Records per case: 1k, 100k or 1m (repeatable; default: 1k and 100k)',
+        )
+        parser.add_argument(
+            '--seed',
+            type=int,
+            default=0,
+            help='Seed for the synthetic record generators (default: 0)',
+        )
+        parser.add_argument(
+            '--repeat',
+            type=int,
+            default=3,
+            help='Timed runs per case up to 100k records; the best is kept (default: 3)',
+        )
+        parser.add_argument(
+            '--output',
+            help='Write the results as JSON to this path (e.g. to use as a later --baseline)',
+        )
+        parser.add_argument(
+            '--baseline',
+            help='JSON results of an earlier run; fail if any case got slower than --threshold allows',
+        )
+        parser.add_argument(
+            '--threshold',
+            type=float,
+            default=DEFAULT_THRESHOLD,
+            help=f'Allowed ops/sec drop against --baseline, as a fraction (default: {DEFAULT_THRESHOLD})',
+        )
+
+    def handle(self, *args, **options):
+        baseline = None
+        if options['baseline']:
+            try:
+                baseline = load_results(options['baseline'])
+            except (OSError, ValueError) as e:
+                raise CommandError(f"Could not read baseline {options['baseline']}: {e}")
+
+        descriptions = {case.name: case.description for case in CASES}
+
+        def report(name, size, result):
+            self.stdout.write(
+                f"  {name:<22} {size:>5}  {result['ops_per_sec']:>14,.0f} ops/s  "
+                f"{result['seconds']:>9.3f}s  peak {result['peak_kib']:>9,.1f} KiB  "
+                f"retained {result['retained_bytes_per_op']:>8,.1f} B/op"
+            )
+            if options['verbosity'] > 1:
+                self.stdout.write(f'      {descriptions[name]}')
+
+        results = run_benchmarks(
+            case_names=options['cases'],
+            sizes=options['sizes'] or ['1k', '100k'],
+            seed=options['seed'],
+            repeat=max(1, options['repeat']),
+            on_result=report,
+        )
+
+        if options['output']:
+            save_results(results, options['output'])
+            self.stdout.write(f"Results written to {options['output']}")
+
+        if baseline is None:
+            self.stdout.write(self.style.SUCCESS('Benchmarks finished'))
+            return
+
+        regressions = find_regressions(results, baseline, options['threshold'])
+        if regressions:
+            for name, size, ops, previous in regressions:
+                self.stderr.write(f'  {name} {size}: {ops:,.0f} ops/s, baseline {previous:,.0f} ops/s')
+            raise CommandError(
+                f"{len(regressions)} benchmark(s) regressed by more than {options['threshold']:.0%} against the baseline"
+            )
+        self.stdout.write(
+            self.style.SUCCESS(f"No regressions beyond {options['threshold']:.0%} against {options['baseline']}")
+        )
@@ -0,0 +1,123 @@
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+from ecotrack.fake_transports import fake_genai_client, fake_messaging
+from ecotrack.firebase_service import FCMService
+from ecotrack.load_test import (
+    ENDPOINTS,
+    cleanup_load_test_data,
+    run_dispatch,
+    run_load_test,
+    seed_load_test_data,
+)
+
+
+class Command(BaseCommand):
+    help = 'Load-test the FCM and Gemini backed endpoints with synthetic users against the fake transports'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--users', type=int, default=2000, help='Synthetic users to seed (default: 2000)')
+        parser.add_argument('--devices-per-user', type=int, default=1, help='Android devices per user (default: 1)')
+        parser.add_argument('--communities', type=int, default=50, help='Communities to seed (default: 50)')
+        parser.add_argument(
+            '--members-per-community',
+            type=int,
+            default=100,
+            help='Members per community, which sets the fan-out of each send_message (default: 100)',
+        )
+        parser.add_argument(
+            '--unregistered-fraction',
+            type=float,
+            default=0.05,
+            help='Share of device tokens the fake FCM reports as unregistered (default: 0.05)',
+        )
+        parser.add_argument(
+            '--endpoint',
+            action='append',
+            choices=list(ENDPOINTS),
+            dest='endpoints',
+            help='Endpoint to drive (repeatable; default: all)',
+        )
+        parser.add_argument('--requests', type=int, default=500, help='Requests per endpoint (default: 500)')
+        parser.add_argument('--concurrency', type=int, default=16, help='Concurrent request threads (default: 16)')
+        parser.add_argument(
+            '--clients',
+            type=int,
+            default=200,
+            help='Synthetic users logged in to send the requests (default: 200)',
+        )
+        parser.add_argument('--seed', type=int, default=0, help='Seed for the synthetic data (default: 0)')
+        parser.add_argument(
+            '--reuse-data',
+            action='store_true',
+            help='Use the synthetic data from an earlier --keep-data run instead of seeding',
+        )
+        parser.add_argument(
+            '--keep-data',
+            action='store_true',
+            help='Leave the synthetic users in the database afterwards',
+        )
+        parser.add_argument(
+            '--cleanup',
+            action='store_true',
+            help='Only delete synthetic data left by earlier runs',
+        )
+
+    def handle(self, *args, **options):
+        if options['cleanup']:
+            deleted = cleanup_load_test_data()
+            self.stdout.write(self.style.SUCCESS(f'Deleted {deleted} synthetic rows'))
+            return
+
+        # Never send thousands of real pushes or Gemini calls
+        if not FCMService.uses_fake_transport() or getattr(settings, 'LLM_TRANSPORT', 'gemini') != 'fake':
+            raise CommandError('Set FCM_TRANSPORT=fake and LLM_TRANSPORT=fake before running a load test')
+        cron_secret = getattr(settings, 'CRON_SECRET', '')
+        if not cron_secret:
+            raise CommandError('Set CRON_SECRET so the cron_dispatch endpoint can be called')
+
+        if not options['reuse_data']:
+            counts = seed_load_test_data(
+                users=options['users'],
+                devices_per_user=options['devices_per_user'],
+                communities=options['communities'],
+                members_per_community=options['members_per_community'],
+                unregistered_fraction=options['unregistered_fraction'],
+                seed=options['seed'],
+            )
+            self.stdout.write('Seeded ' + ', '.join(f'{count} {name}' for name, count in counts.items()))
+
+        self.stdout.write(
+            f"{'endpoint':<16} {'requests':>8} {'errors':>6} {'req/s':>9} "
+            f"{'p50 ms':>9} {'p95 ms':>9} {'p99 ms':>9}"
+        )
+
+        def report(name, result):
+            self.stdout.write(
+                f"{name:<16} {result['requests']:>8} {result['errors']:>6} {result['throughput_rps'] or 0:>9.1f} "
+                f"{result['p50_ms'] or 0:>9.1f} {result['p95_ms'] or 0:>9.1f} {result['p99_ms'] or 0:>9.1f}"
+            )
+
+        try:
+            run_load_test(
+                endpoints=options['endpoints'],
+                virtual_user_count=options['clients'],
+                requests=options['requests'],
+                concurrency=options['concurrency'],
+                cron_secret=cron_secret,
+                seed=options['seed'],
+                on_result=report,
+            )
+
+            dispatch = run_dispatch()
+            self.stdout.write(
+                f"dispatch worker: {dispatch['devices']} due devices in {dispatch['seconds']:.2f}s "
+                f"({dispatch['devices_per_sec'] or 0:,.0f}/s), {dispatch['sent']} sent, {dispatch['failed']} failed"
+            )
+            self.stdout.write(f'fake FCM: {fake_messaging.stats()}')
+            self.stdout.write(f'fake Gemini: {fake_genai_client.stats()}')
+        finally:
+            if not options['keep_data']:
+                cleanup_load_test_data()
+
+        self.stdout.write(self.style.SUCCESS('Load test finished'))
@@ -0,0 +1,22 @@
+from django.core.management.base import BaseCommand
+from django.db import DEFAULT_DB_ALIAS
+
+from ecotrack.search import ensure_search_indexes
+
+
+class Command(BaseCommand):
+    help = 'Re-create missing full-text search triggers and rebuild every search index from its table'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--database',
+            default=DEFAULT_DB_ALIAS,
+            help='Database to rebuild the indexes of (default: "default")',
+        )
+
+    def handle(self, *args, **options):
+        rebuilt = ensure_search_indexes(options['database'], rebuild=True)
+        if not rebuilt:
+            self.stdout.write('No full-text search indexes in this database (run migrate first on SQLite)')
+            return
+        self.stdout.write(self.style.SUCCESS(f"Rebuilt {', '.join(rebuilt)}"))
@@ -0,0 +1,49 @@
+from django.core.management.base import BaseCommand, CommandError
+from django.utils import timezone
+from django.utils.dateparse import parse_date
+
+from ecotrack.daily_stats import recompute_achievements, roll_over_daily_stats
+
+
+class Command(BaseCommand):
+    help = 'Recompute achievement unlocks and streak lapses for all users in bounded-memory chunks (run nightly)'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--since',
+            help='Only recompute users who joined or checked in on or after this date (YYYY-MM-DD)',
+        )
+        parser.add_argument(
+            '--chunk-size',
+            type=int,
+            default=2000,
+            help='Users loaded and written per batch (default: 2000)',
+        )
+
+    def handle(self, *args, **options):
+        since = None
+        if options['since']:
+            since = parse_date(options['since'])
+            if since is None:
+                raise CommandError('--since must be a date in YYYY-MM-DD format')
+
+        verbosity = options['verbosity']
+
+        def report(scanned, updated, elapsed):
+            if verbosity > 1:
+                rate = scanned / elapsed if elapsed else 0
+                self.stdout.write(f'  {scanned} users scanned, {updated} updated ({rate:,.0f} users/s)')
+
+        # Achievements first: they are earned from the stored streak and daily count,
+        # which the rollover below may then reset
+        result = recompute_achievements(since=since, chunk_size=options['chunk_size'], on_progress=report)
+        lapsed = roll_over_daily_stats(timezone.localdate())
+
+        elapsed = result['elapsed_seconds']
+        rate = result['scanned'] / elapsed if elapsed else 0
+        self.stdout.write(
+            self.style.SUCCESS(
+                f"Scanned {result['scanned']} users in {elapsed:.2f}s ({rate:,.0f} users/s): "
+                f"{result['updated']} unlocked new achievements, {lapsed} streaks/daily counts rolled over"
+            )
+        )
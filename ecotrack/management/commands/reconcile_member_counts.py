@@ -0,0 +1,41 @@
+from django.core.management.base import BaseCommand
+
+from ecotrack.memberships import reconcile_member_counts
+
+
+class Command(BaseCommand):
+    help = 'Repair Community.member_count values that drifted from the active memberships (run periodically)'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--chunk-size',
+            type=int,
+            default=2000,
+            help='Communities checked per batch (default: 2000)',
+        )
+        parser.add_argument(
+            '--dry-run',
+            action='store_true',
+            help='Report how many counters drifted without fixing them',
+        )
+
+    def handle(self, *args, **options):
+        verbosity = options['verbosity']
+
+        def report(scanned, drifted, elapsed):
+            if verbosity > 1:
+                self.stdout.write(f'  {scanned} communities checked, {drifted} drifted ({elapsed:.2f}s)')
+
+        result = reconcile_member_counts(
+            chunk_size=options['chunk_size'],
+            dry_run=options['dry_run'],
+            on_progress=report,
+        )
+
+        verb = 'drifted' if options['dry_run'] else 'repaired'
+        self.stdout.write(
+            self.style.SUCCESS(
+                f"Checked {result['scanned']} communities in {result['elapsed_seconds']:.2f}s: "
+                f"{result['drifted']} member counts {verb}"
+            )
+        )
@@ -0,0 +1,59 @@
+from django.core.management.base import BaseCommand
+
+from ecotrack.reminder_copy import add_copy, fresh_copy_count, generate_copy_batch, schedule_copy
+
+
+class Command(BaseCommand):
+    help = 'Generate reminder copy with Gemini and schedule a line for each upcoming day (run off-peak)'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--days',
+            type=int,
+            default=14,
+            help='Number of upcoming days to schedule, and unused lines to keep in reserve (default: 14)',
+        )
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=10,
+            help='Lines requested per Gemini call (default: 10)',
+        )
+        parser.add_argument(
+            '--max-requests',
+            type=int,
+            default=5,
+            help='Maximum Gemini calls per run (default: 5)',
+        )
+
+    def handle(self, *args, **options):
+        days = options['days']
+        batch_size = options['batch_size']
+        max_requests = options['max_requests']
+
+        added = 0
+        requests_made = 0
+        while fresh_copy_count() < days and requests_made < max_requests:
+            requests_made += 1
+            try:
+                lines = generate_copy_batch(batch_size)
+            except Exception as e:
+                self.stdout.write(self.style.ERROR(f'Failed to generate reminder copy: {e}'))
+                break
+            added += add_copy(lines)
+
+        unfilled = schedule_copy(days)
+
+        self.stdout.write(
+            self.style.SUCCESS(
+                f'Added {added} new lines with {requests_made} Gemini requests; '
+                f'{fresh_copy_count()} unused lines in reserve'
+            )
+        )
+        if unfilled:
+            self.stdout.write(
+                self.style.WARNING(
+                    f'{len(unfilled)} days have no reminder copy and will use the fallback message: '
+                    + ', '.join(day.isoformat() for day in unfilled)
+                )
+            )
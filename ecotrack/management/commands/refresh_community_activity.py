@@ -0,0 +1,31 @@
+from django.core.management.base import BaseCommand
+
+from ecotrack.discovery import ACTIVITY_WINDOW_DAYS, refresh_activity_scores
+
+
+class Command(BaseCommand):
+    help = 'Recompute the activity scores that rank public community discovery (run hourly or nightly)'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--chunk-size',
+            type=int,
+            default=2000,
+            help='Communities scored and written per batch (default: 2000)',
+        )
+
+    def handle(self, *args, **options):
+        verbosity = options['verbosity']
+
+        def report(scanned, updated, elapsed):
+            if verbosity > 1:
+                self.stdout.write(f'  {scanned} communities scored, {updated} changed ({elapsed:.2f}s)')
+
+        result = refresh_activity_scores(chunk_size=options['chunk_size'], on_progress=report)
+
+        self.stdout.write(
+            self.style.SUCCESS(
+                f"Scored {result['scanned']} communities on the last {ACTIVITY_WINDOW_DAYS} days "
+                f"in {result['elapsed_seconds']:.2f}s: {result['updated']} scores changed"
+            )
+        )
@@ -0,0 +1,51 @@
+from django.core.management.base import BaseCommand
+
+from ecotrack.footprint_batch import rescore_footprints
+
+
+class Command(BaseCommand):
+    help = 'Recalculate stored carbon footprints computed with an older emission factor version, in batches'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--all',
+            action='store_true',
+            help='Rescore every answered survey, not just those computed with an older factor version',
+        )
+        parser.add_argument(
+            '--chunk-size',
+            type=int,
+            default=5000,
+            help='Users loaded, scored and written per batch (default: 5000)',
+        )
+        parser.add_argument(
+            '--dry-run',
+            action='store_true',
+            help='Report how many footprints would change without writing them',
+        )
+
+    def handle(self, *args, **options):
+        verbosity = options['verbosity']
+
+        def report(scanned, updated, elapsed):
+            if verbosity > 1:
+                rate = scanned / elapsed if elapsed else 0
+                self.stdout.write(f'  {scanned} users scanned, {updated} changed ({rate:,.0f} users/s)')
+
+        result = rescore_footprints(
+            stale_only=not options['all'],
+            chunk_size=options['chunk_size'],
+            dry_run=options['dry_run'],
+            on_progress=report,
+        )
+
+        elapsed = result['elapsed_seconds']
+        rate = result['scanned'] / elapsed if elapsed else 0
+        verb = 'would change' if options['dry_run'] else 'changed'
+        self.stdout.write(
+            self.style.SUCCESS(
+                f"Scored {result['scanned']} surveys with emission factors v{result['version']} in {elapsed:.2f}s "
+                f"({rate:,.0f} users/s): {result['updated']} footprints {verb}, "
+                f"{result['skipped']} malformed surveys skipped"
+            )
+        )
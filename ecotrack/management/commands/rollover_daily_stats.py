@@ -0,0 +1,17 @@
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+
+from ecotrack.daily_stats import roll_over_daily_stats
+
+
+class Command(BaseCommand):
+    help = "Persist the daily reset of lapsed streaks and habits_today in one UPDATE (run nightly, after midnight)"
+
+    def handle(self, *args, **options):
+        today = timezone.localdate()
+
+        # get_user_data already derives these values at read time; this only brings
+        # the stored columns in line, touching rows that actually change
+        updated = roll_over_daily_stats(today)
+
+        self.stdout.write(self.style.SUCCESS(f'Rolled over daily stats for {updated} users ({today})'))
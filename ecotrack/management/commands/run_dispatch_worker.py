@@ -0,0 +1,60 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from ecotrack.dispatch import claim_next_job, run_dispatch_job
+
+
+class Command(BaseCommand):
+    help = 'Drain queued daily reminder dispatch jobs (enqueued by /api/cron/dispatch)'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--once',
+            action='store_true',
+            help='Process the jobs currently queued and exit instead of polling forever',
+        )
+        parser.add_argument(
+            '--poll-interval',
+            type=float,
+            default=5.0,
+            help='Seconds to wait between queue checks when idle (default: 5)',
+        )
+
+    def handle(self, *args, **options):
+        once = options['once']
+        poll_interval = options['poll_interval']
+
+        self.stdout.write(self.style.SUCCESS('Dispatch worker started'))
+
+        while True:
+            job = claim_next_job()
+
+            if job is None:
+                if once:
+                    break
+                time.sleep(poll_interval)
+                continue
+
+            started = time.monotonic()
+            try:
+                result = run_dispatch_job(job)
+            except Exception as e:
+                self.stdout.write(
+                    self.style.ERROR(f'Dispatch for {job.scheduled_for:%Y-%m-%d %H:%M} UTC failed: {e}')
+                )
+                continue
+
+            self.stdout.write(
+                self.style.SUCCESS(
+                    f'Dispatch for {job.scheduled_for:%Y-%m-%d %H:%M} UTC: '
+                    f'{result["sent"]} sent, {result["failed"]} failed '
+                    f'of {result["total_candidates"]} in {time.monotonic() - started:.2f}s'
+                )
+            )
+
+            # Nothing left to claim: the rest of the cohort is leased to other workers
+            if not result['total_candidates']:
+                if once:
+                    break
+                time.sleep(poll_interval)
@@ -0,0 +1,59 @@
+from datetime import timedelta
+
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+
+from ecotrack.caching import habits_fingerprint
+from ecotrack.models import DailyQuestionSet, User
+from ecotrack.questions import generate_questions, store_questions
+
+
+class Command(BaseCommand):
+    help = "Pre-generate today's check-in questions for users who checked in yesterday (run nightly, after midnight)"
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--keep-days',
+            type=int,
+            default=2,
+            help='Delete question sets older than this many days (default: 2)',
+        )
+
+    def handle(self, *args, **options):
+        today = timezone.localdate()
+        yesterday = today - timedelta(days=1)
+
+        deleted, _ = DailyQuestionSet.objects.filter(
+            date__lt=today - timedelta(days=options['keep_days']),
+        ).delete()
+
+        already_warm = DailyQuestionSet.objects.filter(date=today).values_list('user_id', flat=True)
+        users = User.objects.filter(last_checkin=yesterday).exclude(id__in=already_warm).prefetch_related('habits')
+
+        # Users with equivalent habits get the same questions, so generate once per habit set
+        questions_by_fingerprint = {}
+        warmed = 0
+        failed = 0
+        for user in users.iterator(chunk_size=500):
+            habits = user.habit_list()
+            fingerprint = habits_fingerprint(habits)
+            if fingerprint not in questions_by_fingerprint:
+                try:
+                    questions_by_fingerprint[fingerprint] = generate_questions(habits)
+                except Exception as e:
+                    self.stdout.write(self.style.ERROR(f'Failed to generate questions for {user.id}: {e}'))
+                    questions_by_fingerprint[fingerprint] = None
+
+            questions = questions_by_fingerprint[fingerprint]
+            if questions is None:
+                failed += 1
+                continue
+            store_questions(user, questions, today)
+            warmed += 1
+
+        self.stdout.write(
+            self.style.SUCCESS(
+                f'Warmed {warmed} question sets for {today} with {len(questions_by_fingerprint)} Gemini requests; '
+                f'{failed} failed, {deleted} old sets deleted'
+            )
+        )
@@ -0,0 +1,119 @@
+"""
+Community membership changes and the denormalized Community.member_count.
+
+Joins and leaves flip CommunityMembership.is_active with a conditional UPDATE and
+adjust member_count with an F() expression in the same transaction, so the
+counter moves exactly once per actual change, even when two requests race.
+reconcile_member_counts repairs drift from writes that bypass these helpers
+(the admin, cascading user deletes) and should run periodically.
+"""
+
+import time
+
+from django.db import transaction
+from django.db.models import Count, F, OuterRef, Q, Subquery, Value
+from django.db.models.functions import Coalesce
+
+from .models import Community, CommunityMembership
+
+
+def add_member(community, user, role='member'):
+    """
+    Make `user` an active member of `community`, reactivating an earlier membership.
+
+    Returns:
+        tuple: (membership, joined) where joined is False if the user was already an active member
+    """
+    with transaction.atomic():
+        membership, created = CommunityMembership.objects.get_or_create(
+            community=community,
+            user=user,
+            defaults={'role': role, 'is_active': True},
+        )
+        joined = created or CommunityMembership.objects.filter(
+            pk=membership.pk, is_active=False,
+        ).update(is_active=True) == 1
+        if joined:
+            membership.is_active = True
+            Community.objects.filter(pk=community.pk).update(member_count=F('member_count') + 1)
+    return membership, joined
+
+
+def remove_member(membership):
+    """
+    Deactivate `membership`.
+
+    Returns:
+        bool: False if it was already inactive
+    """
+    with transaction.atomic():
+        left = CommunityMembership.objects.filter(pk=membership.pk, is_active=True).update(is_active=False) == 1
+        if left:
+            membership.is_active = False
+            Community.objects.filter(pk=membership.community_id, member_count__gt=0).update(
+                member_count=F('member_count') - 1
+            )
+    return left
+
+
+def _active_member_count():
+    """Correlated subquery counting the outer community's active memberships."""
+    return Coalesce(
+        Subquery(
+            CommunityMembership.objects.filter(community=OuterRef('pk'), is_active=True)
+            .order_by()
+            .values('community')
+            .annotate(count=Count('pk'))
+            .values('count')
+        ),
+        Value(0),
+    )
+
+
+def reconcile_member_counts(chunk_size=2000, dry_run=False, on_progress=None):
+    """
+    Compare every community's member_count with its active memberships, in
+    primary key chunks, and rewrite the ones that drifted.
+
+    The fix is a single UPDATE per chunk that recounts inside the statement, so a
+    join or leave committed between the check and the write is not lost.
+
+    Args:
+        chunk_size: Communities checked per batch
+        dry_run: Count drifted communities without writing them
+        on_progress: Optional callable(scanned, drifted, elapsed_seconds) called per chunk
+
+    Returns:
+        dict: scanned, drifted and elapsed_seconds
+    """
+    communities = Community.objects.order_by('pk').annotate(
+        actual_member_count=Count('memberships', filter=Q(memberships__is_active=True)),
+    )
+
+    started = time.monotonic()
+    scanned = 0
+    drifted = 0
+    last_pk = 0
+
+    # Keyset chunks, as in daily_stats.recompute_achievements
+    while True:
+        chunk = list(
+            communities.filter(pk__gt=last_pk).values_list('pk', 'member_count', 'actual_member_count')[:chunk_size]
+        )
+        if not chunk:
+            break
+        last_pk = chunk[-1][0]
+        scanned += len(chunk)
+
+        stale = [pk for pk, stored, actual in chunk if stored != actual]
+        if stale and not dry_run:
+            Community.objects.filter(pk__in=stale).update(member_count=_active_member_count())
+        drifted += len(stale)
+        if on_progress:
+            on_progress(scanned, drifted, time.monotonic() - started)
+
+    return {
+        'scanned': scanned,
+        'drifted': drifted,
+        'elapsed_seconds': time.monotonic() - started,
+    }
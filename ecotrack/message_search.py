@@ -0,0 +1,112 @@
+"""
+Full-text search over one community's messages.
+
+Matching runs entirely inside the MESSAGE_INDEX FTS5 table: the community id is
+an indexed column, so the query intersects that community's posting list with
+the search terms' and never scans other communities' matches. Results are
+keyset-paginated in one of two orders:
+
+- 'relevance': bm25 rank, then id. FTS5 scores every match to sort them, so
+  cost grows with the number of matches.
+- 'recent': newest first, walking the index by rowid, so each page costs about
+  the same however many messages match.
+
+On database backends without FTS5 the search falls back to icontains lookups
+in 'recent' order.
+"""
+
+from django.db import connections
+
+from .models import CommunityMessage
+from .search import MESSAGE_INDEX, fts_supported, scoped_match_expression, search_filter
+
+ORDERS = ('relevance', 'recent')
+
+# Results per page (?limit= may ask for up to MAX_PAGE_SIZE)
+PAGE_SIZE = 20
+MAX_PAGE_SIZE = 50
+
+
+def format_cursor(order, message_id, score=None):
+    if order == 'relevance':
+        return f'{score!r}:{message_id}'
+    return str(message_id)
+
+
+def parse_cursor(order, cursor):
+    """(score, id) for 'relevance' cursors, (None, id) for 'recent' ones; raises ValueError if malformed."""
+    if order == 'relevance':
+        score, _, message_id = cursor.rpartition(':')
+        return float(score), int(message_id)
+    return None, int(cursor)
+
+
+def _matching_ids(connection, community_id, text, order, cursor, limit):
+    """[(message_id, score)] of one page, straight from the FTS5 index."""
+    expression = scoped_match_expression(MESSAGE_INDEX, community_id, text)
+    if expression is None:
+        return []
+    score_after, id_after = parse_cursor(order, cursor) if cursor else (None, None)
+
+    if order == 'relevance':
+        sql = (
+            f'SELECT rowid, score FROM ('
+            f'SELECT rowid, {MESSAGE_INDEX.bm25()} AS score FROM {MESSAGE_INDEX.name} '
+            f'WHERE {MESSAGE_INDEX.name} MATCH %s)'
+        )
+        params = [expression]
+        if cursor:
+            sql += ' WHERE score > %s OR (score = %s AND rowid > %s)'
+            params += [score_after, score_after, id_after]
+        sql += ' ORDER BY score, rowid LIMIT %s'
+    else:
+        sql = f'SELECT rowid, NULL FROM {MESSAGE_INDEX.name} WHERE {MESSAGE_INDEX.name} MATCH %s'
+        params = [expression]
+        if cursor:
+            sql += ' AND rowid < %s'
+            params.append(id_after)
+        sql += ' ORDER BY rowid DESC LIMIT %s'
+    params.append(limit)
+
+    with connection.cursor() as db_cursor:
+        db_cursor.execute(sql, params)
+        return db_cursor.fetchall()
+
+
+def search_messages(community_id, text, order='relevance', cursor=None, limit=None):
+    """
+    One page of a community's messages matching every term of `text` as a word prefix.
+
+    Args:
+        community_id (int): Community to search
+        text (str): Search text
+        order (str): 'relevance' or 'recent'
+        cursor (str, optional): next_cursor of the previous page for the same search and order
+        limit (int, optional): Results per page (default PAGE_SIZE, at most MAX_PAGE_SIZE)
+
+    Returns:
+        tuple: ([(message, score)], next_cursor); score is None in 'recent' order and
+        next_cursor is None on the last page
+
+    Raises:
+        ValueError: If the order or cursor is malformed
+    """
+    if order not in ORDERS:
+        raise ValueError(f'order must be one of {", ".join(ORDERS)}')
+    limit = min(max(limit or PAGE_SIZE, 1), MAX_PAGE_SIZE)
+    messages = CommunityMessage.objects.filter(community_id=community_id).select_related('sender')
+    connection = connections[messages.db]
+
+    if fts_supported(connection):
+        rows = _matching_ids(connection, community_id, text, order, cursor, limit + 1)
+    else:
+        order = 'recent'
+        matches = search_filter(messages, MESSAGE_INDEX, text)
+        if cursor:
+            matches = matches.filter(pk__lt=parse_cursor(order, cursor)[1])
+        rows = [(message_id, None) for message_id in matches.order_by('-pk').values_list('pk', flat=True)[:limit + 1]]
+
+    next_cursor = format_cursor(order, *rows[limit - 1]) if len(rows) > limit else None
+    by_id = messages.in_bulk([message_id for message_id, _ in rows[:limit]])
+    page = [(by_id[message_id], score) for message_id, score in rows[:limit] if message_id in by_id]
+    return page, next_cursor
@@ -0,0 +1,173 @@
+"""
+In-process request and external-call metrics, exposed in the Prometheus text format.
+
+MetricsMiddleware records per-view latency and database query counts/time;
+FCMService and LLMService wrap their network calls in external_call(). Every
+update is a dict lookup and a few integer additions under one lock, cheap enough
+to leave on in production. Values are per process: scrape every worker, or let
+Prometheus sum them.
+"""
+
+import bisect
+import threading
+import time
+from contextlib import contextmanager
+
+from django.conf import settings
+
+# Upper bounds (seconds) of the latency histogram buckets
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+
+# Upper bounds of the per-request query count buckets
+QUERY_COUNT_BUCKETS = (0, 1, 2, 5, 10, 20, 50, 100, 200)
+
+
+def metrics_enabled() -> bool:
+    return bool(getattr(settings, 'METRICS_ENABLED', True))
+
+
+class Histogram:
+    """A Prometheus histogram with one series per label tuple."""
+
+    def __init__(self, name, help_text, label_names, buckets):
+        self.name = name
+        self.help_text = help_text
+        self.label_names = label_names
+        self.buckets = buckets
+        self._series = {}  # labels -> [bucket counts..., +Inf count, sum]
+
+    def observe(self, labels, value):
+        series = self._series.get(labels)
+        if series is None:
+            series = self._series[labels] = [0] * (len(self.buckets) + 1) + [0.0]
+        series[bisect.bisect_left(self.buckets, value)] += 1
+        series[-1] += value
+
+    def render(self):
+        lines = [f'# HELP {self.name} {self.help_text}', f'# TYPE {self.name} histogram']
+        for labels, series in sorted(self._series.items()):
+            label_text = _label_text(self.label_names, labels)
+            cumulative = 0
+            for bound, count in zip(self.buckets, series):
+                cumulative += count
+                lines.append(f'{self.name}_bucket{{{label_text}le="{bound}"}} {cumulative}')
+            cumulative += series[len(self.buckets)]
+            lines.append(f'{self.name}_bucket{{{label_text}le="+Inf"}} {cumulative}')
+            lines.append(f'{self.name}_sum{{{label_text.rstrip(",")}}} {series[-1]}')
+            lines.append(f'{self.name}_count{{{label_text.rstrip(",")}}} {cumulative}')
+        return lines
+
+
+class Counter:
+    """A Prometheus counter with one series per label tuple."""
+
+    def __init__(self, name, help_text, label_names):
+        self.name = name
+        self.help_text = help_text
+        self.label_names = label_names
+        self._series = {}
+
+    def inc(self, labels, amount=1):
+        self._series[labels] = self._series.get(labels, 0) + amount
+
+    def render(self):
+        lines = [f'# HELP {self.name} {self.help_text}', f'# TYPE {self.name} counter']
+        for labels, value in sorted(self._series.items()):
+            lines.append(f'{self.name}{{{_label_text(self.label_names, labels).rstrip(",")}}} {value}')
+        return lines
+
+
+def _escape(value):
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+def _label_text(names, values):
+    """`name="value",` pairs, with a trailing comma so `le` can follow."""
+    return ''.join(f'{name}="{_escape(value)}",' for name, value in zip(names, values))
+
+
+_lock = threading.Lock()
+
+request_duration = Histogram(
+    'ecotrack_http_request_duration_seconds', 'Request latency by view, method and status class.',
+    ('view', 'method', 'status'), LATENCY_BUCKETS,
+)
+request_queries = Histogram(
+    'ecotrack_http_request_db_queries', 'Database queries per request by view.',
+    ('view',), QUERY_COUNT_BUCKETS,
+)
+request_db_seconds = Counter(
+    'ecotrack_http_request_db_seconds_total', 'Time spent in database queries by view.', ('view',),
+)
+external_duration = Histogram(
+    'ecotrack_external_call_duration_seconds', 'Duration of calls to external services (FCM, Gemini).',
+    ('service', 'operation'), LATENCY_BUCKETS,
+)
+external_errors = Counter(
+    'ecotrack_external_call_errors_total', 'External service calls that raised, by exception type.',
+    ('service', 'operation', 'error'),
+)
+fcm_messages = Counter(
+    'ecotrack_fcm_messages_total', 'FCM messages by delivery result.', ('result',),
+)
+
+query_budget_exceeded = Counter(
+    'ecotrack_query_budget_exceeded_total', 'Requests that ran more queries than their view\'s query_budget.',
+    ('view',),
+)
+
+REGISTRY = [
+    request_duration, request_queries, request_db_seconds, external_duration, external_errors, fcm_messages,
+    query_budget_exceeded,
+]
+
+
+def observe_request(view, method, status_code, duration, query_count, query_seconds):
+    labels = (view, method, f'{status_code // 100}xx')
+    with _lock:
+        request_duration.observe(labels, duration)
+        request_queries.observe((view,), query_count)
+        request_db_seconds.inc((view,), query_seconds)
+
+
+def count_fcm_messages(sent, failed):
+    with _lock:
+        if sent:
+            fcm_messages.inc(('sent',), sent)
+        if failed:
+            fcm_messages.inc(('failed',), failed)
+
+
+def count_query_budget_exceeded(view):
+    with _lock:
+        query_budget_exceeded.inc((view,))
+
+
+@contextmanager
+def external_call(service, operation):
+    """Time the block as one call to `service`, counting it as an error if it raises."""
+    started = time.perf_counter()
+    try:
+        yield
+    except Exception as e:
+        with _lock:
+            external_errors.inc((service, operation, type(e).__name__))
+        raise
+    finally:
+        duration = time.perf_counter() - started
+        with _lock:
+            external_duration.observe((service, operation), duration)
+
+
+def render_prometheus():
+    """Every metric in the Prometheus text exposition format."""
+    with _lock:
+        lines = [line for metric in REGISTRY for line in metric.render()]
+    return '\n'.join(lines) + '\n'
+
+
+def reset():
+    """Drop every recorded series (for tests and benchmarks)."""
+    with _lock:
+        for metric in REGISTRY:
+            metric._series.clear()
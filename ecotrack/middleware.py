@@ -0,0 +1,101 @@
+"""
+Request timing middleware feeding ecotrack.metrics.
+"""
+
+import time
+from contextvars import ContextVar
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.core.exceptions import MiddlewareNotUsed
+from django.db import connection
+
+from . import metrics
+
+
+class QueryTimer:
+    """connection.execute_wrapper that counts and times the queries it wraps."""
+
+    __slots__ = ('count', 'seconds')
+
+    def __init__(self):
+        self.count = 0
+        self.seconds = 0.0
+
+    def __call__(self, execute, sql, params, many, context):
+        started = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.seconds += time.perf_counter() - started
+            self.count += 1
+
+
+# QueryTimer of the ASGI request being handled in the current context
+_async_request_queries = ContextVar('ecotrack_async_request_queries', default=None)
+
+
+def _count_async_request_queries(execute, sql, params, many, context):
+    queries = _async_request_queries.get()
+    if queries is None:
+        return execute(sql, params, many, context)
+    return queries(execute, sql, params, many, context)
+
+
+def install_async_query_timer(sender, connection, **kwargs):
+    """
+    connection_created receiver. Under ASGI the ORM runs on a worker thread whose
+    connection the middleware cannot reach, so every connection carries this
+    wrapper and counts into the QueryTimer of the request whose context (which
+    sync_to_async carries over to the thread) it runs in.
+    """
+    if _count_async_request_queries not in connection.execute_wrappers:
+        connection.execute_wrappers.append(_count_async_request_queries)
+
+
+class MetricsMiddleware:
+    """
+    Record each request's latency by view name, method and status class, plus
+    the number of database queries it ran and their total time. List it first in
+    MIDDLEWARE so the latency covers the other middleware too.
+
+    Like Django's own middleware it runs in whichever mode the handler uses, so
+    under ASGI requests are not switched to a thread and back just to be timed.
+    """
+
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        if not metrics.metrics_enabled():
+            raise MiddlewareNotUsed
+        self.get_response = get_response
+        self.async_mode = iscoroutinefunction(get_response)
+        if self.async_mode:
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if self.async_mode:
+            return self.__acall__(request)
+        queries = QueryTimer()
+        started = time.perf_counter()
+        with connection.execute_wrapper(queries):
+            response = self.get_response(request)
+        self._observe(request, response, time.perf_counter() - started, queries)
+        return response
+
+    async def __acall__(self, request):
+        queries = QueryTimer()
+        token = _async_request_queries.set(queries)
+        started = time.perf_counter()
+        try:
+            response = await self.get_response(request)
+        finally:
+            _async_request_queries.reset(token)
+        self._observe(request, response, time.perf_counter() - started, queries)
+        return response
+
+    @staticmethod
+    def _observe(request, response, duration, queries):
+        match = request.resolver_match
+        view = match.view_name if match else 'unresolved'
+        metrics.observe_request(view, request.method, response.status_code, duration, queries.count, queries.seconds)
@@ -0,0 +1,53 @@
+# Generated by Django 5.2.18 on 2026-10-16 20:57
+
+from datetime import datetime, timedelta
+
+import pytz
+from django.db import migrations, models
+from django.utils import timezone
+
+
+def next_fire_at_utc(notification_time, timezone_name, after):
+    """Frozen copy of ecotrack.utils.next_fire_at_utc as of this migration."""
+    try:
+        tz = pytz.timezone(timezone_name or 'UTC')
+    except pytz.exceptions.UnknownTimeZoneError:
+        tz = pytz.utc
+
+    fire_time = notification_time.replace(second=0, microsecond=0)
+    candidate_date = after.astimezone(tz).date()
+    for _ in range(3):
+        fire_at = tz.localize(datetime.combine(candidate_date, fire_time)).astimezone(pytz.utc)
+        if fire_at > after:
+            return fire_at
+        candidate_date += timedelta(days=1)
+    return fire_at
+
+
+def schedule_existing_devices(apps, schema_editor):
+    AndroidDevice = apps.get_model('ecotrack', 'AndroidDevice')
+    devices = list(AndroidDevice.objects.filter(is_active=True, daily_reminders_enabled=True))
+    now = timezone.now()
+    for device in devices:
+        device.next_fire_at = next_fire_at_utc(device.notification_time, device.timezone, now)
+    AndroidDevice.objects.bulk_update(devices, ['next_fire_at'], batch_size=500)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('ecotrack', '0004_alter_user_last_checkin'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='androiddevice',
+            name='next_fire_at',
+            field=models.DateTimeField(blank=True, null=True),
+        ),
+        migrations.AddIndex(
+            model_name='androiddevice',
+            index=models.Index(fields=['next_fire_at'], name='ecotrack_an_next_fi_39b41a_idx'),
+        ),
+        migrations.RunPython(schedule_existing_devices, migrations.RunPython.noop),
+    ]
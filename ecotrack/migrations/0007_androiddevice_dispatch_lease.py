@@ -0,0 +1,23 @@
+# Generated by Django 5.2.18 on 2026-10-16 21:00
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('ecotrack', '0006_dispatchjob'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='androiddevice',
+            name='dispatch_lease_expires_at',
+            field=models.DateTimeField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name='androiddevice',
+            name='dispatch_lease_owner',
+            field=models.CharField(blank=True, default='', max_length=64),
+        ),
+    ]
@@ -0,0 +1,28 @@
+# Generated by Django 5.2.18 on 2026-10-16 21:01
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('ecotrack', '0007_androiddevice_dispatch_lease'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ReminderCopy',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('text', models.CharField(max_length=255)),
+                ('text_hash', models.CharField(max_length=64, unique=True)),
+                ('scheduled_for', models.DateField(blank=True, null=True, unique=True)),
+                ('last_used_on', models.DateField(blank=True, null=True)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+            ],
+            options={
+                'verbose_name_plural': 'Reminder copy',
+                'ordering': ['scheduled_for'],
+            },
+        ),
+    ]
@@ -0,0 +1,105 @@
+# Generated by Django 5.2.18 on 2026-10-16 21:06
+
+import math
+from datetime import datetime, time
+
+import django.db.models.deletion
+import django.utils.timezone
+import ecotrack.models
+from django.conf import settings
+from django.db import migrations, models
+from django.utils import timezone
+
+
+def _parse_entry(entry):
+    """
+    Return (value, date or None) for a last_8_footprint_measurements entry, or None
+    if its value is not a number.
+    """
+    if isinstance(entry, dict):
+        value, recorded_at = entry.get('value'), entry.get('recorded_at')
+    else:
+        value, recorded_at = entry, None
+
+    try:
+        value = float(value)
+    except (TypeError, ValueError):
+        return None
+    if not math.isfinite(value):
+        return None
+    value = round(value, 2)
+
+    try:
+        recorded_on = datetime.fromisoformat(str(recorded_at)).date() if recorded_at else None
+    except ValueError:
+        recorded_on = None
+    return value, recorded_on
+
+
+def copy_history_to_table(apps, schema_editor):
+    User = apps.get_model('ecotrack', 'User')
+    FootprintMeasurement = apps.get_model('ecotrack', 'FootprintMeasurement')
+
+    measurements = []
+    for user in User.objects.only('id', 'last_8_footprint_measurements').iterator():
+        # Unparsable entries are skipped rather than stored as a 0.0 footprint
+        entries = [
+            parsed for parsed in map(_parse_entry, user.last_8_footprint_measurements or []) if parsed is not None
+        ]
+        known_dates = [recorded_on for _, recorded_on in entries if recorded_on]
+        # Undated entries take the previous entry's date (or the first known one) so order is kept
+        last_date = known_dates[0] if known_dates else timezone.localdate()
+        for value, recorded_on in entries:
+            last_date = recorded_on or last_date
+            measurements.append(FootprintMeasurement(
+                user_id=user.id,
+                recorded_at=timezone.make_aware(datetime.combine(last_date, time.min)),
+                value=value,
+            ))
+
+        if len(measurements) >= 1000:
+            FootprintMeasurement.objects.bulk_create(measurements)
+            measurements = []
+    FootprintMeasurement.objects.bulk_create(measurements)
+
+
+def copy_history_to_json(apps, schema_editor):
+    User = apps.get_model('ecotrack', 'User')
+    FootprintMeasurement = apps.get_model('ecotrack', 'FootprintMeasurement')
+
+    for user in User.objects.filter(footprint_measurements__isnull=False).distinct().iterator():
+        latest = FootprintMeasurement.objects.filter(user_id=user.id).order_by('-recorded_at', '-id')[:8]
+        user.last_8_footprint_measurements = [
+            {'value': m.value, 'recorded_at': timezone.localtime(m.recorded_at).date().isoformat()}
+            for m in reversed(list(latest))
+        ]
+        user.save(update_fields=['last_8_footprint_measurements'])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('ecotrack', '0009_dailyquestionset'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='FootprintMeasurement',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('recorded_at', models.DateTimeField(default=django.utils.timezone.now)),
+                ('value', models.FloatField()),
+                ('breakdown', models.JSONField(blank=True, default=ecotrack.models.get_default_dict)),
+                ('user', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='footprint_measurements', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'ordering': ['recorded_at', 'id'],
+                'indexes': [models.Index(fields=['user', 'recorded_at'], name='ecotrack_fo_user_id_5c3fe5_idx')],
+            },
+        ),
+        migrations.RunPython(copy_history_to_table, copy_history_to_json),
+        migrations.RemoveField(
+            model_name='user',
+            name='last_8_footprint_measurements',
+        ),
+    ]
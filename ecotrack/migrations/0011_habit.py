@@ -0,0 +1,83 @@
+# Generated by Django 5.2.18 on 2026-10-16 21:07
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+# User.habits is shadowed by the new reverse relation while both exist, so the JSON
+# column is only read through values_list() and written through update()
+
+def copy_habits_to_table(apps, schema_editor):
+    User = apps.get_model('ecotrack', 'User')
+    Habit = apps.get_model('ecotrack', 'Habit')
+
+    habits = []
+    for user_id, user_habits in User.objects.values_list('id', 'habits').iterator():
+        for habit in user_habits or []:
+            if isinstance(habit, dict) and habit.get('text'):
+                habits.append(Habit(user_id=user_id, text=str(habit['text'])))
+
+        if len(habits) >= 1000:
+            Habit.objects.bulk_create(habits)
+            habits = []
+    Habit.objects.bulk_create(habits)
+
+
+def copy_habits_to_json(apps, schema_editor):
+    User = apps.get_model('ecotrack', 'User')
+    Habit = apps.get_model('ecotrack', 'Habit')
+
+    habits_by_user = {}
+    for habit_id, user_id, text in Habit.objects.order_by('created_at', 'id').values_list('id', 'user_id', 'text'):
+        habits_by_user.setdefault(user_id, []).append({'id': str(habit_id), 'text': text})
+    for user_id, user_habits in habits_by_user.items():
+        User.objects.filter(pk=user_id).update(habits=user_habits)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('ecotrack', '0010_footprintmeasurement'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='Habit',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('text', models.TextField()),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('user', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='habits', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'ordering': ['created_at', 'id'],
+            },
+        ),
+        migrations.CreateModel(
+            name='HabitCompletion',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('date', models.DateField()),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('habit', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='completions', to='ecotrack.habit')),
+            ],
+        ),
+        migrations.AddIndex(
+            model_name='habit',
+            index=models.Index(fields=['user', 'id'], name='ecotrack_ha_user_id_c9791c_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='habitcompletion',
+            index=models.Index(fields=['date'], name='ecotrack_ha_date_fb16dc_idx'),
+        ),
+        migrations.AlterUniqueTogether(
+            name='habitcompletion',
+            unique_together={('habit', 'date')},
+        ),
+        migrations.RunPython(copy_habits_to_table, copy_habits_to_json),
+        migrations.RemoveField(
+            model_name='user',
+            name='habits',
+        ),
+    ]
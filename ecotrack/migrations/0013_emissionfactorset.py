@@ -0,0 +1,113 @@
+# Generated by Django 5.2.18 on 2026-10-16 21:24
+
+import copy
+
+from django.db import migrations, models
+
+# Frozen copies of ecotrack.emission_factors.CONFIG and INITIAL_SCORE_CONFIG as of this
+# migration: version 1 must hold the factors existing footprints were computed with
+CONFIG = {
+    "factors": {
+        "EF_ELECTRICITY": {"Yes": 0.05, "Partially": 0.25, "No": 0.475},
+        "EF_HEATING": {
+            "Natural Gas": 0.2, "Electricity": 0.45, "Oil": 0.27,
+            "Propane": 0.24, "Wood": 0.015, "Other": 0.3
+        },
+        "EF_VEHICLE_PER_KM": {
+            "Gasoline": 0.18, "Diesel": 0.17, "Hybrid": 0.12, "Electric": 0.05
+        },
+        "EF_FLIGHT": {"Short-haul (<3h)": 1100, "Medium-haul (3-6h)": 3000, "Long-haul (>6h)": 8000},
+        "EF_FLIGHT_PER_KM": 0.15,
+        "EF_DIET": {
+            "Vegan": 1600 / 12, "Vegetarian": 1900 / 12, "Pescatarian": 2100 / 12,
+            "Omnivore": 2500 / 12, "High Meat": 3300 / 12
+        },
+        "EF_PUBLIC_TRANSPORT_PER_KM": 0.1,
+        "EF_WASTE_LANDFILL": 0.45,
+        "EF_WATER_PER_LITRE": 0.0005
+    },
+    "multipliers": {
+        "FOOD_WASTE": {"Very little": 0.9, "Below average": 1.0, "Average": 1.2, "Above average": 1.5},
+        "FOOD_PACKAGING": {"Very little": 0.9, "Below average": 1.0, "Average": 1.3, "Above average": 1.6},
+        "SHOPPING": {"Rarely": 50, "Sometimes": 100, "Often": 200}
+    },
+    "constants": {
+        "HOUSEHOLD_SIZE_DEFAULT": 1,
+        "WEEKS_PER_MONTH": 4.33,
+        "MONTHS_PER_YEAR": 12,
+        "DAYS_PER_MONTH": 30,
+        "WASTE_PER_PERSON_PER_DAY_KG": 1.2,
+        "RECYCLING_DIVERSION_PER_ITEM": 0.05,
+        "COMPOST_DIVERSION": 0.15,
+        "OFFSET_PERCENTAGE": 0.10
+    }
+}
+
+INITIAL_SCORE_CONFIG = {
+    # Home & Energy
+    "what_type_of_home_do_you_live_in": {"Apartment": 10, "Semi-detached House": 5, "Detached House": 0, "Other": 5},
+    "what_is_the_size_of_your_home": {"Small": 10, "Medium": 5, "Large": 0},
+    "is_your_electricity_from_renewable_sources": {"Yes": 20, "Partially": 10, "No": 0},
+    "do_you_use_energy_saving_appliances_or_lightbulbs": {"Yes": 10, "No": 0},
+    # Transportation
+    "how_often_do_you_use_public_transport": {"Daily": 10, "Weekly": 5, "Rarely": 0, "Never": -5},
+    # Diet
+    "what_best_describes_your_diet": {"Vegan": 20, "Vegetarian": 15, "Pescatarian": 10, "Omnivore": 5, "High Meat": 0},
+    "how_much_of_your_food_is_organic_local": {"All": 10, "Most": 7, "Some": 3, "None": 0},
+    "how_much_food_do_you_waste": {"Very little": 15, "Below average": 10, "Average": 5, "Above average": 0},
+    "how_much_of_your_food_is_packaged_processed": {"Very little": 10, "Below average": 7, "Average": 3, "Above average": 0},
+    # Waste
+    "do_you_compost_food_waste": {"All": 10, "Some": 5, "None": 0},
+    "recycling_items_count": {0: 0, 1: 3, 2: 6, 3: 9, 4: 12}, # Points based on how many materials are recycled
+    # Consumption
+    "how_often_do_you_buy_new_clothes_electronics_or_appliances": {"Rarely": 15, "Sometimes": 5, "Often": 0},
+    "do_you_buy_second_hand_or_repair_items": {"Yes": 10, "Sometimes": 5, "Rarely": 2, "No": 0},
+    # Water
+    "do_you_use_water_saving_devices": {"Yes": 10, "No": 0},
+    # Offsetting
+    "do_you_offset_your_carbon_emissions": {"Yes": 5, "No": 0}
+}
+
+
+def seed_default_factors(apps, schema_editor):
+    """Store the built-in factors as version 1; existing footprints were computed with them."""
+    EmissionFactorSet = apps.get_model('ecotrack', 'EmissionFactorSet')
+    User = apps.get_model('ecotrack', 'User')
+
+    EmissionFactorSet.objects.create(
+        version=1,
+        config=copy.deepcopy(CONFIG),
+        initial_score_config=copy.deepcopy(INITIAL_SCORE_CONFIG),
+        note='Built-in defaults',
+    )
+    User.objects.filter(survey_answered=True, survey_skipped=False).update(footprint_factor_version=1)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('ecotrack', '0012_user_dashboard_version'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='EmissionFactorSet',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('version', models.PositiveIntegerField(blank=True, unique=True)),
+                ('config', models.JSONField()),
+                ('initial_score_config', models.JSONField()),
+                ('note', models.CharField(blank=True, max_length=255)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+            ],
+            options={
+                'ordering': ['-version'],
+            },
+        ),
+        migrations.AddField(
+            model_name='user',
+            name='footprint_factor_version',
+            field=models.PositiveIntegerField(db_index=True, default=0),
+        ),
+        migrations.RunPython(seed_default_factors, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,17 @@
+# Generated by Django 5.2.18 on 2026-10-16 22:05
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('ecotrack', '0013_emissionfactorset'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='communitymessage',
+            index=models.Index(fields=['community', 'created_at', 'id'], name='ecotrack_co_communi_d828ac_idx'),
+        ),
+    ]
@@ -0,0 +1,64 @@
+# Generated by Django 5.2.18 on 2026-10-16 22:31
+
+from django.db import migrations, models
+
+# Frozen copy of ecotrack.search.COMMUNITY_INDEX as of this migration
+CREATE_COMMUNITY_SEARCH = [
+    "CREATE VIRTUAL TABLE IF NOT EXISTS ecotrack_community_fts USING fts5("
+    "name, description, content='ecotrack_community', content_rowid='id', "
+    "tokenize='unicode61 remove_diacritics 2')",
+    "CREATE TRIGGER IF NOT EXISTS ecotrack_community_fts_ai AFTER INSERT ON ecotrack_community BEGIN "
+    "INSERT INTO ecotrack_community_fts(rowid, name, description) VALUES (new.id, new.name, new.description); END",
+    "CREATE TRIGGER IF NOT EXISTS ecotrack_community_fts_ad AFTER DELETE ON ecotrack_community BEGIN "
+    "INSERT INTO ecotrack_community_fts(ecotrack_community_fts, rowid, name, description) "
+    "VALUES ('delete', old.id, old.name, old.description); END",
+    "CREATE TRIGGER IF NOT EXISTS ecotrack_community_fts_au AFTER UPDATE OF name, description ON ecotrack_community BEGIN "
+    "INSERT INTO ecotrack_community_fts(ecotrack_community_fts, rowid, name, description) "
+    "VALUES ('delete', old.id, old.name, old.description); "
+    "INSERT INTO ecotrack_community_fts(rowid, name, description) VALUES (new.id, new.name, new.description); END",
+    "INSERT INTO ecotrack_community_fts(ecotrack_community_fts) VALUES ('rebuild')",
+]
+
+DROP_COMMUNITY_SEARCH = [
+    "DROP TRIGGER IF EXISTS ecotrack_community_fts_ai",
+    "DROP TRIGGER IF EXISTS ecotrack_community_fts_ad",
+    "DROP TRIGGER IF EXISTS ecotrack_community_fts_au",
+    "DROP TABLE IF EXISTS ecotrack_community_fts",
+]
+
+
+def _execute(schema_editor, statements):
+    # FTS5 is SQLite-only; other backends search with icontains lookups
+    if schema_editor.connection.vendor != 'sqlite':
+        return
+    with schema_editor.connection.cursor() as cursor:
+        for statement in statements:
+            cursor.execute(statement)
+
+
+def create_community_search(apps, schema_editor):
+    _execute(schema_editor, CREATE_COMMUNITY_SEARCH)
+
+
+def drop_community_search(apps, schema_editor):
+    _execute(schema_editor, DROP_COMMUNITY_SEARCH)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('ecotrack', '0014_communitymessage_keyset_index'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='community',
+            name='activity_score',
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.AddIndex(
+            model_name='community',
+            index=models.Index(fields=['is_private', 'activity_score', 'id'], name='ecotrack_co_is_priv_0a8307_idx'),
+        ),
+        migrations.RunPython(create_community_search, drop_community_search),
+    ]
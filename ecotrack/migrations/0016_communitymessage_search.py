@@ -0,0 +1,58 @@
+# Generated by Django 5.2.18 on 2026-10-16 22:58
+
+from django.db import migrations
+
+# Frozen copy of ecotrack.search.MESSAGE_INDEX as of this migration
+CREATE_MESSAGE_SEARCH = [
+    "CREATE VIRTUAL TABLE IF NOT EXISTS ecotrack_communitymessage_fts USING fts5("
+    "community_id, content, content='ecotrack_communitymessage', content_rowid='id', "
+    "tokenize='unicode61 remove_diacritics 2')",
+    "CREATE TRIGGER IF NOT EXISTS ecotrack_communitymessage_fts_ai AFTER INSERT ON ecotrack_communitymessage BEGIN "
+    "INSERT INTO ecotrack_communitymessage_fts(rowid, community_id, content) "
+    "VALUES (new.id, new.community_id, new.content); END",
+    "CREATE TRIGGER IF NOT EXISTS ecotrack_communitymessage_fts_ad AFTER DELETE ON ecotrack_communitymessage BEGIN "
+    "INSERT INTO ecotrack_communitymessage_fts(ecotrack_communitymessage_fts, rowid, community_id, content) "
+    "VALUES ('delete', old.id, old.community_id, old.content); END",
+    "CREATE TRIGGER IF NOT EXISTS ecotrack_communitymessage_fts_au "
+    "AFTER UPDATE OF community_id, content ON ecotrack_communitymessage BEGIN "
+    "INSERT INTO ecotrack_communitymessage_fts(ecotrack_communitymessage_fts, rowid, community_id, content) "
+    "VALUES ('delete', old.id, old.community_id, old.content); "
+    "INSERT INTO ecotrack_communitymessage_fts(rowid, community_id, content) "
+    "VALUES (new.id, new.community_id, new.content); END",
+    "INSERT INTO ecotrack_communitymessage_fts(ecotrack_communitymessage_fts) VALUES ('rebuild')",
+]
+
+DROP_MESSAGE_SEARCH = [
+    "DROP TRIGGER IF EXISTS ecotrack_communitymessage_fts_ai",
+    "DROP TRIGGER IF EXISTS ecotrack_communitymessage_fts_ad",
+    "DROP TRIGGER IF EXISTS ecotrack_communitymessage_fts_au",
+    "DROP TABLE IF EXISTS ecotrack_communitymessage_fts",
+]
+
+
+def _execute(schema_editor, statements):
+    # FTS5 is SQLite-only; other backends search with icontains lookups
+    if schema_editor.connection.vendor != 'sqlite':
+        return
+    with schema_editor.connection.cursor() as cursor:
+        for statement in statements:
+            cursor.execute(statement)
+
+
+def create_message_search(apps, schema_editor):
+    _execute(schema_editor, CREATE_MESSAGE_SEARCH)
+
+
+def drop_message_search(apps, schema_editor):
+    _execute(schema_editor, DROP_MESSAGE_SEARCH)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('ecotrack', '0015_community_activity_score_search'),
+    ]
+
+    operations = [
+        migrations.RunPython(create_message_search, drop_message_search),
+    ]
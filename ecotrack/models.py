@@ -1,8 +1,13 @@
 from django.contrib.auth.models import AbstractUser
-from django.db import models
+from django.core.exceptions import ValidationError
+from django.db import IntegrityError, models, transaction
 from datetime import datetime, timedelta
 from django.utils import timezone
 import json
+import pytz
+
+from .emission_factors import EmissionFactors, invalidate_active_factors
+from .utils import next_fire_at_utc
 
 
 def get_default_dict():
@@ -14,14 +19,14 @@ class User(AbstractUser):
     streak = models.PositiveIntegerField(default=0)
     sustainability_score = models.PositiveIntegerField(default=0)
     carbon_footprint = models.JSONField(default=list, blank=True)
-    habits = models.JSONField(default=list, blank=True)
     user_data = models.JSONField(default=get_default_dict, blank=True)
     survey_answered = models.BooleanField(default=False)
     survey_skipped = models.BooleanField(default=False)
     achievements = models.JSONField(default=list, blank=True)
     last_checkin = models.DateField(null=True, blank=True, default=datetime.now() - timedelta(days=1))
     habits_today = models.PositiveIntegerField(default=0)
-    last_8_footprint_measurements = models.JSONField(default=list, blank=True)
+    dashboard_version = models.PositiveIntegerField(default=0)  # Bumped on writes that change get_user_data
+    footprint_factor_version = models.PositiveIntegerField(default=0, db_index=True)  # EmissionFactorSet version carbon_footprint was computed with
 
     # By inheriting from AbstractUser, you get these fields automatically:
     # username
@@ -40,6 +45,138 @@ class User(AbstractUser):
     def __str__(self):
         return self.username
 
+    def last_checkin_date(self):
+        if isinstance(self.last_checkin, datetime):
+            return self.last_checkin.date()
+        return self.last_checkin
+
+    def current_streak(self, today=None):
+        """
+        The streak as of `today`. A streak whose last check-in is before yesterday has
+        lapsed even if the nightly rollover_daily_stats command has not reset it yet.
+        """
+        today = today or timezone.localdate()
+        last_checkin_date = self.last_checkin_date()
+        if last_checkin_date and last_checkin_date < today - timedelta(days=1):
+            return 0
+        return self.streak
+
+    def current_habits_today(self, today=None):
+        """habits_today as of `today`: it only counts if the last check-in was today."""
+        today = today or timezone.localdate()
+        last_checkin_date = self.last_checkin_date()
+        if not last_checkin_date or last_checkin_date < today:
+            return 0
+        return self.habits_today
+
+    def habit_list(self):
+        """The user's habits in the {"id", "text"} shape the API and prompts use."""
+        return [{"id": str(habit.id), "text": habit.text} for habit in self.habits.all()]
+
+
+class Habit(models.Model):
+    """A habit a user is tracking to reduce their footprint"""
+    user = models.ForeignKey(User, on_delete=models.CASCADE, related_name='habits')
+    text = models.TextField()
+    created_at = models.DateTimeField(auto_now_add=True)
+    
+    class Meta:
+        ordering = ['created_at', 'id']
+        indexes = [
+            models.Index(fields=['user', 'id']),
+        ]
+    
+    def __str__(self):
+        return f"{self.user.username}: {self.text}"
+
+
+class HabitCompletion(models.Model):
+    """A habit marked as done on a given local day"""
+    habit = models.ForeignKey(Habit, on_delete=models.CASCADE, related_name='completions')
+    date = models.DateField()
+    created_at = models.DateTimeField(auto_now_add=True)
+    
+    class Meta:
+        unique_together = ['habit', 'date']
+        indexes = [
+            models.Index(fields=['date']),
+        ]
+    
+    def __str__(self):
+        return f"{self.habit.text} on {self.date}"
+
+
+class FootprintMeasurement(models.Model):
+    """
+    One monthly carbon footprint result for a user, appended on every survey
+    submission. History reads are a single indexed range query on (user, recorded_at).
+    """
+    user = models.ForeignKey(User, on_delete=models.CASCADE, related_name='footprint_measurements')
+    recorded_at = models.DateTimeField(default=timezone.now)
+    value = models.FloatField()  # kg CO2e per month
+    breakdown = models.JSONField(default=get_default_dict, blank=True)  # kg CO2e per category
+    
+    class Meta:
+        ordering = ['recorded_at', 'id']
+        indexes = [
+            models.Index(fields=['user', 'recorded_at']),
+        ]
+    
+    def __str__(self):
+        return f"{self.user.username}: {self.value} kg CO2e on {self.recorded_at:%Y-%m-%d}"
+
+
+class EmissionFactorSet(models.Model):
+    """
+    One version of the emission factor and initial-score configuration, in the shape
+    of emission_factors.CONFIG and INITIAL_SCORE_CONFIG. Versions are immutable: a
+    factor change is a new row, which every process picks up within
+    EMISSION_FACTORS_RELOAD_SECONDS and rescore_footprints applies to stored footprints.
+    """
+    version = models.PositiveIntegerField(unique=True, blank=True)  # Assigned on save when left blank
+    config = models.JSONField()
+    initial_score_config = models.JSONField()
+    note = models.CharField(max_length=255, blank=True)  # What changed, for the admin list
+    created_at = models.DateTimeField(auto_now_add=True)
+    
+    class Meta:
+        ordering = ['-version']
+    
+    def __str__(self):
+        return f"Emission factors v{self.version}"
+    
+    def compile(self):
+        """This version as an EmissionFactors lookup object."""
+        return EmissionFactors(self.version, self.config, self.initial_score_config)
+    
+    def clean(self):
+        try:
+            self.compile()
+        except (AttributeError, KeyError, TypeError, ValueError) as e:
+            raise ValidationError(f"Invalid emission factor configuration: {e!r}")
+    
+    # Times a new set takes the next version number before a concurrent save's IntegrityError is raised
+    VERSION_ATTEMPTS = 5
+    
+    def save(self, *args, **kwargs):
+        if self.version is not None:
+            super().save(*args, **kwargs)
+        else:
+            for attempt in range(self.VERSION_ATTEMPTS):
+                try:
+                    # Savepoint, so losing the race for a number leaves an outer transaction usable
+                    with transaction.atomic():
+                        latest = EmissionFactorSet.objects.aggregate(latest=models.Max('version'))['latest']
+                        self.version = (latest or 0) + 1
+                        super().save(*args, **kwargs)
+                    break
+                except IntegrityError:
+                    # Another set took the number between the read and the insert
+                    self.version = None
+                    if attempt == self.VERSION_ATTEMPTS - 1:
+                        raise
+        invalidate_active_factors()
+
 
 class AndroidDevice(models.Model):
     """
@@ -80,6 +217,9 @@ class AndroidDevice(models.Model):
     last_notification_sent = models.DateTimeField(null=True, blank=True)
     last_sent_date = models.DateField(null=True, blank=True)  # For daily reminder deduplication
     last_sent_time = models.TimeField(null=True, blank=True)  # For daily reminder deduplication
+    next_fire_at = models.DateTimeField(null=True, blank=True)  # Next daily reminder as a UTC minute
+    dispatch_lease_owner = models.CharField(max_length=64, blank=True, default='')  # Worker sending the reminder
+    dispatch_lease_expires_at = models.DateTimeField(null=True, blank=True)
     
     # FCM token management
     token_last_updated = models.DateTimeField(null=True, blank=True)
@@ -93,12 +233,73 @@ class AndroidDevice(models.Model):
             models.Index(fields=['fcm_token']),
             models.Index(fields=['notification_time', 'timezone']),
             models.Index(fields=['last_sent_date', 'last_sent_time']),
+            models.Index(fields=['next_fire_at']),
         ]
     
+    # Fields that affect when the next daily reminder fires
+    SCHEDULE_FIELDS = {'notification_time', 'timezone', 'is_active', 'daily_reminders_enabled'}
+    
     def __str__(self):
         device_name = self.device_name or self.device_model or f'Device {self.device_id[:8]}...'
         return f"{self.user.username} - {device_name}"
     
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        # The schedule as stored, so save() can tell whether it changed
+        instance._loaded_schedule = {
+            name: value for name, value in zip(field_names, values) if name in cls.SCHEDULE_FIELDS
+        }
+        return instance
+    
+    def schedule_changed(self, fields=SCHEDULE_FIELDS):
+        """True if any of `fields` differs from the loaded row (always True for a new device)."""
+        loaded = getattr(self, '_loaded_schedule', None)
+        if loaded is None:
+            return True
+        return any(field not in loaded or loaded[field] != getattr(self, field) for field in fields)
+    
+    def save(self, *args, **kwargs):
+        update_fields = kwargs.get('update_fields')
+        fields = self.SCHEDULE_FIELDS if update_fields is None else self.SCHEDULE_FIELDS & set(update_fields)
+        # Rescheduling from now would skip a reminder that is due but not yet sent,
+        # so an unchanged schedule keeps its next_fire_at
+        if fields and (self.next_fire_at is None or self.schedule_changed(fields)):
+            self.schedule_next_reminder()
+            if update_fields is not None:
+                kwargs['update_fields'] = set(update_fields) | {'next_fire_at'}
+        super().save(*args, **kwargs)
+        self._loaded_schedule = {field: getattr(self, field) for field in self.SCHEDULE_FIELDS}
+    
+    def get_tzinfo(self):
+        """Return the device's tzinfo, falling back to UTC for unknown zones"""
+        try:
+            return pytz.timezone(self.timezone or 'UTC')
+        except pytz.exceptions.UnknownTimeZoneError:
+            return pytz.utc
+    
+    def schedule_next_reminder(self, after=None):
+        """
+        Recompute next_fire_at (UTC) from the local notification_time and timezone.
+        Devices that should not receive daily reminders are taken off the schedule.
+        """
+        if self.is_active and self.daily_reminders_enabled:
+            self.next_fire_at = next_fire_at_utc(self.notification_time, self.timezone, after)
+        else:
+            self.next_fire_at = None
+        return self.next_fire_at
+    
+    def mark_reminder_sent(self, fired_at, sent_at=None):
+        """
+        Record delivery of the daily reminder scheduled for `fired_at` (UTC).
+        Does not save, so callers can write a whole batch with bulk_update.
+        """
+        local_fired_at = fired_at.astimezone(self.get_tzinfo())
+        self.last_sent_date = local_fired_at.date()
+        self.last_sent_time = local_fired_at.time().replace(second=0, microsecond=0)
+        self.total_notifications_sent += 1
+        self.last_notification_sent = sent_at or timezone.now()
+    
     def get_fcm_token(self):
         """Return FCM token for Firebase messaging"""
         return self.fcm_token
@@ -167,6 +368,82 @@ class AndroidDevice(models.Model):
                 self.notification_time.minute == current_time.minute)
 
 
+class DispatchJob(models.Model):
+    """
+    A queued run of the daily reminder dispatcher, one per scheduled minute.
+    cron_dispatch only enqueues jobs; the run_dispatch_worker command drains them.
+    """
+    STATUS_CHOICES = [
+        ('pending', 'Pending'),
+        ('running', 'Running'),
+        ('done', 'Done'),
+        ('failed', 'Failed'),
+        ('skipped', 'Skipped'),  # Superseded by a later job that covered its minute
+    ]
+    
+    scheduled_for = models.DateTimeField(unique=True)  # UTC minute of the cron tick
+    status = models.CharField(max_length=20, choices=STATUS_CHOICES, default='pending')
+    created_at = models.DateTimeField(auto_now_add=True)
+    started_at = models.DateTimeField(null=True, blank=True)
+    finished_at = models.DateTimeField(null=True, blank=True)
+    attempts = models.PositiveIntegerField(default=0)
+    
+    # Progress, updated after every delivered batch
+    total_candidates = models.PositiveIntegerField(default=0)
+    sent = models.PositiveIntegerField(default=0)
+    failed = models.PositiveIntegerField(default=0)
+    error = models.TextField(blank=True)
+    
+    class Meta:
+        ordering = ['-scheduled_for']
+        indexes = [
+            models.Index(fields=['status', 'scheduled_for']),
+        ]
+    
+    def __str__(self):
+        return f"Dispatch {self.scheduled_for.isoformat()} ({self.status})"
+
+
+class ReminderCopy(models.Model):
+    """
+    Pre-generated daily reminder text. The refill_reminder_copy command generates lines
+    off-peak and assigns each one to a UTC day, so dispatch reads its copy with one
+    indexed lookup instead of calling Gemini.
+    """
+    text = models.CharField(max_length=255)
+    text_hash = models.CharField(max_length=64, unique=True)  # Hash of the normalized text, for dedupe
+    scheduled_for = models.DateField(null=True, blank=True, unique=True)  # UTC day the line is sent on
+    last_used_on = models.DateField(null=True, blank=True)  # Previous day the line was scheduled for
+    created_at = models.DateTimeField(auto_now_add=True)
+    
+    class Meta:
+        verbose_name_plural = "Reminder copy"
+        ordering = ['scheduled_for']
+    
+    def __str__(self):
+        return self.text
+
+
+class DailyQuestionSet(models.Model):
+    """
+    The check-in questions generated for a user on a given local day. get_questions
+    serves this row instead of calling Gemini; habits_fingerprint ties it to the
+    habits it was generated from, so a set made before a habit edit is never served.
+    """
+    user = models.ForeignKey(User, on_delete=models.CASCADE, related_name='daily_question_sets')
+    date = models.DateField()
+    habits_fingerprint = models.CharField(max_length=64)
+    questions = models.JSONField(default=list)
+    created_at = models.DateTimeField(auto_now_add=True)
+    
+    class Meta:
+        unique_together = ['user', 'date']
+        ordering = ['-date']
+    
+    def __str__(self):
+        return f"{self.user.username} questions for {self.date}"
+
+
 class Community(models.Model):
     """Model representing an eco-friendly community"""
     name = models.CharField(max_length=100, unique=True)
@@ -177,10 +454,16 @@ class Community(models.Model):
     is_private = models.BooleanField(default=False)
     join_code = models.CharField(max_length=8, unique=True, blank=True)
     member_count = models.PositiveIntegerField(default=1)
+    # Recent messages and members, recomputed by the refresh_community_activity command
+    activity_score = models.PositiveIntegerField(default=0)
     
     class Meta:
         verbose_name_plural = "Communities"
         ordering = ['-created_at']
+        indexes = [
+            # Public discovery, ranked by activity (discovery.public_communities_page)
+            models.Index(fields=['is_private', 'activity_score', 'id']),
+        ]
     
     def __str__(self):
         return self.name
@@ -242,6 +525,10 @@ class CommunityMessage(models.Model):
     
     class Meta:
         ordering = ['-created_at']
+        indexes = [
+            # Keyset pagination of a community's chat (get_community_messages)
+            models.Index(fields=['community', 'created_at', 'id']),
+        ]
     
     def __str__(self):
         return f"{self.sender.username} in {self.community.name}: {self.content[:50]}..."
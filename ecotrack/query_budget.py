@@ -0,0 +1,72 @@
+"""
+Per-view database query budgets.
+
+Decorate a view with @query_budget(n) to declare that its body runs at most n
+queries (session and user lookups done by middleware or login_required are not
+counted). Requests over budget are counted in the
+ecotrack_query_budget_exceeded_total metric and, depending on QUERY_BUDGET_MODE:
+
+- 'warn' (default): log a warning with the view name and query count.
+- 'raise': raise QueryBudgetExceeded, so a test or load test that drives the view
+  fails as soon as an N+1 pattern slips in.
+- 'off': don't count queries at all.
+"""
+
+import logging
+from functools import wraps
+
+from django.conf import settings
+from django.db import connection
+
+from . import metrics
+from .middleware import QueryTimer
+
+logger = logging.getLogger(__name__)
+
+QUERY_BUDGET_MODES = ('off', 'warn', 'raise')
+
+
+class QueryBudgetExceeded(AssertionError):
+    """A view ran more queries than its query_budget allows."""
+
+
+def query_budget_mode() -> str:
+    mode = getattr(settings, 'QUERY_BUDGET_MODE', 'warn')
+    return mode if mode in QUERY_BUDGET_MODES else 'warn'
+
+
+def query_budget(max_queries):
+    """
+    Cap the number of database queries the decorated view may run per request.
+
+    Apply it directly above the view function, below login_required and the
+    other request decorators, so only the view body is counted.
+
+    Args:
+        max_queries (int): Queries one request may run, whatever the data size
+    """
+    def decorator(view_func):
+        view_name = f'{view_func.__module__}.{view_func.__qualname__}'
+
+        @wraps(view_func)
+        def wrapper(request, *args, **kwargs):
+            mode = query_budget_mode()
+            if mode == 'off':
+                return view_func(request, *args, **kwargs)
+
+            queries = QueryTimer()
+            with connection.execute_wrapper(queries):
+                response = view_func(request, *args, **kwargs)
+
+            if queries.count > max_queries:
+                metrics.count_query_budget_exceeded(view_name)
+                message = f'{view_name} ran {queries.count} queries, over its budget of {max_queries}'
+                if mode == 'raise':
+                    raise QueryBudgetExceeded(message)
+                logger.warning(message)
+            return response
+
+        wrapper.query_budget = max_queries
+        return wrapper
+
+    return decorator
@@ -0,0 +1,227 @@
+"""
+Daily check-in questions and scoring.
+
+Questions are generated with Gemini once per user per local day and stored as a
+DailyQuestionSet, so opening the check-in is a single indexed read. Editing a
+habit drops the user's stored set, and the warm_question_cache command
+pre-generates sets overnight for users who are likely to check in.
+
+Every option carries an eco_positive flag, so submitted answers are scored
+locally against the stored set. Gemini only scores answers that do not match a
+flagged option. While Gemini is unavailable, SAMPLE_QUESTIONS are served instead.
+"""
+
+import json
+import logging
+
+from django.db import IntegrityError
+from django.utils import timezone
+
+from .caching import habits_fingerprint
+from .llm_service import LLMService, LLMUnavailable
+from .models import DailyQuestionSet
+
+logger = logging.getLogger(__name__)
+
+SAMPLE_QUESTIONS = [
+    {
+        "id": "q1",
+        "question": "How did you commute today?",
+        "options": [
+            {"text": "🚶 Walk/Cycle", "value": "Walk/Cycle", "eco_positive": True},
+            {"text": "🚌 Public Transport", "value": "Public Transport", "eco_positive": True},
+            {"text": "🚗 Car (single)", "value": "Car (single)", "eco_positive": False},
+            {"text": "👥 Car (carpool)", "value": "Car (carpool)", "eco_positive": True},
+        ],
+    },
+    {
+        "id": "q2",
+        "question": "Did you consume meat today?",
+        "options": [
+            {"text": "🥩 Yes", "value": "Yes", "eco_positive": False},
+            {"text": "🥬 No (or Plant-based)", "value": "No", "eco_positive": True},
+        ],
+    },
+    {
+        "id": "q3",
+        "question": "Did you unplug unused electronics?",
+        "options": [
+            {"text": "✅ Yes, all", "value": "Yes, all", "eco_positive": True},
+            {"text": "⚡ Some", "value": "Some", "eco_positive": True},
+            {"text": "❌ No", "value": "No", "eco_positive": False},
+        ],
+    },
+]
+
+
+def generate_questions(habits):
+    """
+    Ask Gemini for check-in questions covering `habits`.
+
+    Returns:
+        list or None: The parsed questions, or None if the response was malformed
+
+    Raises:
+        LLMUnavailable: If Gemini could not be reached
+    """
+
+    prompt = f"""
+    Give me a few questions based on user's habits to access their habits which they created to reduce carbon footprint.
+     **Do not include any explanations, formatting, double quotes or backticks and make sure there is atleast one question related to each habit.
+      Only provide a raw RFC8259 compliant JSON array.
+     ** Every option must have an "eco_positive" boolean: true if choosing it helps the user reduce their carbon footprint, false if it does not.
+     ** Here is an output example: {json.dumps(SAMPLE_QUESTIONS, ensure_ascii=False)}
+     ** Here is the list of user's habits: {habits}
+    """
+
+    questions = LLMService.generate_json(prompt)
+    if not isinstance(questions, list):
+        return None
+    return questions
+
+
+def get_cached_questions(user, day=None):
+    """Return the stored questions for `user` on `day` if they match the user's current habits."""
+    day = day or timezone.localdate()
+    question_set = DailyQuestionSet.objects.filter(user=user, date=day).first()
+    if question_set and question_set.habits_fingerprint == habits_fingerprint(user.habit_list()):
+        return question_set.questions
+    return None
+
+
+def store_questions(user, questions, day=None):
+    """Save `questions` as the user's set for `day`, replacing any existing set."""
+    day = day or timezone.localdate()
+    fingerprint = habits_fingerprint(user.habit_list())
+    try:
+        DailyQuestionSet.objects.update_or_create(
+            user=user,
+            date=day,
+            defaults={'habits_fingerprint': fingerprint, 'questions': questions},
+        )
+    except IntegrityError:
+        # A concurrent request stored a set for the same day first; keep theirs
+        pass
+
+
+def get_daily_questions(user, day=None):
+    """
+    Return the user's questions for `day` (default: today), generating and storing
+    them on a miss.
+
+    While Gemini is unavailable or returns malformed data, the static SAMPLE_QUESTIONS
+    are returned and nothing is stored, so the next request tries again.
+
+    Returns:
+        list: The questions
+    """
+    day = day or timezone.localdate()
+    questions = get_cached_questions(user, day)
+    if questions is not None:
+        return questions
+
+    try:
+        questions = generate_questions(user.habit_list())
+    except LLMUnavailable as e:
+        logger.warning(f"Serving sample questions, Gemini unavailable: {e}")
+        return SAMPLE_QUESTIONS
+
+    if questions is None:
+        return SAMPLE_QUESTIONS
+    store_questions(user, questions, day)
+    return questions
+
+
+def invalidate_daily_questions(user):
+    """Drop the user's stored sets from today on, after their habits changed."""
+    DailyQuestionSet.objects.filter(user=user, date__gte=timezone.localdate()).delete()
+
+
+def public_questions(questions):
+    """Strip the scoring flags from questions before sending them to the client."""
+    return [
+        {
+            **question,
+            'options': [
+                {key: value for key, value in option.items() if key != 'eco_positive'}
+                for option in question.get('options', [])
+                if isinstance(option, dict)
+            ],
+        }
+        for question in questions
+        if isinstance(question, dict)
+    ]
+
+
+def _option_flags(questions):
+    """Map (question text, option value) to the option's eco_positive flag."""
+    flags = {}
+    for question in questions or []:
+        if not isinstance(question, dict):
+            continue
+        for option in question.get('options') or []:
+            if isinstance(option, dict) and isinstance(option.get('eco_positive'), bool):
+                flags[(str(question.get('question')), str(option.get('value')))] = option['eco_positive']
+    return flags
+
+
+def score_answers_with_gemini(answers):
+    """
+    Score free-form answers with Gemini: one point per answer that helps reduce the
+    user's footprint.
+
+    Raises:
+        LLMUnavailable: If Gemini could not be reached
+    """
+
+    sample_output = {
+        "score": 5
+    }
+
+    prompt = f"""
+    Given data of survey conducted on a user's habits to access their habits which they created to reduce carbon footprint.
+    Give each response to question a score of 1 if the response helps their goal(reduce carbon footprint) and 0 if it does not.
+    Return the total score of the survey in JSON format
+     **Do not include any explanations, formatting, or backticks and make sure there is atleast one question related to each habit.
+      Only provide a raw RFC8259 compliant JSON array.
+      ** Here is the data: {answers}
+     ** Here is an output example: {sample_output}
+    """
+
+    result = LLMService.generate_json(prompt)
+    try:
+        return int(result['score'])
+    except (KeyError, TypeError, ValueError):
+        raise LLMUnavailable(f"Gemini returned an unusable score: {result!r}")
+
+
+def score_answers(user, answers, day=None):
+    """
+    Score a submitted check-in ({question text: selected value}) against the user's
+    stored question set for `day` (or SAMPLE_QUESTIONS, if those were served).
+    Answers matching a flagged option are scored locally; the rest go to Gemini in
+    a single call, and score nothing while Gemini is unavailable.
+
+    Returns:
+        int: Number of eco-positive answers
+    """
+    day = day or timezone.localdate()
+    question_set = DailyQuestionSet.objects.filter(user=user, date=day).only('questions').first()
+    flags = _option_flags(SAMPLE_QUESTIONS)
+    flags.update(_option_flags(question_set.questions if question_set else None))
+
+    score = 0
+    free_form = {}
+    for question, value in answers.items():
+        flag = flags.get((str(question), str(value)))
+        if flag is None:
+            free_form[question] = value
+        elif flag:
+            score += 1
+
+    if free_form:
+        try:
+            score += score_answers_with_gemini(free_form)
+        except LLMUnavailable as e:
+            logger.warning(f"Leaving {len(free_form)} free-form answers unscored: {e}")
+    return score
@@ -0,0 +1,148 @@
+"""
+Pool of pre-generated daily reminder messages.
+
+The refill_reminder_copy management command asks Gemini for batches of reminder
+lines off-peak, dedupes them by normalized text and assigns one line to each
+upcoming UTC day. A line is never scheduled twice within REMINDER_REPEAT_DAYS, so
+a user (who gets one reminder a day) does not see the same line twice in a week.
+"""
+
+import hashlib
+import re
+from datetime import timedelta
+
+from django.utils import timezone
+
+from .llm_service import LLMService
+from .models import ReminderCopy
+
+REMINDER_FALLBACK_BODY = "Hey user!, time to track your footprints 🌱"
+
+# Minimum number of days between two uses of the same line
+REMINDER_REPEAT_DAYS = 7
+
+# Generated lines longer than this are discarded
+REMINDER_MAX_LENGTH = 120
+
+REMINDER_POOL_PROMPT = """
+                Generate {count} different short, catchy, and engaging notification messages strictly to encourage users to fill out the EcoTrack check-in form.
+                EcoTrack is an app that helps users track their sustainability habits and promotes eco-friendly behavior. It includes features like:
+                - Daily surveys to track eco actions 🌱
+                - Personalized sustainability score 📊
+                - AI chatbot to guide users 🤖
+                - Personalized suggestions for greener living 💡
+                - Achievements for completing surveys and taking eco-friendly actions 🎁
+                - Daily streaks kept alive by submitting check-in everyday
+                 Ensure the notifications are:
+                - under 60 characters
+                - Friendly, heartwarming, motivating, and aligned with EcoTrack's eco-conscious mission
+                - Include clear call-to-actions like "Share your thoughts", "fill now", "complete now"
+                - Include relevant emojis for engagement
+                - Highlight rewards or benefits if possible
+                Give the messages a human touch, with some warmth, inviting gesture and showing that you care for the user.
+                 **Do not include any explanations, formatting, or backticks. Only provide a raw RFC8259 compliant JSON array of strings.
+            """
+
+
+def normalize_copy(text):
+    """Lowercase and strip punctuation/emoji so near-identical lines dedupe together."""
+    return re.sub(r'[^a-z0-9]+', ' ', text.lower()).strip()
+
+
+def copy_hash(text):
+    return hashlib.sha256(normalize_copy(text).encode('utf-8')).hexdigest()
+
+
+def get_reminder_body(day=None):
+    """Return the reminder line scheduled for a UTC day (default: today), or the static fallback."""
+    # UTC rather than each device's local day on purpose: one line per dispatch day keeps
+    # this a single read for the whole batch, and a local day is never more than one off
+    day = day or timezone.now().date()
+    text = ReminderCopy.objects.filter(scheduled_for=day).values_list('text', flat=True).first()
+    return text or REMINDER_FALLBACK_BODY
+
+
+def generate_copy_batch(count):
+    """
+    Ask Gemini for `count` reminder lines. Returns a (possibly empty) list of strings.
+
+    Raises:
+        LLMUnavailable: If Gemini could not be reached
+    """
+    lines = LLMService.generate_json(REMINDER_POOL_PROMPT.format(count=count))
+
+    if not isinstance(lines, list):
+        return []
+    return [
+        line.strip() for line in lines
+        if isinstance(line, str) and line.strip() and len(line.strip()) <= REMINDER_MAX_LENGTH
+    ]
+
+
+def fresh_copy_count():
+    """Number of lines that have never been scheduled."""
+    return ReminderCopy.objects.filter(scheduled_for__isnull=True, last_used_on__isnull=True).count()
+
+
+def add_copy(lines):
+    """Store new lines, skipping any whose normalized text already exists. Returns the count added."""
+    new_copy = {}
+    for line in lines:
+        text_hash = copy_hash(line)
+        if normalize_copy(line) and text_hash not in new_copy:
+            new_copy[text_hash] = line
+
+    existing = set(
+        ReminderCopy.objects.filter(text_hash__in=list(new_copy)).values_list('text_hash', flat=True)
+    )
+    created = ReminderCopy.objects.bulk_create(
+        [ReminderCopy(text=text, text_hash=text_hash) for text_hash, text in new_copy.items()
+         if text_hash not in existing],
+        ignore_conflicts=True,
+    )
+    return len(created)
+
+
+def _next_line_for(day, today):
+    """
+    Pick a line for `day`: a never-used line first, otherwise the line whose last
+    scheduled day is oldest and at least REMINDER_REPEAT_DAYS before `day`. Only
+    lines of days before `today` are recycled, so a line still to be sent keeps its day.
+    """
+    fresh = ReminderCopy.objects.filter(
+        scheduled_for__isnull=True,
+        last_used_on__isnull=True,
+    ).order_by('id').first()
+    if fresh:
+        return fresh
+    return ReminderCopy.objects.filter(
+        scheduled_for__lt=today,
+        scheduled_for__lte=day - timedelta(days=REMINDER_REPEAT_DAYS),
+    ).order_by('scheduled_for').first()
+
+
+def schedule_copy(days, today=None):
+    """
+    Make sure each of the next `days` UTC days has a line assigned.
+
+    Returns:
+        list: Days that could not be filled (the pool needs more lines)
+    """
+    today = today or timezone.now().date()
+    unfilled = []
+    for offset in range(days):
+        day = today + timedelta(days=offset)
+        if ReminderCopy.objects.filter(scheduled_for=day).exists():
+            continue
+
+        line = _next_line_for(day, today)
+        if line is None:
+            unfilled.append(day)
+            continue
+
+        # Keep the previous day a recycled line was used on, for the repeat check
+        if line.scheduled_for is not None:
+            line.last_used_on = line.scheduled_for
+        line.scheduled_for = day
+        line.save(update_fields=['scheduled_for', 'last_used_on'])
+    return unfilled
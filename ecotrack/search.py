@@ -0,0 +1,181 @@
+"""
+Full-text search backed by SQLite FTS5.
+
+Each FTSIndex is an external-content FTS5 table over one model table: it stores
+only the inverted index, keyed by the row's primary key, and three triggers on
+the model table keep it in sync on every INSERT, DELETE and UPDATE of the
+indexed columns, including bulk_create, queryset updates and cascading deletes.
+
+Migrations create the indexes; ensure_search_indexes (run on post_migrate)
+re-creates any trigger a later migration dropped, as SQLite drops a table's
+triggers when Django rebuilds the table to alter it. On other database
+backends search_filter falls back to icontains lookups.
+"""
+
+import operator
+import re
+from functools import reduce
+
+from django.db import connections
+from django.db.models import Q
+from django.db.models.expressions import RawSQL
+
+# Search terms used from one query; the rest are ignored
+MAX_TERMS = 8
+
+_TERM_RE = re.compile(r'\w+')
+
+
+class FTSIndex:
+    """
+    An FTS5 index of the text `columns` of `content_table`.
+
+    A `scope_column` (e.g. a foreign key) is indexed as well, so a match can be
+    restricted to one scope inside FTS5 (see scoped_match_expression) instead of
+    filtering every match against the content table.
+    """
+
+    def __init__(self, name, content_table, columns, scope_column=None):
+        self.name = name
+        self.content_table = content_table
+        self.columns = columns
+        self.scope_column = scope_column
+
+    @property
+    def indexed_columns(self):
+        return ((self.scope_column,) if self.scope_column else ()) + tuple(self.columns)
+
+    def _values(self, prefix):
+        return ', '.join(f'{prefix}.{column}' for column in self.indexed_columns)
+
+    def bm25(self):
+        """bm25() call ranking by the text columns only (lower is better)."""
+        weights = ', '.join('0.0' if column == self.scope_column else '1.0' for column in self.indexed_columns)
+        return f'bm25({self.name}, {weights})'
+
+    def create_statements(self):
+        columns = ', '.join(self.indexed_columns)
+        return [
+            f"CREATE VIRTUAL TABLE IF NOT EXISTS {self.name} USING fts5("
+            f"{columns}, content='{self.content_table}', content_rowid='id', "
+            f"tokenize='unicode61 remove_diacritics 2')",
+            f"CREATE TRIGGER IF NOT EXISTS {self.name}_ai AFTER INSERT ON {self.content_table} BEGIN "
+            f"INSERT INTO {self.name}(rowid, {columns}) VALUES (new.id, {self._values('new')}); END",
+            f"CREATE TRIGGER IF NOT EXISTS {self.name}_ad AFTER DELETE ON {self.content_table} BEGIN "
+            f"INSERT INTO {self.name}({self.name}, rowid, {columns}) VALUES ('delete', old.id, {self._values('old')}); END",
+            f"CREATE TRIGGER IF NOT EXISTS {self.name}_au AFTER UPDATE OF {columns} ON {self.content_table} BEGIN "
+            f"INSERT INTO {self.name}({self.name}, rowid, {columns}) VALUES ('delete', old.id, {self._values('old')}); "
+            f"INSERT INTO {self.name}(rowid, {columns}) VALUES (new.id, {self._values('new')}); END",
+        ]
+
+    def objects(self):
+        """Names of the table and triggers making up the index."""
+        return [self.name, f'{self.name}_ai', f'{self.name}_ad', f'{self.name}_au']
+
+    def create(self, connection):
+        """Create whatever is missing of the index; rebuild it from the content table if anything was."""
+        with connection.cursor() as cursor:
+            placeholders = ', '.join(['%s'] * len(self.objects()))
+            cursor.execute(f'SELECT COUNT(*) FROM sqlite_master WHERE name IN ({placeholders})', self.objects())
+            if cursor.fetchone()[0] == len(self.objects()):
+                return False
+            for statement in self.create_statements():
+                cursor.execute(statement)
+            cursor.execute(f"INSERT INTO {self.name}({self.name}) VALUES ('rebuild')")
+        return True
+
+    def drop(self, connection):
+        with connection.cursor() as cursor:
+            for trigger in self.objects()[1:]:
+                cursor.execute(f'DROP TRIGGER IF EXISTS {trigger}')
+            cursor.execute(f'DROP TABLE IF EXISTS {self.name}')
+
+    def rebuild(self, connection):
+        with connection.cursor() as cursor:
+            cursor.execute(f"INSERT INTO {self.name}({self.name}) VALUES ('rebuild')")
+
+
+COMMUNITY_INDEX = FTSIndex('ecotrack_community_fts', 'ecotrack_community', ('name', 'description'))
+MESSAGE_INDEX = FTSIndex(
+    'ecotrack_communitymessage_fts', 'ecotrack_communitymessage', ('content',), scope_column='community_id',
+)
+
+INDEXES = [COMMUNITY_INDEX, MESSAGE_INDEX]
+
+
+def fts_supported(connection):
+    return connection.vendor == 'sqlite'
+
+
+def ensure_search_indexes(using='default', rebuild=False):
+    """
+    Re-create missing triggers of every index a migration has created, rebuilding
+    those that were missing any (or all of them when `rebuild` is set).
+
+    Returns:
+        list: Names of the indexes that were repaired or rebuilt
+    """
+    connection = connections[using]
+    if not fts_supported(connection):
+        return []
+    tables = set(connection.introspection.table_names())
+    changed = []
+    for index in INDEXES:
+        if index.name not in tables:
+            continue
+        if index.create(connection):
+            changed.append(index.name)
+        elif rebuild:
+            index.rebuild(connection)
+            changed.append(index.name)
+    return changed
+
+
+def search_terms(text):
+    return _TERM_RE.findall((text or '').lower())[:MAX_TERMS]
+
+
+def match_expression(text):
+    """
+    An FTS5 query matching rows that contain every term of `text` as a word
+    prefix ("eco gard" matches "Eco Gardeners"), or None if `text` has no terms.
+    Quoting each term keeps FTS5 operators in user input from being interpreted.
+    """
+    terms = search_terms(text)
+    return ' '.join(f'"{term}"*' for term in terms) or None
+
+
+def scoped_match_expression(index, scope, text):
+    """
+    An FTS5 query matching the rows of one `scope` (a value of index.scope_column)
+    whose text columns contain every term of `text` as a word prefix, or None if
+    `text` has no terms.
+    """
+    expression = match_expression(text)
+    if expression is None:
+        return None
+    columns = ' '.join(index.columns)
+    return f'{index.scope_column} : "{int(scope)}" AND {{{columns}}} : ({expression})'
+
+
+def search_filter(queryset, index, text):
+    """
+    Narrow `queryset` (over index.content_table) to the rows matching `text`.
+    Returns an empty queryset when `text` has no search terms.
+    """
+    expression = match_expression(text)
+    if expression is None:
+        return queryset.none()
+    if fts_supported(connections[queryset.db]):
+        return queryset.filter(
+            pk__in=RawSQL(f'SELECT rowid FROM {index.name} WHERE {index.name} MATCH %s', [expression])
+        )
+    return queryset.filter(*[
+        reduce(operator.or_, [Q(**{f'{column}__icontains': term}) for column in index.columns])
+        for term in search_terms(text)
+    ])
+
+
+def ensure_search_indexes_after_migrate(sender, using='default', **kwargs):
+    """post_migrate receiver: re-create triggers dropped by table rebuilds."""
+    ensure_search_indexes(using)
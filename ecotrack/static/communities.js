@@ -3,11 +3,33 @@ class CommunityManager {
   constructor() {
     this.currentCommunity = null;
     this.messagePollingInterval = null;
+    this.messageStream = null;
+    this.lastMessageId = 0;
+    this.publicSearch = "";
+    this.publicNextCursor = null;
+    this.publicSearchTimer = null;
     this.initializeEventListeners();
     this.loadUserCommunities();
   }
 
   initializeEventListeners() {
+    // Public community search (debounced) and paging
+    document
+      .getElementById("public-communities-search")
+      ?.addEventListener("input", (event) => {
+        clearTimeout(this.publicSearchTimer);
+        this.publicSearchTimer = setTimeout(() => {
+          this.publicSearch = event.target.value.trim();
+          this.loadPublicCommunities();
+        }, 300);
+      });
+
+    document
+      .getElementById("public-communities-more")
+      ?.addEventListener("click", () => {
+        this.loadPublicCommunities(this.publicNextCursor);
+      });
+
     // Modal buttons
     document
       .getElementById("create-community-btn")
@@ -203,16 +225,29 @@ class CommunityManager {
     }
   }
 
-  async loadPublicCommunities() {
+  async loadPublicCommunities(cursor = null) {
+    // Without a cursor: the first page for the current search; with one: the next page
+    const params = new URLSearchParams();
+    if (this.publicSearch) params.set("q", this.publicSearch);
+    if (cursor) params.set("cursor", cursor);
+    const search = this.publicSearch;
+
     try {
-      const response = await fetch(`/api/communities/public?t=${Date.now()}`, {
+      const response = await fetch(`/api/communities/discover?${params}`, {
         cache: "no-store",
       });
       const data = await response.json();
 
+      // Ignore responses for a search the user has since changed
+      if (search !== this.publicSearch) return;
+
       if (data.status === "success") {
         const container = document.getElementById("public-communities-list");
-        this.renderPublicCommunities(data.data, container);
+        this.renderPublicCommunities(data.data.communities, container, !!cursor);
+        this.publicNextCursor = data.data.next_cursor;
+        document
+          .getElementById("public-communities-more")
+          ?.classList.toggle("hidden", !this.publicNextCursor);
       } else {
         this.showMessage(
           data.message || "Failed to load public communities",
@@ -225,14 +260,17 @@ class CommunityManager {
     }
   }
 
-  renderPublicCommunities(communities, container) {
+  renderPublicCommunities(communities, container, append = false) {
     if (!container) return;
 
-    container.innerHTML = "";
+    if (!append) {
+      container.innerHTML = "";
+    }
 
-    if (communities.length === 0) {
-      container.innerHTML =
-        '<p class="empty-state">No public communities available to join.</p>';
+    if (communities.length === 0 && !append) {
+      container.innerHTML = this.publicSearch
+        ? '<p class="empty-state">No public communities match your search.</p>'
+        : '<p class="empty-state">No public communities available to join.</p>';
       return;
     }
 
@@ -452,34 +490,42 @@ class CommunityManager {
     // Load messages
     await this.loadCommunityMessages(communityId);
 
-    // Start polling for new messages
-    this.startMessagePolling();
+    // Receive new messages as they are sent
+    this.startMessageStream();
   }
 
-  async loadCommunityMessages(communityId, page = 1) {
+  async loadCommunityMessages(communityId, afterId = null) {
+    // Without afterId: replace the chat with the latest page. With it: append
+    // only the messages sent since (an empty, cheap response when none were)
     try {
+      const query = afterId === null ? "" : `?after_id=${afterId}`;
       const response = await fetch(
-        `/api/communities/${communityId}/messages?page=${page}`
+        `/api/communities/${communityId}/messages${query}`
       );
       const data = await response.json();
 
       if (data.status === "success") {
         const messagesContainer = document.getElementById("chat-messages");
 
-        if (page === 1) {
+        if (afterId === null) {
           messagesContainer.innerHTML = "";
+          this.lastMessageId = 0;
         }
 
-        const orderedMessages = [...data.data.messages].sort(
-          (a, b) => new Date(a.created_at) - new Date(b.created_at)
-        );
+        const orderedMessages = [...data.data.messages]
+          .filter((message) => message.id > this.lastMessageId)
+          .sort(
+            (a, b) =>
+              new Date(a.created_at) - new Date(b.created_at) || a.id - b.id
+          );
 
         orderedMessages.forEach((message) => {
           this.renderMessage(message, messagesContainer);
+          this.lastMessageId = Math.max(this.lastMessageId, message.id);
         });
 
         // Scroll to bottom for new messages
-        if (page === 1) {
+        if (afterId === null || orderedMessages.length) {
           messagesContainer.scrollTop = messagesContainer.scrollHeight;
         }
       } else {
@@ -560,7 +606,7 @@ class CommunityManager {
 
       if (data.status === "success") {
         messageInput.value = "";
-        // Message will appear through polling
+        // Message will appear through the message stream
       } else {
         this.showMessage(data.message || "Failed to send message", "error");
       }
@@ -607,6 +653,54 @@ class CommunityManager {
     }
   }
 
+  startMessageStream() {
+    this.stopMessageStream();
+    this.stopMessagePolling();
+
+    if (!this.currentCommunity) return;
+    if (!window.EventSource) {
+      this.startMessagePolling();
+      return;
+    }
+
+    // The server sends the messages after lastMessageId, then each new one;
+    // on reconnects EventSource resumes from the last event id by itself
+    const communityId = this.currentCommunity.id;
+    const stream = new EventSource(
+      `/api/communities/${communityId}/stream?after_id=${this.lastMessageId}`
+    );
+
+    stream.addEventListener("message", (event) => {
+      if (!this.currentCommunity || this.currentCommunity.id !== communityId) {
+        return;
+      }
+      const message = JSON.parse(event.data);
+      if (message.id <= this.lastMessageId) return;
+
+      const messagesContainer = document.getElementById("chat-messages");
+      this.renderMessage(message, messagesContainer);
+      this.lastMessageId = message.id;
+      messagesContainer.scrollTop = messagesContainer.scrollHeight;
+    });
+
+    stream.addEventListener("error", () => {
+      // CLOSED means the server refused the stream (e.g. no ASGI server): poll instead
+      if (stream.readyState === EventSource.CLOSED && this.messageStream === stream) {
+        this.messageStream = null;
+        this.startMessagePolling();
+      }
+    });
+
+    this.messageStream = stream;
+  }
+
+  stopMessageStream() {
+    if (this.messageStream) {
+      this.messageStream.close();
+      this.messageStream = null;
+    }
+  }
+
   startMessagePolling() {
     if (this.messagePollingInterval) {
       clearInterval(this.messagePollingInterval);
@@ -614,7 +708,10 @@ class CommunityManager {
 
     this.messagePollingInterval = setInterval(() => {
       if (this.currentCommunity) {
-        this.loadCommunityMessages(this.currentCommunity.id);
+        this.loadCommunityMessages(
+          this.currentCommunity.id,
+          this.lastMessageId
+        );
       }
     }, 5000); // Poll every 5 seconds
   }
@@ -627,6 +724,7 @@ class CommunityManager {
   }
 
   closeCommunityChat() {
+    this.stopMessageStream();
     this.stopMessagePolling();
     this.currentCommunity = null;
 
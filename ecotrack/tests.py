@@ -1,3 +1,1259 @@
-from django.test import TestCase
+import asyncio
+import json
+import random
+from io import StringIO
+from unittest import mock
+from datetime import date, datetime, time, timedelta, timezone as dt_timezone
 
-# Create your tests here.
+import pytz
+
+from asgiref.sync import iscoroutinefunction
+from django.core.cache import cache
+from django.core.management import call_command
+from django.db.models import QuerySet
+from django.test import SimpleTestCase, TestCase, TransactionTestCase, override_settings
+from django.urls import reverse
+from django.utils import timezone
+
+from .benchmarks import generate_pool, generate_survey
+from .caching import SUGGESTIONS_PROMPT_VERSION, bump_dashboard_version, habits_fingerprint, suggestions_cache_key
+from .chat_stream import broker, format_event, message_events, serialize_message
+from .checks import check_dashboard_cache_backend
+from .daily_stats import recompute_achievements, roll_over_daily_stats
+from .dispatch import DISPATCH_LEASE_SECONDS, _claim_batch, _send_batch, reschedule_stale_devices
+from . import emission_factors
+from .emission_factors import DEFAULT_FACTORS, get_active_factors
+from .fake_transports import fake_messaging
+from .firebase_service import FCM_BATCH_SIZE, FCMService
+from .memberships import add_member, reconcile_member_counts, remove_member
+from .message_search import search_messages
+from .middleware import MetricsMiddleware
+from .footprint_batch import (
+    ENCODING_ERRORS, calculate_carbon_footprint_batch, calculate_carbon_footprints, rescore_footprints,
+)
+from .llm_service import LLMUnavailable
+from .models import (
+    AndroidDevice, Community, CommunityMembership, CommunityMessage, DailyQuestionSet, EmissionFactorSet, Habit,
+    ReminderCopy, User,
+)
+from .questions import SAMPLE_QUESTIONS, get_cached_questions, get_daily_questions, score_answers, store_questions
+from .reminder_copy import REMINDER_FALLBACK_BODY, REMINDER_REPEAT_DAYS, add_copy, get_reminder_body, schedule_copy
+from .search import COMMUNITY_INDEX, search_filter
+from .utils import calculate_personal_carbon_footprint, next_fire_at_utc
+
+
+@override_settings(
+    QUERY_BUDGET_MODE='raise',
+    FCM_TRANSPORT='fake',
+    LLM_TRANSPORT='fake',
+    FAKE_FCM_LATENCY_MS=0,
+    FAKE_GEMINI_LATENCY_MS=0,
+    CRON_SECRET='cron-secret',
+)
+class QueryBudgetTests(TransactionTestCase):
+    """
+    Every @query_budget view stays within its budget as the data behind it grows;
+    QUERY_BUDGET_MODE='raise' turns an over-budget request into a test failure.
+
+    A TransactionTestCase, so views run their atomic blocks as they do in
+    production instead of inside a test transaction's savepoints.
+    """
+
+    # Rows added per owner between calls: an N+1 pattern shows up as a budget overrun
+    SIZES = (1, 10, 30)
+
+    def setUp(self):
+        self.user = User.objects.create_user(
+            username='budget', email='budget@example.com', password='secret',
+            survey_answered=True, user_data=generate_survey(random.Random(0)),
+        )
+        self.client.force_login(self.user)
+        self.community = Community.objects.create(name='Budget community', creator=self.user, member_count=1)
+        CommunityMembership.objects.create(community=self.community, user=self.user)
+        self.seeded = 0
+
+    def grow(self, size):
+        """Add devices, habits, communities, memberships and messages until there are `size` of each."""
+        for i in range(self.seeded, size):
+            member = User.objects.create_user(username=f'member-{i}', email=f'member-{i}@example.com')
+            AndroidDevice.objects.create(user=self.user, device_id=f'own-{i}', fcm_token=f'own-token-{i}')
+            AndroidDevice.objects.create(user=member, device_id=f'member-{i}', fcm_token=f'member-token-{i}')
+            Habit.objects.create(user=self.user, text=f'Habit {i}')
+            community = Community.objects.create(name=f'Community {i}', creator=member, member_count=1)
+            CommunityMembership.objects.create(community=community, user=member)
+            CommunityMembership.objects.create(community=self.community, user=member)
+            CommunityMessage.objects.create(community=self.community, sender=member, content=f'Garden tip {i}')
+        self.seeded = max(self.seeded, size)
+
+    def post(self, name, payload=None, **kwargs):
+        return self.client.post(reverse(name, kwargs=kwargs or None), json.dumps(payload or {}),
+                                content_type='application/json')
+
+    def assertWithinBudget(self, call, status=200):
+        for size in self.SIZES:
+            with self.subTest(size=size):
+                self.grow(size)
+                response = call()
+                self.assertEqual(response.status_code, status, response.content)
+
+    def test_account_views(self):
+        self.client.logout()
+        self.assertEqual(self.post('signup', {'email': 'new@example.com', 'password': 'secret'}).status_code, 200)
+        self.client.logout()
+        self.assertWithinBudget(lambda: self.post('login', {'email': 'budget@example.com', 'password': 'secret'}))
+
+    def test_dashboard_views(self):
+        self.assertWithinBudget(lambda: self.client.get(reverse('get_user_data')))
+        self.assertWithinBudget(lambda: self.client.get(reverse('get_footprint_history')))
+
+    def test_survey(self):
+        self.assertWithinBudget(lambda: self.post('survey', generate_survey(random.Random(0))))
+        self.assertWithinBudget(lambda: self.post('survey', {'skip': True}))
+
+    def test_habit_views(self):
+        self.assertWithinBudget(lambda: self.post('save_habit', {'habit_text': 'Cycle to work'}))
+        habit = Habit.objects.filter(user=self.user).first()
+        self.assertWithinBudget(lambda: self.post('update_habit', {'habit_id': habit.id, 'habit_text': 'Walk'}))
+        self.assertWithinBudget(lambda: self.post('complete_habit', {'habit_id': habit.id}))
+        self.assertWithinBudget(lambda: self.post('get_habit_category_suggestions', {'category': 'travel'}))
+        self.assertWithinBudget(
+            lambda: self.post('delete_habit', {'habit_id': Habit.objects.filter(user=self.user).first().id})
+        )
+
+    def test_question_views(self):
+        self.assertWithinBudget(lambda: self.post('get_questions'))
+        self.assertWithinBudget(lambda: self.post('submit_questionnaire', {'q1': 'Walk/Cycle', 'q2': 'Yes'}))
+        self.assertWithinBudget(lambda: self.post('get_suggestions', {'category': 'food'}))
+
+    def test_device_views(self):
+        self.assertWithinBudget(lambda: self.post('register_android_device', {
+            'fcmToken': 'registered-token', 'deviceId': 'registered-device', 'timezone': 'Europe/Berlin',
+        }))
+        self.assertWithinBudget(lambda: self.post('update_notification_settings', {
+            'deviceId': 'registered-device', 'notificationTime': '07:30', 'dailyReminders': True,
+        }))
+        self.assertWithinBudget(lambda: self.client.get(reverse('get_android_devices')))
+        self.assertWithinBudget(lambda: self.post('test_notification'))
+        self.assertWithinBudget(lambda: self.post('send_achievement_notification', {'title': 'Well done'}))
+        self.assertWithinBudget(lambda: self.post('unregister_android_device', {'deviceId': 'registered-device'}))
+        self.assertWithinBudget(lambda: self.post('unregister_android_device'))
+
+    def test_cron_dispatch(self):
+        self.assertWithinBudget(
+            lambda: self.client.get(reverse('cron_dispatch'), {'token': 'cron-secret'}), status=202
+        )
+
+    def test_community_views(self):
+        created = iter(range(len(self.SIZES)))
+        self.assertWithinBudget(lambda: self.post('create_community', {'name': f'Created {next(created)}'}))
+        self.assertWithinBudget(lambda: self.client.get(reverse('get_user_communities')))
+        self.assertWithinBudget(lambda: self.client.get(reverse('get_public_communities')))
+        self.assertWithinBudget(lambda: self.client.get(reverse('discover_communities'), {'q': 'commun'}))
+
+        def join_and_leave():
+            community = Community.objects.exclude(memberships__user=self.user).filter(is_private=False).first()
+            response = self.post('join_community', {'community_id': community.id})
+            self.assertEqual(response.status_code, 200, response.content)
+            return self.post('leave_community', {'community_id': community.id})
+        self.assertWithinBudget(join_and_leave)
+
+    def test_message_views(self):
+        community_id = self.community.id
+        self.assertWithinBudget(lambda: self.post('send_message', {'community_id': community_id, 'content': 'Hi'}))
+        self.assertWithinBudget(lambda: self.client.get(reverse('get_community_messages', args=[community_id])))
+        first_id = CommunityMessage.objects.order_by('id').first().id
+        self.assertWithinBudget(lambda: self.client.get(
+            reverse('get_community_messages', args=[community_id]), {'after_id': first_id}
+        ))
+        self.assertWithinBudget(lambda: self.client.get(
+            reverse('search_community_messages', args=[community_id]), {'q': 'gard'}
+        ))
+
+
+class FootprintBatchTests(SimpleTestCase):
+    """The batch calculator matches calculate_personal_carbon_footprint survey for survey."""
+
+    MALFORMED = [
+        {'how_many_vehicles_are_in_your_household': 'nan'},
+        {'how_many_flights_have_you_taken_in_the_past_year': 'inf'},
+        {'how_many_people_are_in_your_household': 'inf'},
+        ['not', 'a', 'survey'],
+    ]
+
+    def surveys(self):
+        surveys = generate_pool(generate_survey, size=300, seed=7)
+        # Missing answers, unknown options and numbers sent as strings use the scalar defaults
+        surveys += [
+            {},
+            {'what_best_describes_your_diet': 'Fruitarian', 'vehicle_1_type': 'Hovercraft'},
+            {'how_many_vehicles_are_in_your_household': '2', 'vehicle_1_mileage': '1200.5',
+             'how_many_people_are_in_your_household': '0'},
+        ]
+        return surveys
+
+    def test_matches_scalar_results(self):
+        surveys = self.surveys()
+        expected = [calculate_personal_carbon_footprint(survey, DEFAULT_FACTORS) for survey in surveys]
+        self.assertEqual(calculate_carbon_footprints(surveys, DEFAULT_FACTORS), expected)
+        self.assertEqual(
+            calculate_carbon_footprint_batch(surveys, DEFAULT_FACTORS).monthly_co2e_kg(),
+            [result['summary']['personal_monthly_co2e_kg'] for result in expected],
+        )
+
+    def test_malformed_surveys_are_none(self):
+        for survey in self.MALFORMED:
+            with self.subTest(survey=survey), self.assertRaises(ENCODING_ERRORS):
+                calculate_personal_carbon_footprint(survey, DEFAULT_FACTORS)
+
+        valid = self.surveys()[:3]
+        surveys = [valid[0], self.MALFORMED[0], valid[1], *self.MALFORMED[1:], valid[2]]
+        results = calculate_carbon_footprints(surveys, DEFAULT_FACTORS)
+        self.assertEqual(
+            [result is None for result in results],
+            [False, True, False] + [True] * (len(self.MALFORMED) - 1) + [False],
+        )
+        self.assertEqual(
+            [result for result in results if result is not None],
+            [calculate_personal_carbon_footprint(survey, DEFAULT_FACTORS) for survey in valid],
+        )
+        self.assertEqual(calculate_carbon_footprint_batch(surveys, DEFAULT_FACTORS).monthly_co2e_kg()[1], None)
+
+
+class ClaimBatchTests(TestCase):
+    """_claim_batch splits a cohort between lease owners and hands back expired leases."""
+
+    COHORT = 25
+
+    def setUp(self):
+        self.now = timezone.now().replace(second=0, microsecond=0)
+        user = User.objects.create_user(username='leases', email='leases@example.com')
+        AndroidDevice.objects.bulk_create([
+            AndroidDevice(user=user, device_id=f'lease-{i}', fcm_token=f'lease-token-{i}', next_fire_at=self.now)
+            for i in range(self.COHORT)
+        ])
+        self.due = AndroidDevice.objects.filter(next_fire_at=self.now).order_by('next_fire_at', 'id')
+
+    def claim(self, owner, now=None, limit=4):
+        return {device.id for device in _claim_batch(self.due, owner, now or self.now, limit=limit)}
+
+    def test_owners_claim_disjoint_batches_covering_the_cohort(self):
+        claimed = {'worker-a': set(), 'worker-b': set()}
+        while True:
+            batches = {owner: self.claim(owner) for owner in claimed}
+            if not any(batches.values()):
+                break
+            self.assertFalse(batches['worker-a'] & batches['worker-b'])
+            for owner, ids in batches.items():
+                self.assertFalse(ids & (claimed['worker-a'] | claimed['worker-b']))  # No device claimed twice
+                claimed[owner] |= ids
+
+        self.assertTrue(claimed['worker-a'] and claimed['worker-b'])
+        self.assertEqual(claimed['worker-a'] | claimed['worker-b'], set(self.due.values_list('id', flat=True)))
+        self.assertEqual(
+            set(AndroidDevice.objects.filter(dispatch_lease_owner='worker-a').values_list('id', flat=True)),
+            claimed['worker-a'],
+        )
+
+    def test_losing_the_race_for_a_whole_batch_picks_again(self):
+        # worker-b leases the rows worker-a picked between worker-a's SELECT and UPDATE
+        stolen = set()
+        real_update = QuerySet.update
+
+        def interleaved(queryset, **kwargs):
+            if kwargs.get('dispatch_lease_owner') == 'worker-a' and not stolen:
+                stolen.update(self.claim('worker-b'))
+            return real_update(queryset, **kwargs)
+
+        with mock.patch.object(QuerySet, 'update', autospec=True, side_effect=interleaved):
+            claimed = self.claim('worker-a')
+
+        self.assertEqual(len(stolen), 4)
+        self.assertEqual(len(claimed), 4)
+        self.assertFalse(claimed & stolen)
+        self.assertEqual(
+            set(AndroidDevice.objects.filter(dispatch_lease_owner='worker-a').values_list('id', flat=True)),
+            claimed,
+        )
+
+    def test_expired_leases_are_claimable_again(self):
+        held = self.claim('worker-a', limit=self.COHORT)
+        self.assertEqual(len(held), self.COHORT)
+        self.assertEqual(self.claim('worker-b'), set())
+
+        still_leased = self.now + timedelta(seconds=DISPATCH_LEASE_SECONDS - 1)
+        self.assertEqual(self.claim('worker-b', now=still_leased), set())
+
+        expired = self.now + timedelta(seconds=DISPATCH_LEASE_SECONDS + 1)
+        taken_over = self.claim('worker-b', now=expired, limit=self.COHORT)
+        self.assertEqual(taken_over, held)
+        self.assertFalse(AndroidDevice.objects.filter(dispatch_lease_owner='worker-a').exists())
+
+
+@override_settings(FCM_TRANSPORT='fake', FAKE_FCM_LATENCY_MS=0)
+class SendBatchTests(TestCase):
+    """Delivery through the fake FCM transport and the bookkeeping _send_batch writes back."""
+
+    def setUp(self):
+        self.fire_at = utc(2026, 3, 9, 13)  # 09:00 in New York
+        self.user = User.objects.create_user(username='batch', email='batch@example.com')
+
+    def device(self, token):
+        device = AndroidDevice.objects.create(
+            user=self.user, device_id=f'device-{token}', fcm_token=token, notification_time=time(9),
+            timezone='America/New_York', dispatch_lease_owner='worker-a',
+            dispatch_lease_expires_at=self.fire_at + timedelta(seconds=DISPATCH_LEASE_SECONDS),
+        )
+        AndroidDevice.objects.filter(pk=device.pk).update(next_fire_at=self.fire_at)
+        device.refresh_from_db()
+        return device
+
+    def test_send_multicast_chunks_tokens(self):
+        tokens = [f'token-{i}' for i in range(FCM_BATCH_SIZE * 2 + 1)] + ['unregistered-token']
+        before = fake_messaging.stats().get('requests', 0)
+        result = FCMService.send_multicast(tokens, 'Title', 'Body')
+
+        self.assertEqual(fake_messaging.stats()['requests'] - before, 3)
+        self.assertEqual(result['success_count'], len(tokens) - 1)
+        self.assertEqual(result['failed_tokens'], ['unregistered-token'])
+        self.assertEqual(result['unregistered_tokens'], ['unregistered-token'])
+
+    def test_bookkeeping(self):
+        sent = self.device('delivered')
+        unregistered = self.device('unregistered-gone')
+        tokenless = self.device('')
+        devices = [sent, unregistered, tokenless]
+        now = self.fire_at + timedelta(seconds=5)
+
+        with self.assertNumQueries(1):  # One bulk_update for the whole batch
+            sent_count, failed_ids = _send_batch(devices, 'Body', now)
+
+        self.assertEqual(sent_count, 1)
+        self.assertEqual(set(failed_ids), {unregistered.id, tokenless.id})
+        rows = {device.id: device for device in AndroidDevice.objects.all()}
+        self.assertEqual(rows[sent.id].total_notifications_sent, 1)
+        self.assertEqual(rows[sent.id].last_notification_sent, now)
+        self.assertEqual((rows[sent.id].last_sent_date, rows[sent.id].last_sent_time), (date(2026, 3, 9), time(9)))
+        self.assertFalse(rows[unregistered.id].is_active)
+        self.assertIsNone(rows[unregistered.id].next_fire_at)
+        self.assertEqual(rows[unregistered.id].total_notifications_sent, 0)
+        self.assertTrue(rows[tokenless.id].is_active)
+        self.assertEqual(rows[tokenless.id].total_notifications_sent, 0)
+        for device_id in (sent.id, tokenless.id):
+            self.assertEqual(rows[device_id].next_fire_at, utc(2026, 3, 10, 13))
+        for row in rows.values():
+            self.assertEqual((row.dispatch_lease_owner, row.dispatch_lease_expires_at), ('', None))
+
+
+def utc(*args):
+    return datetime(*args, tzinfo=dt_timezone.utc)
+
+
+class NextFireAtTests(SimpleTestCase):
+    """next_fire_at_utc outside the server's own zone, including DST transitions."""
+
+    def test_timezones(self):
+        cases = [
+            # (local time, zone, after, next fire in UTC)
+            (time(9), 'America/New_York', utc(2026, 1, 15, 13), utc(2026, 1, 15, 14)),
+            (time(9), 'America/New_York', utc(2026, 7, 15, 12, 59), utc(2026, 7, 15, 13)),
+            (time(9), 'Asia/Kathmandu', utc(2026, 1, 1), utc(2026, 1, 1, 3, 15)),
+            (time(7, 30), 'Pacific/Auckland', utc(2026, 1, 1), utc(2026, 1, 1, 18, 30)),
+            (time(22), 'America/Los_Angeles', utc(2026, 6, 1, 6), utc(2026, 6, 2, 5)),
+            (time(9), 'Mars/Olympus_Mons', utc(2026, 1, 1, 10), utc(2026, 1, 2, 9)),
+        ]
+        for local, zone, after, expected in cases:
+            with self.subTest(zone=zone, after=after):
+                self.assertEqual(next_fire_at_utc(local, zone, after), expected)
+
+    def test_fires_at_the_local_time_across_dst_changes(self):
+        cases = [
+            ('America/New_York', utc(2026, 3, 5)),   # Spring forward on March 8
+            ('America/New_York', utc(2026, 10, 29)),  # Fall back on November 1
+            ('Europe/London', utc(2026, 3, 26)),  # Spring forward on March 29
+            ('Australia/Sydney', utc(2026, 4, 2)),  # Fall back on April 5
+        ]
+        for zone, start in cases:
+            with self.subTest(zone=zone, start=start):
+                tz = pytz.timezone(zone)
+                fire_at = start
+                local_days = []
+                for _ in range(7):
+                    fire_at = next_fire_at_utc(time(9), zone, fire_at)
+                    local = fire_at.astimezone(tz)
+                    self.assertEqual((local.hour, local.minute), (9, 0))
+                    local_days.append(local.date())
+                # Exactly one reminder per local day
+                self.assertEqual(local_days, [local_days[0] + timedelta(days=i) for i in range(7)])
+
+    def test_times_skipped_or_repeated_by_dst_fire_once(self):
+        # 02:30 does not exist on March 8 in New York; it fires at 03:30 EDT
+        self.assertEqual(
+            next_fire_at_utc(time(2, 30), 'America/New_York', utc(2026, 3, 7, 15)), utc(2026, 3, 8, 7, 30)
+        )
+        # 01:30 happens twice on November 1; only the second (EST) one fires
+        first = next_fire_at_utc(time(1, 30), 'America/New_York', utc(2026, 10, 31, 12))
+        self.assertEqual(first, utc(2026, 11, 1, 6, 30))
+        self.assertEqual(next_fire_at_utc(time(1, 30), 'America/New_York', first), utc(2026, 11, 2, 6, 30))
+
+
+class RescheduleStaleDevicesTests(TestCase):
+
+    def setUp(self):
+        self.now = utc(2026, 3, 8, 12)
+        self.window_start = self.now - timedelta(minutes=10)
+        self.user = User.objects.create_user(username='stale', email='stale@example.com')
+
+    def device(self, name, next_fire_at, **fields):
+        device = AndroidDevice.objects.create(
+            user=self.user, device_id=name, fcm_token=f'{name}-token', notification_time=time(9),
+            timezone='America/New_York', **fields,
+        )
+        # Set after save(), which would otherwise recompute it
+        AndroidDevice.objects.filter(pk=device.pk).update(next_fire_at=next_fire_at)
+        return device
+
+    def test_reschedules_only_deliverable_devices_in_chunks(self):
+        stale_at = utc(2026, 3, 7, 14)
+        stale = [self.device(f'stale-{i}', stale_at) for i in range(5)]
+        inactive = self.device('inactive', stale_at, is_active=False)
+        muted = self.device('muted', stale_at, daily_reminders_enabled=False)
+        due = self.device('due', self.window_start + timedelta(minutes=1))
+
+        self.assertEqual(reschedule_stale_devices(self.window_start, self.now, chunk_size=2), 5)
+
+        next_fire_at = dict(AndroidDevice.objects.values_list('device_id', 'next_fire_at'))
+        for device in stale:
+            # 09:00 EDT, on the day DST started
+            self.assertEqual(next_fire_at[device.device_id], utc(2026, 3, 8, 13))
+        self.assertEqual(next_fire_at[inactive.device_id], stale_at)
+        self.assertEqual(next_fire_at[muted.device_id], stale_at)
+        self.assertEqual(next_fire_at[due.device_id], self.window_start + timedelta(minutes=1))
+        self.assertEqual(reschedule_stale_devices(self.window_start, self.now, chunk_size=2), 0)
+
+
+class DeviceSaveTests(TestCase):
+    """AndroidDevice.save() only moves next_fire_at when the reminder schedule changes."""
+
+    def setUp(self):
+        user = User.objects.create_user(username='saver', email='saver@example.com')
+        self.due_at = timezone.now().replace(second=0, microsecond=0) - timedelta(minutes=1)
+        device = AndroidDevice.objects.create(user=user, device_id='saver', fcm_token='saver-token')
+        # Due a minute ago and not sent yet
+        AndroidDevice.objects.filter(pk=device.pk).update(next_fire_at=self.due_at)
+        self.device = AndroidDevice.objects.get(pk=device.pk)
+
+    def saved_next_fire_at(self, **kwargs):
+        self.device.save(**kwargs)
+        return AndroidDevice.objects.values_list('next_fire_at', flat=True).get(pk=self.device.pk)
+
+    def test_unchanged_schedule_keeps_a_pending_reminder(self):
+        self.device.device_name = 'Pixel'
+        self.assertEqual(self.saved_next_fire_at(), self.due_at)
+        self.device.is_active = True
+        self.assertEqual(self.saved_next_fire_at(update_fields=['is_active']), self.due_at)
+
+    def test_schedule_change_reschedules(self):
+        self.device.notification_time = (self.due_at + timedelta(hours=2)).time()
+        self.assertGreater(self.saved_next_fire_at(), timezone.now())
+
+        self.device.daily_reminders_enabled = False
+        self.assertIsNone(self.saved_next_fire_at(update_fields=['daily_reminders_enabled']))
+
+    def test_missing_next_fire_at_is_scheduled(self):
+        AndroidDevice.objects.filter(pk=self.device.pk).update(next_fire_at=None)
+        self.device = AndroidDevice.objects.get(pk=self.device.pk)
+        self.assertGreater(self.saved_next_fire_at(), timezone.now())
+
+
+@override_settings(FCM_TRANSPORT='fake', FAKE_FCM_LATENCY_MS=0)
+class SendDailyNotificationsCommandTests(TestCase):
+
+    def setUp(self):
+        self.user = User.objects.create_user(username='reminded', email='reminded@example.com')
+        self.device = AndroidDevice.objects.create(user=self.user, device_id='reminded', fcm_token='reminded-token')
+        AndroidDevice.objects.filter(pk=self.device.pk).update(next_fire_at=timezone.now())
+
+    def run_command(self, *args):
+        out = StringIO()
+        call_command('send_daily_notifications', *args, stdout=out)
+        return out.getvalue()
+
+    def test_dry_run_sends_nothing(self):
+        out = self.run_command('--dry-run')
+        self.assertIn(str(self.device), out)
+        self.device.refresh_from_db()
+        self.assertEqual(self.device.total_notifications_sent, 0)
+
+    def test_sends_due_reminders(self):
+        self.assertIn('Sent: 1 FCM notifications', self.run_command())
+        self.device.refresh_from_db()
+        self.assertEqual(self.device.total_notifications_sent, 1)
+        self.assertGreater(self.device.next_fire_at, timezone.now())
+
+
+@override_settings(METRICS_ENABLED=True)
+class MetricsMiddlewareTests(TestCase):
+    """MetricsMiddleware times requests under both the WSGI and the ASGI handler."""
+
+    def setUp(self):
+        self.user = User.objects.create_user(username='metrics', email='metrics@example.com')
+
+    def test_adapts_to_the_handler_mode(self):
+        async def get_response(request):
+            pass
+
+        self.assertTrue(MetricsMiddleware.async_capable and MetricsMiddleware.sync_capable)
+        self.assertTrue(iscoroutinefunction(MetricsMiddleware(get_response)))
+        self.assertFalse(iscoroutinefunction(MetricsMiddleware(lambda request: None)))
+
+    def test_sync_request(self):
+        self.client.force_login(self.user)
+        with mock.patch('ecotrack.metrics.observe_request') as observe_request:
+            self.assertEqual(self.client.get(reverse('get_footprint_history')).status_code, 200)
+        view, method, status_code, _, query_count, _ = observe_request.call_args.args
+        self.assertEqual((view, method, status_code), ('get_footprint_history', 'GET', 200))
+        self.assertGreaterEqual(query_count, 3)  # Session, user and the view's own query
+
+    async def test_async_request(self):
+        await self.async_client.aforce_login(self.user)
+        with mock.patch('ecotrack.metrics.observe_request') as observe_request:
+            response = await self.async_client.get(reverse('get_footprint_history'))
+        self.assertEqual(response.status_code, 200)
+        view, method, status_code, _, query_count, _ = observe_request.call_args.args
+        self.assertEqual((view, method, status_code), ('get_footprint_history', 'GET', 200))
+        self.assertGreaterEqual(query_count, 3)
+
+
+class CommunityMessagePagingTests(TestCase):
+    """get_community_messages cursors over messages that share created_at timestamps."""
+
+    def setUp(self):
+        self.user = User.objects.create_user(username='pager', email='pager@example.com')
+        self.client.force_login(self.user)
+        self.community = Community.objects.create(name='Paging', creator=self.user, member_count=1)
+        CommunityMembership.objects.create(community=self.community, user=self.user)
+        CommunityMessage.objects.bulk_create([
+            CommunityMessage(community=self.community, sender=self.user, content=f'Message {i}') for i in range(23)
+        ])
+        # Three runs of identical timestamps, out of id order across runs
+        self.base = base = timezone.now().replace(microsecond=0)
+        ids = list(CommunityMessage.objects.order_by('id').values_list('id', flat=True))
+        for offset, run in ((2, ids[:9]), (0, ids[9:15]), (1, ids[15:])):
+            CommunityMessage.objects.filter(id__in=run).update(created_at=base + timedelta(seconds=offset))
+        # Newest first in (created_at, id) order
+        self.expected = list(
+            CommunityMessage.objects.order_by('-created_at', '-id').values_list('id', flat=True)
+        )
+
+    def page(self, **params):
+        response = self.client.get(
+            reverse('get_community_messages', args=[self.community.id]), {'limit': 4, **params}
+        )
+        self.assertEqual(response.status_code, 200, response.content)
+        return response.json()['data']
+
+    def test_before_id_pages_have_no_gaps_or_duplicates(self):
+        page = self.page()
+        seen = [message['id'] for message in page['messages']]
+        while page['has_more']:
+            page = self.page(before_id=page['oldest_id'])
+            seen += [message['id'] for message in page['messages']]
+        self.assertEqual(seen, self.expected)
+
+    def test_after_id_pages_have_no_gaps_or_duplicates(self):
+        oldest = self.expected[-1]
+        seen = [oldest]
+        page = self.page(after_id=oldest)
+        while page['messages']:
+            # Each page is newest first; the next poll continues from its newest message
+            seen += [message['id'] for message in reversed(page['messages'])]
+            page = self.page(after_id=page['newest_id'])
+        self.assertEqual(seen, self.expected[::-1])
+
+    def test_after_id_without_new_messages_is_empty(self):
+        page = self.page(after_id=self.expected[0])
+        self.assertEqual(page['messages'], [])
+        self.assertFalse(page['has_more'])
+        self.assertIsNone(page['newest_id'])
+
+        message = CommunityMessage.objects.create(community=self.community, sender=self.user, content='New')
+        CommunityMessage.objects.filter(id=message.id).update(created_at=self.base + timedelta(seconds=2))
+        page = self.page(after_id=self.expected[0])
+        self.assertEqual([m['id'] for m in page['messages']], [message.id])
+
+
+class SearchTests(TestCase):
+    """FTS5-backed community and message search, and the icontains fallback."""
+
+    def setUp(self):
+        self.user = User.objects.create_user(username='searcher', email='searcher@example.com')
+        self.community = Community.objects.create(name='Eco Gardeners', description='Compost and seeds',
+                                                  creator=self.user)
+        self.other = Community.objects.create(name='Bike Commuters', creator=self.user)
+
+    def message(self, content, community=None):
+        return CommunityMessage.objects.create(community=community or self.community, sender=self.user,
+                                               content=content)
+
+    def search_ids(self, text, **kwargs):
+        results, _ = search_messages(self.community.id, text, **kwargs)
+        return [message.id for message, _ in results]
+
+    def community_ids(self, text):
+        return set(search_filter(Community.objects.all(), COMMUNITY_INDEX, text).values_list('id', flat=True))
+
+    def test_triggers_keep_the_index_in_sync(self):
+        message = self.message('Planting tomatoes today')
+        self.assertEqual(self.search_ids('tomatoes'), [message.id])
+
+        message.content = 'Planting peppers today'
+        message.save()
+        self.assertEqual(self.search_ids('tomatoes'), [])
+        self.assertEqual(self.search_ids('peppers'), [message.id])
+
+        # Queryset updates and deletes bypass the model but not the triggers
+        CommunityMessage.objects.filter(id=message.id).update(content='Planting beans today')
+        self.assertEqual(self.search_ids('peppers'), [])
+        self.assertEqual(self.search_ids('beans'), [message.id])
+        CommunityMessage.objects.filter(id=message.id).delete()
+        self.assertEqual(self.search_ids('beans'), [])
+
+        Community.objects.filter(id=self.other.id).update(description='Rain gear swaps')
+        self.assertEqual(self.community_ids('rain'), {self.other.id})
+        self.other.delete()
+        self.assertEqual(self.community_ids('rain'), set())
+
+    def test_prefix_queries(self):
+        gardening = self.message('Gardening with kids')
+        self.message('Guarded optimism')
+        self.message('Gardening elsewhere', community=self.other)
+        self.assertEqual(self.search_ids('gard'), [gardening.id])
+        self.assertEqual(self.search_ids('GARD with'), [gardening.id])
+        self.assertEqual(self.search_ids('gard without'), [])
+        # FTS5 syntax in the input is matched as plain words
+        self.assertEqual(self.search_ids('"gard* kid)'), [gardening.id])
+        self.assertEqual(self.community_ids('eco gard'), {self.community.id})
+
+    def test_relevance_cursor(self):
+        for repeats in (1, 3, 2, 3, 1, 2, 3, 1):
+            self.message(' '.join(['compost'] * repeats + ['bin']))
+        self.message('Nothing relevant')
+
+        results, cursor = search_messages(self.community.id, 'compost', limit=3)
+        pages = [results]
+        while cursor:
+            results, cursor = search_messages(self.community.id, 'compost', cursor=cursor, limit=3)
+            pages.append(results)
+
+        self.assertEqual([len(page) for page in pages], [3, 3, 2])
+        ranked = [(score, message.id) for page in pages for message, score in page]
+        self.assertEqual(ranked, sorted(ranked))  # bm25 ascending, ties broken by id
+        self.assertEqual(len({message_id for _, message_id in ranked}), 8)
+        # More occurrences rank first
+        self.assertEqual(pages[0][0][0].content, 'compost compost compost bin')
+
+    def test_recent_cursor(self):
+        ids = [self.message(f'Seed swap {i}').id for i in range(5)]
+        first = search_messages(self.community.id, 'seed', order='recent', limit=3)
+        second = search_messages(self.community.id, 'seed', order='recent', cursor=first[1], limit=3)
+        self.assertEqual([m.id for m, _ in first[0] + second[0]], ids[::-1])
+        self.assertIsNone(second[1])
+
+    def test_icontains_fallback_without_fts5(self):
+        seeds = [self.message(f'Seed library {i}').id for i in range(3)]
+        self.message('Seedless grapes', community=self.other)
+        self.message('Compost notes')
+
+        with mock.patch('ecotrack.search.fts_supported', return_value=False), \
+                mock.patch('ecotrack.message_search.fts_supported', return_value=False):
+            # Relevance falls back to the recent order
+            results, cursor = search_messages(self.community.id, 'seed libr', limit=2)
+            self.assertEqual([message.id for message, _ in results], seeds[:0:-1])
+            self.assertEqual([score for _, score in results], [None, None])
+            results, cursor = search_messages(self.community.id, 'seed libr', cursor=cursor, limit=2)
+            self.assertEqual([message.id for message, _ in results], seeds[:1])
+            self.assertIsNone(cursor)
+
+            self.assertEqual(self.community_ids('GARDENERS compost'), {self.community.id})
+            self.assertEqual(self.community_ids('!!'), set())
+
+
+class UpdateHabitTests(TestCase):
+
+    def setUp(self):
+        self.user = User.objects.create_user(username='habits', email='habits@example.com')
+        self.client.force_login(self.user)
+        self.habit = Habit.objects.create(user=self.user, text='Cycle to work')
+
+    def update(self, habit_id, text):
+        return self.client.post(reverse('update_habit'), json.dumps({'habit_id': habit_id, 'habit_text': text}),
+                                content_type='application/json')
+
+    def test_strips_text(self):
+        self.assertEqual(self.update(self.habit.id, '  Walk to work \n').status_code, 200)
+        self.habit.refresh_from_db()
+        self.assertEqual(self.habit.text, 'Walk to work')
+
+    def test_rejects_empty_text(self):
+        for text in ('', '   ', None):
+            with self.subTest(text=text):
+                self.assertEqual(self.update(self.habit.id, text).status_code, 400)
+        self.habit.refresh_from_db()
+        self.assertEqual(self.habit.text, 'Cycle to work')
+
+    def test_unknown_or_foreign_habit_is_not_found(self):
+        other = User.objects.create_user(username='other', email='other@example.com')
+        foreign = Habit.objects.create(user=other, text='Take the bus')
+        for habit_id in (foreign.id, 0, 'abc'):
+            with self.subTest(habit_id=habit_id):
+                self.assertEqual(self.update(habit_id, 'Walk').status_code, 404)
+        foreign.refresh_from_db()
+        self.assertEqual(foreign.text, 'Take the bus')
+
+
+@override_settings(LLM_TRANSPORT='fake', FAKE_GEMINI_LATENCY_MS=0)
+class DashboardCacheTests(TestCase):
+    """get_user_data's ETag and payload cache follow dashboard_version."""
+
+    def setUp(self):
+        cache.clear()
+        self.user = User.objects.create_user(
+            username='dashboard', email='dashboard@example.com',
+            survey_answered=True, user_data=generate_survey(random.Random(0)),
+        )
+        self.client.force_login(self.user)
+        self.habit = Habit.objects.create(user=self.user, text='Cycle to work')
+        get_active_factors()  # measure the views, not the periodic factor reload
+
+    def dashboard(self, etag=None):
+        headers = {'HTTP_IF_NONE_MATCH': etag} if etag else {}
+        return self.client.get(reverse('get_user_data'), **headers)
+
+    def post(self, name, payload):
+        response = self.client.post(reverse(name), json.dumps(payload), content_type='application/json')
+        self.assertEqual(response.status_code, 200, response.content)
+
+    def assertInvalidated(self, etag):
+        """The dashboard changed since `etag`: a full 200 with a new ETag. Returns the new ETag."""
+        response = self.dashboard(etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertNotEqual(response['ETag'], etag)
+        return response['ETag']
+
+    def test_unchanged_dashboard_is_not_modified(self):
+        response = self.dashboard()
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response['Cache-Control'], 'private, no-cache')
+        etag = response['ETag']
+        self.assertEqual(self.dashboard(etag).status_code, 304)
+        # Without a validator the cached payload is served as is
+        self.assertEqual(self.dashboard().content, response.content)
+
+    def test_habit_edits_invalidate(self):
+        etag = self.dashboard()['ETag']
+        self.post('save_habit', {'habit_text': 'Walk to work'})
+        etag = self.assertInvalidated(etag)
+        self.assertIn('Walk to work', [h['text'] for h in self.dashboard().json()['data']['habits']])
+
+        self.post('update_habit', {'habit_id': self.habit.id, 'habit_text': 'Take the train'})
+        etag = self.assertInvalidated(etag)
+        self.post('delete_habit', {'habit_id': self.habit.id})
+        etag = self.assertInvalidated(etag)
+        self.assertEqual([h['text'] for h in self.dashboard().json()['data']['habits']], ['Walk to work'])
+
+    def test_survey_invalidates(self):
+        etag = self.dashboard()['ETag']
+        self.post('survey', generate_survey(random.Random(1)))
+        etag = self.assertInvalidated(etag)
+        self.post('survey', {'skip': True})
+        self.assertInvalidated(etag)
+        self.assertTrue(self.dashboard().json()['data']['survey_skipped'])
+
+    def test_check_in_invalidates(self):
+        etag = self.dashboard()['ETag']
+        self.post('submit_questionnaire', {'q1': 'Walk/Cycle'})
+        self.assertInvalidated(etag)
+        self.assertEqual(self.dashboard().json()['data']['streak'], 1)
+
+    def concurrent_bump(self):
+        """Bump the version from another request's copy of the user."""
+        bump_dashboard_version(User.objects.get(pk=self.user.pk))
+
+    @override_settings(QUERY_BUDGET_MODE='off')  # the injected bumps are not the view's queries
+    def test_writes_keep_concurrent_bumps(self):
+        # A bump landing between a request loading the user and saving it is not overwritten
+        version = self.user.dashboard_version
+        with mock.patch('ecotrack.views.score_answers', wraps=score_answers) as scorer:
+            scorer.side_effect = lambda *args: (self.concurrent_bump(), score_answers(*args))[1]
+            self.post('submit_questionnaire', {'q1': 'Walk/Cycle'})
+        self.user.refresh_from_db()
+        self.assertEqual(self.user.dashboard_version, version + 2)
+
+        with mock.patch('ecotrack.views.get_active_factors') as factors:
+            factors.side_effect = lambda: (self.concurrent_bump(), DEFAULT_FACTORS)[1]
+            self.post('survey', generate_survey(random.Random(2)))
+        self.user.refresh_from_db()
+        self.assertEqual(self.user.dashboard_version, version + 4)
+
+
+class SuggestionsCacheTests(TestCase):
+    """get_suggestions reuses Gemini responses per (prompt version, category, habits)."""
+
+    SUGGESTIONS = [{'title': 'Line-dry laundry', 'reason': 'No dryer.', 'carbonReduction': '2 kg CO2e/month'}]
+
+    def setUp(self):
+        cache.clear()
+        self.user = User.objects.create_user(username='suggested', email='suggested@example.com')
+        self.client.force_login(self.user)
+        self.habit = Habit.objects.create(user=self.user, text='Cycle to work')
+        patcher = mock.patch('ecotrack.views.LLMService.generate_json', return_value=self.SUGGESTIONS)
+        self.generate_json = patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def suggest(self, category='food'):
+        response = self.client.post(
+            reverse('get_suggestions'), json.dumps({'category': category}), content_type='application/json'
+        )
+        self.assertEqual(response.json()['data'], self.SUGGESTIONS)
+
+    def test_fingerprint_ignores_order_case_and_spacing(self):
+        self.assertEqual(
+            habits_fingerprint([{'text': 'Cycle  to work'}, {'text': 'Compost'}]),
+            habits_fingerprint([{'text': 'compost'}, {'text': 'cycle to WORK '}]),
+        )
+        self.assertNotEqual(habits_fingerprint([{'text': 'Compost'}]), habits_fingerprint([]))
+
+    def test_repeat_request_is_a_hit(self):
+        self.suggest()
+        self.suggest()
+        self.assertEqual(self.generate_json.call_count, 1)
+        self.suggest('travel')
+        self.assertEqual(self.generate_json.call_count, 2)
+
+    def test_habit_edit_misses(self):
+        self.suggest()
+        self.habit.text = 'Take the train'
+        self.habit.save()
+        self.suggest()
+        self.assertEqual(self.generate_json.call_count, 2)
+        self.assertIn('Take the train', self.generate_json.call_args.args[0])
+
+    def test_prompt_version_bump_misses(self):
+        self.suggest()
+        before = suggestions_cache_key('food', self.user.habit_list())
+        with mock.patch('ecotrack.caching.SUGGESTIONS_PROMPT_VERSION', SUGGESTIONS_PROMPT_VERSION + 1):
+            self.assertNotEqual(suggestions_cache_key('food', self.user.habit_list()), before)
+            self.suggest()
+        self.assertEqual(self.generate_json.call_count, 2)
+
+
+class DailyQuestionsTests(TestCase):
+    """Question generation falls back to SAMPLE_QUESTIONS and is shared per habit set."""
+
+    QUESTIONS = [{'id': 'q1', 'question': 'Did you compost today?', 'options': [
+        {'text': 'Yes', 'value': 'Yes', 'eco_positive': True},
+        {'text': 'No', 'value': 'No', 'eco_positive': False},
+    ]}]
+
+    def setUp(self):
+        self.today = timezone.localdate()
+        patcher = mock.patch('ecotrack.questions.LLMService.generate_json', return_value=self.QUESTIONS)
+        self.generate_json = patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def user(self, name, *habits, last_checkin=None):
+        user = User.objects.create_user(
+            username=name, email=f'{name}@example.com', last_checkin=last_checkin or self.today,
+        )
+        Habit.objects.bulk_create([Habit(user=user, text=text) for text in habits])
+        return user
+
+    def test_falls_back_to_samples_without_storing(self):
+        user = self.user('offline', 'Compost')
+        self.generate_json.side_effect = LLMUnavailable('Gemini circuit breaker is open')
+        self.assertEqual(get_daily_questions(user), SAMPLE_QUESTIONS)
+        self.generate_json.side_effect = None
+        self.generate_json.return_value = {'questions': 'malformed'}
+        self.assertEqual(get_daily_questions(user), SAMPLE_QUESTIONS)
+        self.assertFalse(DailyQuestionSet.objects.filter(user=user).exists())
+
+        # Once Gemini answers, the set is generated and stored
+        self.generate_json.return_value = self.QUESTIONS
+        self.assertEqual(get_daily_questions(user), self.QUESTIONS)
+        self.assertEqual(get_daily_questions(user), self.QUESTIONS)
+        self.assertEqual(self.generate_json.call_count, 3)
+
+    def test_warm_question_cache_generates_once_per_habit_set(self):
+        yesterday = self.today - timedelta(days=1)
+        users = [
+            self.user('alice', 'Compost', 'Cycle to work', last_checkin=yesterday),
+            self.user('bob', 'cycle  to WORK', 'compost', last_checkin=yesterday),
+            self.user('carol', 'Take the train', last_checkin=yesterday),
+        ]
+        warm = self.user('dave', 'Take the train', last_checkin=yesterday)
+        DailyQuestionSet.objects.create(user=warm, date=self.today, habits_fingerprint='', questions=[])
+        self.user('erin', 'Compost', last_checkin=yesterday - timedelta(days=1))  # Lapsed: not warmed
+
+        call_command('warm_question_cache', stdout=StringIO())
+
+        self.assertEqual(self.generate_json.call_count, 2)
+        self.assertEqual(
+            set(DailyQuestionSet.objects.filter(date=self.today).values_list('user__username', flat=True)),
+            {'alice', 'bob', 'carol', 'dave'},
+        )
+        for user in users:
+            self.assertEqual(get_cached_questions(user, self.today), self.QUESTIONS)
+        self.assertEqual(DailyQuestionSet.objects.get(user=warm).questions, [])
+
+    def test_score_answers_locally_by_question_text(self):
+        user = self.user('scored', 'Compost')
+        store_questions(user, self.QUESTIONS, self.today)
+        # static/app.js keys answers by question text
+        answers = {
+            'Did you compost today?': 'Yes',
+            'How did you commute today?': 'Car (single)',
+            'Did you consume meat today?': 'No',
+            'Did you unplug unused electronics?': 'Some',
+        }
+        expected = sum(
+            option['eco_positive']
+            for question in self.QUESTIONS + SAMPLE_QUESTIONS
+            for option in question['options']
+            if answers.get(question['question']) == option['value']
+        )
+        self.assertEqual(expected, 3)
+        self.assertEqual(score_answers(user, answers, self.today), expected)
+        self.generate_json.assert_not_called()
+
+        # Unflagged answers are scored by Gemini in one call, and score nothing while it is down
+        answers['Anything else?'] = 'Fixed a bike'
+        self.generate_json.return_value = {'score': 1}
+        self.assertEqual(score_answers(user, answers, self.today), expected + 1)
+        self.assertIn('Fixed a bike', self.generate_json.call_args.args[0])
+        self.generate_json.side_effect = LLMUnavailable('Gemini circuit breaker is open')
+        self.assertEqual(score_answers(user, answers, self.today), expected)
+
+
+class DailyStatsTests(TestCase):
+    """Nightly maintenance of streaks, daily habit counts and achievements."""
+
+    def setUp(self):
+        self.today = timezone.localdate()
+
+    def user(self, name, last_checkin, streak=0, habits_today=0, **fields):
+        return User.objects.create_user(
+            username=name, email=f'{name}@example.com', last_checkin=last_checkin, streak=streak,
+            habits_today=habits_today, **fields,
+        )
+
+    def stats(self):
+        return {name: (streak, habits) for name, streak, habits in
+                User.objects.values_list('username', 'streak', 'habits_today')}
+
+    def test_roll_over_at_the_day_boundary(self):
+        self.user('today', self.today, streak=5, habits_today=2)
+        self.user('yesterday', self.today - timedelta(days=1), streak=3, habits_today=2)
+        self.user('lapsed', self.today - timedelta(days=2), streak=4, habits_today=1)
+        self.user('idle', self.today - timedelta(days=2))
+        self.user('never', None, habits_today=1)
+
+        with self.assertNumQueries(1):
+            self.assertEqual(roll_over_daily_stats(self.today), 3)
+        self.assertEqual(self.stats(), {
+            'today': (5, 2),  # Checked in today: nothing to reset yet
+            'yesterday': (3, 0),  # Streak carries over until today ends; the daily count resets
+            'lapsed': (0, 0),
+            'idle': (0, 0),
+            'never': (0, 0),
+        })
+        self.assertEqual(roll_over_daily_stats(self.today), 0)
+
+        # A day later, today's check-in is yesterday's and yesterday's streak has lapsed
+        self.assertEqual(roll_over_daily_stats(self.today + timedelta(days=1)), 2)
+        self.assertEqual(self.stats()['today'], (5, 0))
+        self.assertEqual(self.stats()['yesterday'], (0, 0))
+
+    def test_rollover_command(self):
+        self.user('lapsed', self.today - timedelta(days=2), streak=4, habits_today=1)
+        out = StringIO()
+        call_command('rollover_daily_stats', stdout=out)
+        self.assertIn(f'Rolled over daily stats for 1 users ({self.today})', out.getvalue())
+        self.assertEqual(self.stats(), {'lapsed': (0, 0)})
+
+    def test_recompute_achievements_in_keyset_chunks(self):
+        gains = self.user('gains', self.today, streak=3, achievements=[1])
+        self.user('earned', self.today, streak=3, achievements=[2, 1])
+        self.user('nothing', None)
+        self.user('idle', self.today - timedelta(days=2))  # Checked in before joining: no first check-in
+        scored = self.user('scored', None, sustainability_score=85, achievements=[7])
+        versions = dict(User.objects.values_list('username', 'dashboard_version'))
+
+        progress = []
+        result = recompute_achievements(chunk_size=2, on_progress=lambda *args: progress.append(args[:2]))
+
+        self.assertEqual((result['scanned'], result['updated']), (5, 2))
+        self.assertEqual(progress, [(2, 1), (4, 1), (5, 2)])
+        achievements = dict(User.objects.values_list('username', 'achievements'))
+        self.assertEqual(achievements[gains.username], [1, 2])
+        self.assertEqual(achievements['earned'], [2, 1])
+        self.assertEqual(achievements[scored.username], [7, 8])
+        for name, version in User.objects.values_list('username', 'dashboard_version'):
+            self.assertEqual(version, versions[name] + (name in {'gains', 'scored'}), name)
+
+        # Nothing left to unlock: no writes, no version bumps
+        self.assertEqual(recompute_achievements(chunk_size=2)['updated'], 0)
+        self.assertEqual(User.objects.get(pk=gains.pk).dashboard_version, versions['gains'] + 1)
+
+
+class EmissionFactorVersionTests(TestCase):
+    """Versioned emission factors: numbering, reload and rescoring stored footprints."""
+
+    def setUp(self):
+        # Start every test from a process that has not loaded any set yet
+        for name, value in (('_active', None), ('_checked_at', None)):
+            patcher = mock.patch.object(emission_factors, name, value)
+            patcher.start()
+            self.addCleanup(patcher.stop)
+
+    def factor_set(self, vegan=None, **fields):
+        config = json.loads(json.dumps(emission_factors.CONFIG))
+        if vegan is not None:
+            config['factors']['EF_DIET']['Vegan'] = vegan
+        return EmissionFactorSet(config=config, initial_score_config=emission_factors.INITIAL_SCORE_CONFIG, **fields)
+
+    def test_concurrent_save_takes_the_next_version(self):
+        # Version 1 holds the built-in factors (migration 0013)
+        self.factor_set().save()
+        # A concurrent save inserted version 2 after this one read the latest version
+        with mock.patch.object(EmissionFactorSet.objects, 'aggregate', side_effect=[{'latest': 1}, {'latest': 2}]):
+            factor_set = self.factor_set()
+            factor_set.save()
+        self.assertEqual(factor_set.version, 3)
+        self.assertEqual(list(EmissionFactorSet.objects.values_list('version', flat=True)), [3, 2, 1])
+
+    @override_settings(EMISSION_FACTORS_RELOAD_SECONDS=60)
+    def test_new_set_is_picked_up_after_the_reload_interval(self):
+        with mock.patch('ecotrack.emission_factors.time.monotonic', return_value=1000.0) as monotonic:
+            loaded = get_active_factors()
+            self.assertEqual(loaded.version, 1)
+            # Written by another process: this one's cached set stays until the interval passes
+            EmissionFactorSet.objects.bulk_create([self.factor_set(vegan=150, version=2)])
+            monotonic.return_value = 1059.0
+            self.assertIs(get_active_factors(), loaded)
+            monotonic.return_value = 1060.0
+            self.assertEqual(get_active_factors().version, 2)
+            self.assertEqual(get_active_factors().diet.value('Vegan'), 150)
+
+    def surveyed(self, name, diet, **fields):
+        survey = generate_survey(random.Random(name))
+        survey['what_best_describes_your_diet'] = diet
+        footprint = calculate_personal_carbon_footprint(survey, DEFAULT_FACTORS)['summary']['personal_monthly_co2e_kg']
+        return User.objects.create_user(
+            username=name, email=f'{name}@example.com', survey_answered=True, user_data=survey,
+            carbon_footprint=footprint, footprint_factor_version=1, **fields,
+        )
+
+    def test_rescore_only_stale_footprints(self):
+        vegan = self.surveyed('vegan', 'Vegan')
+        omnivore = self.surveyed('omnivore', 'Omnivore')
+        current = self.surveyed('current', 'Vegan')
+        User.objects.filter(pk=current.pk).update(footprint_factor_version=2, carbon_footprint=1.0)
+        self.surveyed('skipped', 'Vegan', survey_skipped=True)
+        factor_set = self.factor_set(vegan=150)
+        factor_set.save()
+        versions = dict(User.objects.values_list('username', 'dashboard_version'))
+
+        result = rescore_footprints(chunk_size=1)
+
+        self.assertEqual((result['version'], result['scanned'], result['updated']), (2, 2, 1))
+        rows = {user.username: user for user in User.objects.all()}
+        self.assertEqual(
+            rows['vegan'].carbon_footprint,
+            calculate_personal_carbon_footprint(vegan.user_data, factor_set.compile())['summary'][
+                'personal_monthly_co2e_kg'],
+        )
+        self.assertNotEqual(rows['vegan'].carbon_footprint, vegan.carbon_footprint)
+        self.assertEqual(rows['vegan'].dashboard_version, versions['vegan'] + 1)
+        # Unchanged by the new factors: restamped without invalidating the dashboard
+        self.assertEqual(rows['omnivore'].carbon_footprint, omnivore.carbon_footprint)
+        self.assertEqual(rows['omnivore'].footprint_factor_version, 2)
+        self.assertEqual(rows['omnivore'].dashboard_version, versions['omnivore'])
+        # Already on version 2, or no survey to score: not scanned
+        self.assertEqual(rows['current'].carbon_footprint, 1.0)
+        self.assertEqual(rows['skipped'].footprint_factor_version, 1)
+
+        self.assertEqual(rescore_footprints()['scanned'], 0)
+
+
+@override_settings(FCM_TRANSPORT='fake', FAKE_FCM_LATENCY_MS=0, CHAT_STREAM_HEARTBEAT_SECONDS=0.05)
+class ChatStreamTests(TestCase):
+    """Server-sent chat events: publish after commit, Last-Event-ID catch-up and the ASGI requirement."""
+
+    def setUp(self):
+        self.user = User.objects.create_user(username='streamer', email='streamer@example.com')
+        self.client.force_login(self.user)
+        self.community = Community.objects.create(name='Streaming', creator=self.user, member_count=1)
+        CommunityMembership.objects.create(community=self.community, user=self.user)
+        self.messages = [
+            CommunityMessage.objects.create(community=self.community, sender=self.user, content=f'Message {i}')
+            for i in range(3)
+        ]
+
+    def test_send_message_publishes_after_commit(self):
+        loop = asyncio.new_event_loop()
+        self.addCleanup(loop.close)
+
+        async def subscribe():
+            return broker.subscribe(self.community.id)
+
+        subscription = loop.run_until_complete(subscribe())
+        self.addCleanup(broker.unsubscribe, subscription)
+
+        with self.captureOnCommitCallbacks() as callbacks:
+            response = self.client.post(
+                reverse('send_message'),
+                json.dumps({'community_id': self.community.id, 'content': 'Hello'}),
+                content_type='application/json',
+            )
+            self.assertEqual(response.status_code, 200, response.content)
+            loop.run_until_complete(asyncio.sleep(0))
+            self.assertTrue(subscription.queue.empty())  # Not before the transaction commits
+
+        for callback in callbacks:
+            callback()
+        payload = loop.run_until_complete(asyncio.wait_for(subscription.queue.get(), timeout=1))
+        message = CommunityMessage.objects.latest('id')
+        self.assertEqual(payload, serialize_message(message))
+        self.assertEqual(payload['content'], 'Hello')
+
+    async def test_stream_catches_up_from_the_last_event_id(self):
+        first, second, third = self.messages
+        events = message_events(self.community.id, last_id=first.id)
+        try:
+            self.assertTrue((await anext(events)).startswith('retry: '))
+            # Backfill: the messages after Last-Event-ID, oldest first
+            self.assertEqual(await anext(events), format_event(serialize_message(second)))
+            self.assertEqual(await anext(events), format_event(serialize_message(third)))
+
+            # Live: a message the backfill already sent is not repeated
+            fourth = await CommunityMessage.objects.acreate(community=self.community, sender=self.user, content='Live')
+            fourth = await CommunityMessage.objects.select_related('sender').aget(pk=fourth.pk)
+            broker.publish(self.community.id, serialize_message(third))
+            broker.publish(self.community.id, serialize_message(fourth))
+            self.assertEqual(await anext(events), format_event(serialize_message(fourth)))
+            self.assertEqual(await anext(events), ': keep-alive\n\n')
+        finally:
+            await events.aclose()
+        self.assertEqual(broker.subscriber_count(self.community.id), 0)
+
+    def test_stream_needs_asgi(self):
+        response = self.client.get(reverse('community_message_stream', args=[self.community.id]))
+        self.assertEqual(response.status_code, 501)
+        self.assertEqual(response.json()['message'], 'Message streaming requires the ASGI server')
+
+
+class MembershipTests(TestCase):
+    """Joins and leaves move member_count once per change; reconcile_member_counts repairs drift."""
+
+    def setUp(self):
+        self.owner = User.objects.create_user(username='owner', email='owner@example.com')
+        self.member = User.objects.create_user(username='member', email='member@example.com')
+        self.community = Community.objects.create(name='Members', creator=self.owner, member_count=0)
+
+    def member_count(self, community=None):
+        return Community.objects.values_list('member_count', flat=True).get(pk=(community or self.community).pk)
+
+    def test_join_and_leave_are_idempotent(self):
+        membership, joined = add_member(self.community, self.member)
+        self.assertTrue(joined)
+        self.assertEqual(add_member(self.community, self.member), (membership, False))
+        self.assertEqual(self.member_count(), 1)
+
+        self.assertTrue(remove_member(membership))
+        self.assertFalse(remove_member(membership))
+        self.assertFalse(CommunityMembership.objects.get(pk=membership.pk).is_active)
+        self.assertEqual(self.member_count(), 0)
+
+        # Rejoining reactivates the same membership row
+        rejoined, joined = add_member(self.community, self.member)
+        self.assertTrue(joined)
+        self.assertEqual(rejoined.pk, membership.pk)
+        self.assertEqual(CommunityMembership.objects.count(), 1)
+        self.assertEqual(self.member_count(), 1)
+
+    def test_stale_leave_does_not_go_negative(self):
+        membership, _ = add_member(self.community, self.member)
+        Community.objects.filter(pk=self.community.pk).update(member_count=0)
+        self.assertTrue(remove_member(membership))
+        self.assertEqual(self.member_count(), 0)
+
+    def test_reconcile_member_counts(self):
+        drifted = Community.objects.create(name='Drifted', creator=self.owner, member_count=5)
+        add_member(drifted, self.owner)
+        add_member(self.community, self.owner)
+        membership, _ = add_member(self.community, self.member)
+        # Writes that bypass the helpers
+        CommunityMembership.objects.filter(pk=membership.pk).update(is_active=False)
+        empty = Community.objects.create(name='Empty', creator=self.owner, member_count=0)
+
+        out = StringIO()
+        call_command('reconcile_member_counts', '--dry-run', stdout=out)
+        self.assertIn('Checked 3 communities', out.getvalue())
+        self.assertIn('2 member counts drifted', out.getvalue())
+        self.assertEqual(self.member_count(drifted), 6)
+
+        progress = []
+        result = reconcile_member_counts(chunk_size=2, on_progress=lambda *args: progress.append(args[:2]))
+        self.assertEqual((result['scanned'], result['drifted']), (3, 2))
+        self.assertEqual(progress, [(2, 2), (3, 2)])
+        self.assertEqual(
+            [self.member_count(community) for community in (self.community, drifted, empty)], [1, 1, 0]
+        )
+        self.assertEqual(reconcile_member_counts()['drifted'], 0)
+
+
+class CacheBackendCheckTests(SimpleTestCase):
+    """Query budgets assume cache reads cost no queries, so the database cache is rejected."""
+
+    def test_database_cache_is_an_error(self):
+        self.assertEqual(check_dashboard_cache_backend(None), [])
+        database_cache = {'default': {
+            'BACKEND': 'django.core.cache.backends.db.DatabaseCache', 'LOCATION': 'ecotrack_cache',
+        }}
+        with override_settings(CACHES=database_cache):
+            errors = check_dashboard_cache_backend(None)
+        self.assertEqual([error.id for error in errors], ['ecotrack.E001'])
+
+
+class ReminderCopyTests(TestCase):
+    """Reminder lines rotate across UTC days without repeats inside REMINDER_REPEAT_DAYS."""
+
+    def setUp(self):
+        self.today = date(2026, 3, 1)
+        self.assertEqual(add_copy(['Check in now 🌱', 'Your streak awaits!', 'CHECK IN NOW', 'Fill it now ✅']), 3)
+
+    def test_lines_rotate_after_the_repeat_window(self):
+        days = [self.today + timedelta(days=offset) for offset in range(REMINDER_REPEAT_DAYS + 3)]
+        lines = ['Check in now 🌱', 'Your streak awaits!', 'Fill it now ✅']
+
+        # Three lines cover the first three days; upcoming days never take a line back
+        self.assertEqual(schedule_copy(len(days), today=self.today), days[3:])
+        self.assertEqual([get_reminder_body(day) for day in days[:3]], lines)
+        self.assertEqual(get_reminder_body(days[3]), REMINDER_FALLBACK_BODY)
+
+        # REMINDER_REPEAT_DAYS later, the lines of days that have passed come round again
+        later = days[REMINDER_REPEAT_DAYS]
+        self.assertEqual(schedule_copy(3, today=later), [])
+        self.assertEqual([get_reminder_body(day) for day in days[REMINDER_REPEAT_DAYS:]], lines)
+        self.assertEqual(
+            list(ReminderCopy.objects.order_by('scheduled_for').values_list('last_used_on', flat=True)), days[:3],
+        )
+
+    def test_missing_day_falls_back(self):
+        self.assertEqual(get_reminder_body(self.today), REMINDER_FALLBACK_BODY)
+
+    def test_default_day_is_the_utc_day(self):
+        schedule_copy(2, today=self.today)
+        # 01:30 on March 2 in Asia/Kolkata is still March 1 in UTC
+        with mock.patch('ecotrack.reminder_copy.timezone.now', return_value=utc(2026, 3, 1, 20)):
+            self.assertEqual(get_reminder_body(), get_reminder_body(self.today))
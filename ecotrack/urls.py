@@ -9,9 +9,11 @@ urlpatterns = [
     path("signup", views.signup, name="signup"),
     path("survey", views.survey, name="survey"),
     path("get_user_data", views.get_user_data, name="get_user_data"),
+    path("get_footprint_history", views.get_footprint_history, name="get_footprint_history"),
     path("save_habit", views.save_habit, name="save_habit"),
     path("update_habit", views.update_habit, name="update_habit"),
     path("delete_habit", views.delete_habit, name="delete_habit"),
+    path("complete_habit", views.complete_habit, name="complete_habit"),
     path("get_habit_category_suggestions", views.get_habit_category_suggestions, name="get_habit_category_suggestions"),
     path("submit_questionnaire", views.submit_questionnaire, name="submit_questionnaire"),
     path("get_suggestions", views.get_suggestions, name="get_suggestions"),
@@ -33,6 +35,8 @@ urlpatterns = [
     path("api/android/send-achievement", views.send_achievement_notification, name="send_achievement_notification"),
     # Cron dispatcher (external scheduler calls this every minute)
     path("api/cron/dispatch", views.cron_dispatch, name="cron_dispatch"),
+    # Prometheus metrics (protected by METRICS_SECRET)
+    path("api/metrics", views.metrics_view, name="metrics"),
     
     # Community endpoints
     path("api/communities/create", views.create_community, name="create_community"),
@@ -40,7 +44,10 @@ urlpatterns = [
     path("api/communities/leave", views.leave_community, name="leave_community"),
     path("api/communities/my-communities", views.get_user_communities, name="get_user_communities"),
     path("api/communities/public", views.get_public_communities, name="get_public_communities"),
+    path("api/communities/discover", views.discover_communities, name="discover_communities"),
     path("api/communities/send-message", views.send_message, name="send_message"),
     path("api/communities/<int:community_id>/messages", views.get_community_messages, name="get_community_messages"),
+    path("api/communities/<int:community_id>/messages/search", views.search_community_messages, name="search_community_messages"),
+    path("api/communities/<int:community_id>/stream", views.community_message_stream, name="community_message_stream"),
 
 ]
\ No newline at end of file
@@ -1,42 +1,9 @@
 import json
+from datetime import datetime, timedelta
 from django.utils import timezone
+import pytz
 
-CONFIG = {
-    "factors": {
-        "EF_ELECTRICITY": {"Yes": 0.05, "Partially": 0.25, "No": 0.475},
-        "EF_HEATING": {
-            "Natural Gas": 0.2, "Electricity": 0.45, "Oil": 0.27,
-            "Propane": 0.24, "Wood": 0.015, "Other": 0.3
-        },
-        "EF_VEHICLE_PER_KM": {
-            "Gasoline": 0.18, "Diesel": 0.17, "Hybrid": 0.12, "Electric": 0.05
-        },
-        "EF_FLIGHT": {"Short-haul (<3h)": 1100, "Medium-haul (3-6h)": 3000, "Long-haul (>6h)": 8000},
-        "EF_FLIGHT_PER_KM": 0.15,
-        "EF_DIET": {
-            "Vegan": 1600 / 12, "Vegetarian": 1900 / 12, "Pescatarian": 2100 / 12,
-            "Omnivore": 2500 / 12, "High Meat": 3300 / 12
-        },
-        "EF_PUBLIC_TRANSPORT_PER_KM": 0.1,
-        "EF_WASTE_LANDFILL": 0.45,
-        "EF_WATER_PER_LITRE": 0.0005
-    },
-    "multipliers": {
-        "FOOD_WASTE": {"Very little": 0.9, "Below average": 1.0, "Average": 1.2, "Above average": 1.5},
-        "FOOD_PACKAGING": {"Very little": 0.9, "Below average": 1.0, "Average": 1.3, "Above average": 1.6},
-        "SHOPPING": {"Rarely": 50, "Sometimes": 100, "Often": 200}
-    },
-    "constants": {
-        "HOUSEHOLD_SIZE_DEFAULT": 1,
-        "WEEKS_PER_MONTH": 4.33,
-        "MONTHS_PER_YEAR": 12,
-        "DAYS_PER_MONTH": 30,
-        "WASTE_PER_PERSON_PER_DAY_KG": 1.2,
-        "RECYCLING_DIVERSION_PER_ITEM": 0.05,
-        "COMPOST_DIVERSION": 0.15,
-        "OFFSET_PERCENTAGE": 0.10
-    }
-}
+from .emission_factors import EmissionFactors, get_active_factors
 
 
 def _get_numeric_input(data: dict, key: str, default: float = 0.0) -> float:
@@ -47,25 +14,24 @@ def _get_numeric_input(data: dict, key: str, default: float = 0.0) -> float:
         return float(default)
 
 
-def _calculate_household_energy(data: dict) -> float:
+def _calculate_household_energy(data: dict, factors: EmissionFactors) -> float:
     """Calculates TOTAL emissions for the household from electricity and heating."""
     electricity_kwh = _get_numeric_input(data, "how_much_electricity_does_your_household_use_per_month")
     electricity_source = data.get("is_your_electricity_from_renewable_sources", "No")
-    ef_electricity = CONFIG["factors"]["EF_ELECTRICITY"].get(electricity_source,
-                                                             CONFIG["factors"]["EF_ELECTRICITY"]["No"])
+    ef_electricity = factors.electricity.value(electricity_source)
     electricity_emissions = electricity_kwh * ef_electricity
 
     heating_source = data.get("what_is_your_primary_heating_source", "Natural Gas")
     heating_percent = _get_numeric_input(data,
                                          "what_percentage_of_your_monthly_electricity_consumption_do_you_think_is_used_for_heating")
     heating_kwh_equivalent = electricity_kwh * (heating_percent / 100)
-    ef_heating = CONFIG["factors"]["EF_HEATING"].get(heating_source, CONFIG["factors"]["EF_HEATING"]["Natural Gas"])
+    ef_heating = factors.heating.value(heating_source)
     heating_emissions = heating_kwh_equivalent * ef_heating
 
     return electricity_emissions + heating_emissions
 
 
-def _calculate_personal_transportation(data: dict) -> float:
+def _calculate_personal_transportation(data: dict, factors: EmissionFactors) -> float:
     """Calculates PERSONAL emissions from vehicles, public transport, and flights."""
     # Private Vehicles (assumes inputs are for the individual's travel)
     vehicle_emissions = 0
@@ -73,87 +39,89 @@ def _calculate_personal_transportation(data: dict) -> float:
     for i in range(1, num_vehicles + 1):
         v_type = data.get(f"vehicle_{i}_type", "Gasoline")
         annual_km = _get_numeric_input(data, f"vehicle_{i}_mileage")
-        ef = CONFIG["factors"]["EF_VEHICLE_PER_KM"].get(v_type, CONFIG["factors"]["EF_VEHICLE_PER_KM"]["Gasoline"])
-        vehicle_emissions += (annual_km * ef) / CONFIG["constants"]["MONTHS_PER_YEAR"]
+        ef = factors.vehicle.value(v_type)
+        vehicle_emissions += (annual_km * ef) / factors.months_per_year
 
     # Public Transport
     public_km_per_week = _get_numeric_input(data,
                                             "how_much_distance_do_you_commute_in_public_transport_per_week_on_average")
-    public_km_per_month = public_km_per_week * CONFIG["constants"]["WEEKS_PER_MONTH"]
-    public_transport_emissions = public_km_per_month * CONFIG["factors"]["EF_PUBLIC_TRANSPORT_PER_KM"]
+    public_km_per_month = public_km_per_week * factors.weeks_per_month
+    public_transport_emissions = public_km_per_month * factors.public_transport_per_km
 
     # Flights
     flight_emissions = 0
     num_flights = int(_get_numeric_input(data, "how_many_flights_have_you_taken_in_the_past_year"))
     for i in range(1, num_flights + 1):
         flight_type = data.get(f"flight_{i}_type", "Short-haul (<3h)")
-        km = CONFIG["factors"]["EF_FLIGHT"].get(flight_type, 2000)
-        flight_emissions += (km * CONFIG["factors"]["EF_FLIGHT_PER_KM"]) / CONFIG["constants"]["MONTHS_PER_YEAR"]
+        km = factors.flight.value(flight_type)
+        flight_emissions += (km * factors.flight_per_km) / factors.months_per_year
 
     return vehicle_emissions + public_transport_emissions + flight_emissions
 
 
-def _calculate_personal_diet(data: dict) -> float:
+def _calculate_personal_diet(data: dict, factors: EmissionFactors) -> float:
     """Calculates PERSONAL emissions from diet."""
     diet_type = data.get("what_best_describes_your_diet", "Omnivore")
-    diet_emissions = CONFIG["factors"]["EF_DIET"].get(diet_type, CONFIG["factors"]["EF_DIET"]["Omnivore"])
+    diet_emissions = factors.diet.value(diet_type)
 
     waste_level = data.get("how_much_food_do_you_waste", "Average")
     packaging_level = data.get("how_much_of_your_food_is_packaged_processed", "Average")
-    food_multiplier = (CONFIG["multipliers"]["FOOD_WASTE"].get(waste_level, 1.2) *
-                       CONFIG["multipliers"]["FOOD_PACKAGING"].get(packaging_level, 1.3))
+    food_multiplier = (factors.food_waste.value(waste_level) *
+                       factors.food_packaging.value(packaging_level))
 
     return diet_emissions * food_multiplier
 
 
-def _calculate_household_waste(data: dict, household_size: int) -> float:
+def _calculate_household_waste(data: dict, household_size: int, factors: EmissionFactors) -> float:
     """Calculates TOTAL emissions for the household from landfill waste."""
-    total_waste = (CONFIG["constants"]["WASTE_PER_PERSON_PER_DAY_KG"] *
-                   household_size * CONFIG["constants"]["DAYS_PER_MONTH"])
+    total_waste = (factors.waste_per_person_per_day_kg *
+                   household_size * factors.days_per_month)
 
     diversion_rate = 0
     for mat in ["glass", "metal", "plastic", "paper"]:
         if data.get(f"do_you_recycle_the_following_check_all_that_apply_{mat}") == "on":
-            diversion_rate += CONFIG["constants"]["RECYCLING_DIVERSION_PER_ITEM"]
+            diversion_rate += factors.recycling_diversion_per_item
     if data.get("do_you_compost_food_waste") in ["Some", "All"]:
-        diversion_rate += CONFIG["constants"]["COMPOST_DIVERSION"]
+        diversion_rate += factors.compost_diversion
 
     landfill_waste = total_waste * (1 - diversion_rate)
-    return landfill_waste * CONFIG["factors"]["EF_WASTE_LANDFILL"]
+    return landfill_waste * factors.waste_landfill
 
 
-def _calculate_personal_consumption(data: dict) -> float:
+def _calculate_personal_consumption(data: dict, factors: EmissionFactors) -> float:
     """Calculates PERSONAL emissions from general consumption (shopping)."""
     shopping_freq = data.get("how_often_do_you_buy_new_clothes_electronics_or_appliances", "Sometimes")
-    return CONFIG["multipliers"]["SHOPPING"].get(shopping_freq, 100)
+    return factors.shopping.value(shopping_freq)
 
 
-def _calculate_household_water(data: dict) -> float:
+def _calculate_household_water(data: dict, factors: EmissionFactors) -> float:
     """Calculates TOTAL emissions for the household from water usage."""
     total_water_litres = _get_numeric_input(data, "how_much_water_does_your_household_use_per_month_in_litres")
-    return total_water_litres * CONFIG["factors"]["EF_WATER_PER_LITRE"]
+    return total_water_litres * factors.water_per_litre
 
 
 # --- Main Function ---
 
-def calculate_personal_carbon_footprint(data: dict) -> dict:
+def calculate_personal_carbon_footprint(data: dict, factors: EmissionFactors = None) -> dict:
     """
     Calculates a monthly carbon footprint for one person, accounting for shared household emissions.
+    Uses the active emission factors unless `factors` is given.
     """
+    factors = factors or get_active_factors()
     household_size = int(_get_numeric_input(data, "how_many_people_are_in_your_household",
-                                            CONFIG["constants"]["HOUSEHOLD_SIZE_DEFAULT"]))
+                                            factors.household_size_default))
     # Ensure household_size is at least 1 to prevent division by zero
     household_size = max(1, household_size)
 
     # 1. Calculate total household emissions for shared categories
-    household_energy_emissions = _calculate_household_energy(data)
-    household_waste_emissions = _calculate_household_waste(data, household_size)
-    household_water_emissions = _calculate_household_water(data)
+    household_energy_emissions = _calculate_household_energy(data, factors)
+    household_waste_emissions = _calculate_household_waste(data, household_size, factors)
+    household_water_emissions = _calculate_household_water(data, factors)
 
     # 2. Calculate personal emissions for individual categories
-    personal_transport_emissions = _calculate_personal_transportation(data)
-    personal_diet_emissions = _calculate_personal_diet(data)
-    personal_consumption_emissions = _calculate_personal_consumption(data)
+    personal_transport_emissions = _calculate_personal_transportation(data, factors)
+    personal_diet_emissions = _calculate_personal_diet(data, factors)
+    personal_consumption_emissions = _calculate_personal_consumption(data, factors)
 
     # 3. Create the final breakdown, assigning a personal share of household emissions
     breakdown = {
@@ -167,7 +135,7 @@ def calculate_personal_carbon_footprint(data: dict) -> dict:
 
     # 4. Sum up and apply offsets
     total_emissions_before_offset = sum(breakdown.values())
-    offset_percent = CONFIG["constants"]["OFFSET_PERCENTAGE"] if data.get(
+    offset_percent = factors.offset_percentage if data.get(
         "do_you_offset_your_carbon_emissions") == "Yes" else 0
     total_emissions_after_offset = total_emissions_before_offset * (1 - offset_percent)
 
@@ -302,71 +270,6 @@ def calculate_sustainability_score(baseline_data: dict, daily_survey: dict) -> d
         "feedback_for_the_day": feedback
     }
 
-# --- Existing User Data (from your first code block) ---
-user_baseline_data = {
-  "how_many_people_are_in_your_household": 2,
-  "how_much_electricity_does_your_household_use_per_month": 500,
-  "is_your_electricity_from_renewable_sources": "Partially",
-  "what_is_your_primary_heating_source": "Natural Gas",
-  "what_percentage_of_your_monthly_electricity_consumption_do_you_think_is_used_for_heating": 20,
-  "how_many_vehicles_are_in_your_household": 1,
-  "vehicle_1_type": "Gasoline",
-  "vehicle_1_mileage": 15000,
-  "how_much_distance_do_you_commute_in_public_transport_per_week_on_average": 50,
-  "how_many_flights_have_you_taken_in_the_past_year": 2,
-  "flight_1_type": "Short-haul (<3h)",
-  "flight_2_type": "Medium-haul (3-6h)",
-  "what_best_describes_your_diet": "Omnivore",
-  "how_much_food_do_you_waste": "Average",
-  "how_much_of_your_food_is_packaged_processed": "Average",
-  "do_you_recycle_the_following_check_all_that_apply_glass": "on",
-  "do_you_recycle_the_following_check_all_that_apply_plastic": "on",
-  "do_you_compost_food_waste": "Some",
-  "how_often_do_you_buy_new_clothes_electronics_or_appliances": "Sometimes",
-  "how_much_water_does_your_household_use_per_month_in_litres": 3000,
-  "do_you_offset_your_carbon_emissions": "No"
-}
-
-# --- Daily Survey Input ---
-daily_survey = {
-    "transport_mode": "Bicycle",
-    "transport_distance_km": 10,
-    "main_meal_type": "Vegetarian",
-    "purchased_new_item": "No",
-    "extra_recycling_composting": "Yes",
-    "used_reusable_containers": "Yes"
-}
-
-# --- Calculate the Scores ---
-carbon_footprint = calculate_personal_carbon_footprint(user_baseline_data)
-sustainability_score = calculate_sustainability_score(user_baseline_data, daily_survey)
-
-
-INITIAL_SCORE_CONFIG = {
-    # Home & Energy
-    "what_type_of_home_do_you_live_in": {"Apartment": 10, "Semi-detached House": 5, "Detached House": 0, "Other": 5},
-    "what_is_the_size_of_your_home": {"Small": 10, "Medium": 5, "Large": 0},
-    "is_your_electricity_from_renewable_sources": {"Yes": 20, "Partially": 10, "No": 0},
-    "do_you_use_energy_saving_appliances_or_lightbulbs": {"Yes": 10, "No": 0},
-    # Transportation
-    "how_often_do_you_use_public_transport": {"Daily": 10, "Weekly": 5, "Rarely": 0, "Never": -5},
-    # Diet
-    "what_best_describes_your_diet": {"Vegan": 20, "Vegetarian": 15, "Pescatarian": 10, "Omnivore": 5, "High Meat": 0},
-    "how_much_of_your_food_is_organic_local": {"All": 10, "Most": 7, "Some": 3, "None": 0},
-    "how_much_food_do_you_waste": {"Very little": 15, "Below average": 10, "Average": 5, "Above average": 0},
-    "how_much_of_your_food_is_packaged_processed": {"Very little": 10, "Below average": 7, "Average": 3, "Above average": 0},
-    # Waste
-    "do_you_compost_food_waste": {"All": 10, "Some": 5, "None": 0},
-    "recycling_items_count": {0: 0, 1: 3, 2: 6, 3: 9, 4: 12}, # Points based on how many materials are recycled
-    # Consumption
-    "how_often_do_you_buy_new_clothes_electronics_or_appliances": {"Rarely": 15, "Sometimes": 5, "Often": 0},
-    "do_you_buy_second_hand_or_repair_items": {"Yes": 10, "Sometimes": 5, "Rarely": 2, "No": 0},
-    # Water
-    "do_you_use_water_saving_devices": {"Yes": 10, "No": 0},
-    # Offsetting
-    "do_you_offset_your_carbon_emissions": {"Yes": 5, "No": 0}
-}
-
 # --- Benchmarks for Normalizing the Score ---
 # These values represent a rough estimate of the total points for a
 # "low impact" and "high impact" lifestyle based on the points above.
@@ -374,13 +277,14 @@ INITIAL_SCORE_CONFIG = {
 MAX_POSSIBLE_POINTS = 162 # Sum of the best options
 MIN_POSSIBLE_POINTS = -5   # Sum of the worst options
 
-def calculate_initial_sustainability_score(survey_data: dict) -> dict:
+def calculate_initial_sustainability_score(survey_data: dict, factors: EmissionFactors = None) -> dict:
     """
     Calculates an initial sustainability score (0-100) for a new user
     based on their detailed onboarding survey data.
 
     Args:
         survey_data: A dictionary of the user's answers to the survey.
+        factors: Emission factors whose initial-score points to use (default: the active set)
 
     Returns:
         A dictionary containing the initial score and a summary.
@@ -389,7 +293,8 @@ def calculate_initial_sustainability_score(survey_data: dict) -> dict:
     feedback = []
 
     # Iterate through the scoring configuration and add points
-    for key, point_mapping in INITIAL_SCORE_CONFIG.items():
+    factors = factors or get_active_factors()
+    for key, point_mapping in factors.initial_score_points:
         user_answer = survey_data.get(key)
 
         if user_answer is not None:
@@ -434,17 +339,27 @@ def calculate_initial_sustainability_score(survey_data: dict) -> dict:
 
 
 
-def check_achievements(user):
-    now_aware = timezone.now()
+def _local_date(value):
+    """Date of a date/datetime in the current time zone (naive datetimes are taken as local)."""
+    if value is None:
+        return None
+    if isinstance(value, datetime):
+        if timezone.is_aware(value):
+            return timezone.localtime(value).date()
+        return value.date()
+    return value
 
-    if user.date_joined.tzinfo is None:
-        user.date_joined = timezone.make_aware(user.date_joined, timezone.get_current_timezone())
 
-    if user.last_checkin.tzinfo is None:
-        user.last_checkin = timezone.make_aware(user.last_checkin, timezone.get_current_timezone())
+def check_achievements(user):
+    """
+    Return the ids of the achievements the user's stored stats unlock.
+    Pure: `user` is only read, so it is safe to call on instances being batch-updated.
+    """
+    last_checkin_date = _local_date(user.last_checkin)
+    joined_date = _local_date(user.date_joined)
 
     achievements = []
-    if user.last_checkin > user.date_joined:
+    if last_checkin_date and joined_date and last_checkin_date >= joined_date:
         achievements.append(1)
 
     if user.streak >= 3:
@@ -472,3 +387,36 @@ def check_achievements(user):
         achievements.append(9)
     return achievements
 
+
+def merge_achievements(existing, unlocked):
+    """Append newly unlocked achievement ids to `existing`, keeping order and dropping duplicates."""
+    merged = []
+    for achievement in list(existing or []) + list(unlocked):
+        if achievement not in merged:
+            merged.append(achievement)
+    return merged
+
+
+def next_fire_at_utc(notification_time, timezone_name: str, after=None):
+    """
+    Returns the next UTC minute strictly after `after` (default: now) at which a
+    daily notification scheduled for `notification_time` in `timezone_name` fires.
+    Unknown timezones fall back to UTC.
+    """
+    try:
+        tz = pytz.timezone(timezone_name or 'UTC')
+    except pytz.exceptions.UnknownTimeZoneError:
+        tz = pytz.utc
+
+    if after is None:
+        after = timezone.now()
+
+    fire_time = notification_time.replace(second=0, microsecond=0)
+    candidate_date = after.astimezone(tz).date()
+    # Two days always suffice; the third guards against DST gaps around midnight
+    for _ in range(3):
+        fire_at = tz.localize(datetime.combine(candidate_date, fire_time)).astimezone(pytz.utc)
+        if fire_at > after:
+            return fire_at
+        candidate_date += timedelta(days=1)
+    return fire_at
@@ -1,30 +1,45 @@
-import os
 from datetime import datetime, timedelta, time, date
 from django.contrib.auth.decorators import login_required
 from django.shortcuts import render
-from django.http import JsonResponse, HttpResponseRedirect
+from django.http import HttpResponse, JsonResponse, HttpResponseRedirect, StreamingHttpResponse
 from django.views.decorators.csrf import csrf_protect, csrf_exempt
-from django.views.decorators.http import require_http_methods
-from .models import User, Community, CommunityMembership, CommunityMessage, CommunityTask, TaskParticipation, AndroidDevice
-from django.db import IntegrityError
+from django.views.decorators.http import condition, require_http_methods
+from .models import User, Habit, HabitCompletion, FootprintMeasurement, Community, CommunityMembership, CommunityMessage, CommunityTask, TaskParticipation, AndroidDevice
+from django.db import IntegrityError, transaction
 from django.contrib.auth import login, authenticate, logout
 from django.urls import reverse
 from .utils import *
-from uuid import uuid4
-from google import genai
-from django.db.models import Q, Count
-from django.core.paginator import Paginator
+from django.db.models import Q
+from django.core.handlers.asgi import ASGIRequest
+from django.core.serializers.json import DjangoJSONEncoder
 from django.views.decorators.http import require_GET
 from django.conf import settings
 from django.utils import timezone
 from .firebase_service import FCMService
+from .discovery import public_communities_page
+from .dispatch import enqueue_dispatch
+from .emission_factors import get_active_factors
+from .chat_stream import message_events, publish_message, serialize_message
+from .caching import (
+    bump_dashboard_version,
+    dashboard_etag,
+    get_cached_dashboard,
+    get_cached_suggestions,
+    set_cached_dashboard,
+    set_cached_suggestions,
+)
+from .llm_service import LLMService, LLMUnavailable
+from .memberships import add_member, remove_member
+from .message_search import search_messages
+from .metrics import render_prometheus
+from .query_budget import query_budget
+from .questions import get_daily_questions, invalidate_daily_questions, public_questions, score_answers
 import pytz
 import logging
 from django.utils import timezone
 
 logger = logging.getLogger(__name__)
 
-
 HABIT_CATEGORY_LIBRARY = {
     "food": {
         "title": "Food & Kitchen",
@@ -111,31 +126,10 @@ def _shift_month(date_obj: date, offset: int) -> date:
     return date(year, month, 1)
 
 
-def _normalize_footprint_entry(entry):
-    if isinstance(entry, dict):
-        value = entry.get("value")
-        recorded_at = entry.get("recorded_at")
-    else:
-        value = entry
-        recorded_at = None
-
-    normalized_value = round(_safe_float(value, 0.0) or 0.0, 2)
-
-    normalized_recorded_at = None
-    if recorded_at:
-        if isinstance(recorded_at, (datetime, date)):
-            normalized_recorded_at = recorded_at.isoformat()
-        else:
-            try:
-                normalized_recorded_at = (
-                    datetime.fromisoformat(str(recorded_at)).date().isoformat()
-                )
-            except ValueError:
-                normalized_recorded_at = None
-
+def _serialize_measurement(measurement):
     return {
-        "value": normalized_value,
-        "recorded_at": normalized_recorded_at,
+        "value": round(measurement.value, 2),
+        "recorded_at": timezone.localtime(measurement.recorded_at).date().isoformat(),
     }
 
 
@@ -156,11 +150,8 @@ def _streak_has_lapsed(last_checkin_date, today=None):
 
 
 def get_carbon_footprint_history(user):
-    raw_history = user.last_8_footprint_measurements or []
-    normalized_history = [
-        _normalize_footprint_entry(entry) for entry in raw_history if entry is not None
-    ]
-    normalized_history = normalized_history[-8:]
+    latest = user.footprint_measurements.order_by('-recorded_at', '-id')[:8]
+    normalized_history = [_serialize_measurement(m) for m in reversed(list(latest))]
 
     if normalized_history:
         if len(normalized_history) == 1:
@@ -201,27 +192,20 @@ def get_carbon_footprint_history(user):
     return seeded_history
 
 
-def update_latest_values(user, new_value, recorded_at=None):
-    history = [
-        _normalize_footprint_entry(entry)
-        for entry in (user.last_8_footprint_measurements or [])
-    ]
-    history.append(
-        _normalize_footprint_entry(
-            {
-                "value": new_value,
-                "recorded_at": recorded_at or timezone.localdate().isoformat(),
-            }
-        )
+def record_footprint_measurement(user, footprint):
+    """Append a survey result (from calculate_personal_carbon_footprint) to the user's history."""
+    return FootprintMeasurement.objects.create(
+        user=user,
+        value=footprint['summary']['personal_monthly_co2e_kg'],
+        breakdown=footprint['breakdown_kg_co2e'],
     )
-    return history[-8:]
 
 @login_required
 def index(request):
     if not request.user.survey_answered or request.user.days_since_last_survey > 7:
         if request.user.days_since_last_survey > 7:
             request.user.days_since_last_survey = 0
-            request.user.save()
+            request.user.save(update_fields=['days_since_last_survey'])
         return HttpResponseRedirect(reverse('survey'))
     return render(request, "index.html")
 
@@ -237,6 +221,7 @@ def accounts(request):
 
 @csrf_protect
 @require_http_methods(["POST"])
+@query_budget(6)
 def signup(request):
     try:
         data = json.loads(request.body)
@@ -293,6 +278,7 @@ def signup(request):
 
 @csrf_protect
 @require_http_methods(["POST"])
+@query_budget(6)
 def login_view(request):
     try:
         data = json.loads(request.body)
@@ -333,6 +319,7 @@ def logout_view(request):
 
 
 @login_required
+@query_budget(4)
 def survey(request):
     if request.method == 'POST':
         user = request.user
@@ -343,26 +330,37 @@ def survey(request):
             user.survey_skipped = True
             user.carbon_footprint = []
             user.sustainability_score = 0
-            user.last_8_footprint_measurements = []
             user.save(update_fields=[
                 'user_data',
                 'survey_answered',
                 'survey_skipped',
                 'carbon_footprint',
                 'sustainability_score',
-                'last_8_footprint_measurements',
             ])
+            user.footprint_measurements.all().delete()
+            bump_dashboard_version(user)
             return JsonResponse({'status': 'success', 'message': 'Survey skipped successfully'}, status=200)
 
         user.user_data = data
         user.survey_answered = True
         user.survey_skipped = False
-        footprint_value = calculate_personal_carbon_footprint(data)['summary']['personal_monthly_co2e_kg']
-        user.carbon_footprint = footprint_value
-        user.sustainability_score = calculate_initial_sustainability_score(user.user_data)[
+        factors = get_active_factors()
+        footprint = calculate_personal_carbon_footprint(data, factors)
+        user.carbon_footprint = footprint['summary']['personal_monthly_co2e_kg']
+        user.footprint_factor_version = factors.version
+        user.sustainability_score = calculate_initial_sustainability_score(user.user_data, factors)[
             'initial_sustainability_score']
-        user.last_8_footprint_measurements = update_latest_values(user, footprint_value)
-        user.save()
+        # Never write the in-memory dashboard_version back: a concurrent bump would be lost
+        user.save(update_fields=[
+            'user_data',
+            'survey_answered',
+            'survey_skipped',
+            'carbon_footprint',
+            'footprint_factor_version',
+            'sustainability_score',
+        ])
+        record_footprint_measurement(user, footprint)
+        bump_dashboard_version(user)
         return JsonResponse({'status': 'success', 'message': 'Survey submitted successfully'}, status=200)
 
     if request.user.survey_answered and not request.user.survey_skipped:
@@ -370,92 +368,127 @@ def survey(request):
     return render(request, "survey_form.html")
 
 
+def _dashboard_etag(request):
+    if not request.user.is_authenticated:
+        return None
+    return dashboard_etag(request.user, timezone.localdate())
+
+
 @login_required
+@condition(etag_func=_dashboard_etag)
+@query_budget(2)  # habits and footprint history; the payload cache is never the database (ecotrack.E001)
 def get_user_data(request):
+    # Pure read: lapsed streaks and yesterday's habit counts are derived here and
+    # persisted by the nightly rollover_daily_stats command. Unchanged payloads get a
+    # 304 from the ETag check; otherwise the serialized payload is cached per version.
     today = timezone.localdate()
-    last_checkin_date = _coerce_to_date(request.user.last_checkin)
-    fields_to_update = []
-
-    if _streak_has_lapsed(last_checkin_date, today) and request.user.streak != 0:
-        request.user.streak = 0
-        fields_to_update.append('streak')
-
-    if not last_checkin_date or last_checkin_date < today:
-        if request.user.habits_today != 0:
-            request.user.habits_today = 0
-            fields_to_update.append('habits_today')
-
-    if fields_to_update:
-        request.user.save(update_fields=fields_to_update)
-
-    requires_survey = (not request.user.survey_answered) or request.user.survey_skipped
-    survey_prompt = "submit survey"
-
-    return JsonResponse({'status': 'success', 'data': {
-        "username": request.user.username,
-        "streak": request.user.streak,
-        "carbon_footprint": request.user.carbon_footprint,
-        "sustainability_score": request.user.sustainability_score,
-        "habits": request.user.habits,
-        "last_checkin_date": request.user.last_checkin,
-        "habits_today": request.user.habits_today,
-        "achievements": request.user.achievements,
-        "last_8_footprints": get_carbon_footprint_history(request.user),
-        "requires_survey": requires_survey,
-        "survey_prompt": survey_prompt,
-        "survey_skipped": request.user.survey_skipped,
-    }})
+
+    payload = get_cached_dashboard(request.user, today)
+    if payload is None:
+        requires_survey = (not request.user.survey_answered) or request.user.survey_skipped
+        survey_prompt = "submit survey"
+
+        payload = json.dumps({'status': 'success', 'data': {
+            "username": request.user.username,
+            "streak": request.user.current_streak(today),
+            "carbon_footprint": request.user.carbon_footprint,
+            "sustainability_score": request.user.sustainability_score,
+            "habits": request.user.habit_list(),
+            "last_checkin_date": request.user.last_checkin,
+            "habits_today": request.user.current_habits_today(today),
+            "achievements": request.user.achievements,
+            "last_8_footprints": get_carbon_footprint_history(request.user),
+            "requires_survey": requires_survey,
+            "survey_prompt": survey_prompt,
+            "survey_skipped": request.user.survey_skipped,
+        }}, cls=DjangoJSONEncoder)
+        set_cached_dashboard(request.user, today, payload)
+
+    response = HttpResponse(payload, content_type='application/json')
+    # Clients must revalidate, but may reuse their copy on a 304
+    response['Cache-Control'] = 'private, no-cache'
+    return response
+
+
+@login_required
+@require_GET
+@query_budget(1)
+def get_footprint_history(request):
+    """Footprint measurements in an optional ?start=YYYY-MM-DD&end=YYYY-MM-DD range (inclusive)."""
+    measurements = request.user.footprint_measurements.all()
+    try:
+        if request.GET.get('start'):
+            start = date.fromisoformat(request.GET['start'])
+            measurements = measurements.filter(
+                recorded_at__gte=timezone.make_aware(datetime.combine(start, time.min))
+            )
+        if request.GET.get('end'):
+            end = date.fromisoformat(request.GET['end'])
+            measurements = measurements.filter(
+                recorded_at__lt=timezone.make_aware(datetime.combine(end + timedelta(days=1), time.min))
+            )
+    except ValueError:
+        return JsonResponse({'status': 'error', 'message': 'Dates must be in YYYY-MM-DD format'}, status=400)
+
+    return JsonResponse({'status': 'success', 'data': [
+        {**_serialize_measurement(measurement), "breakdown": measurement.breakdown}
+        for measurement in measurements.order_by('recorded_at', 'id')
+    ]})
+
+
+def _habit_id(value):
+    """Parse a habit id from a request payload; returns None if it is not a valid id."""
+    try:
+        return int(value)
+    except (TypeError, ValueError):
+        return None
 
 
 @login_required
+@query_budget(4)
 def save_habit(request):
     data = json.loads(request.body)
-    habit_id = uuid4()
-    habit = {
-        "id": str(habit_id.int)[:5],
-        "text": data.get('habit_text')
-    }
-    request.user.habits.append(habit)
-    request.user.save()
-    return JsonResponse({'status': 'success', 'message': 'Habit saved successfully'})
+    habit_text = (data.get('habit_text') or '').strip()
+    if not habit_text:
+        return JsonResponse({'status': 'error', 'message': 'Habit text is required'}, status=400)
+
+    habit = Habit.objects.create(user=request.user, text=habit_text)
+    invalidate_daily_questions(request.user)
+    bump_dashboard_version(request.user)
+    return JsonResponse({'status': 'success', 'message': 'Habit saved successfully', 'id': str(habit.id)})
 
 
 @login_required
+@query_budget(4)
 def update_habit(request):
     data = json.loads(request.body)
-    habit_id_to_update = str(data.get('habit_id'))  # This is the 'id' within the habit dictionary
-    new_habit_text = data.get('habit_text')
-
-    # Find the habit by its 'id' in the list
-    found = False
-    for habit in request.user.habits:
-        if habit.get('id') == habit_id_to_update:
-            habit['text'] = new_habit_text
-            found = True
-            break  # Exit loop once the habit is found and updated
-
-    if found:
-        request.user.save()  # Save the user object to persist changes to the habits list
+    habit_id_to_update = _habit_id(data.get('habit_id'))
+    new_habit_text = (data.get('habit_text') or '').strip()
+    if not new_habit_text:
+        return JsonResponse({'status': 'error', 'message': 'Habit text is required'}, status=400)
+
+    # Single-row update, scoped to the requesting user's habits
+    updated = Habit.objects.filter(user=request.user, id=habit_id_to_update).update(text=new_habit_text)
+
+    if updated:
+        invalidate_daily_questions(request.user)
+        bump_dashboard_version(request.user)
         return JsonResponse({'status': 'success', 'message': 'Habit updated successfully'})
     else:
-        return JsonResponse({'status': 'error', 'message': 'Habit not found'}, status=500)
+        return JsonResponse({'status': 'error', 'message': 'Habit not found'}, status=404)
 
 
 @login_required
+@query_budget(7)
 def delete_habit(request):
     data = json.loads(request.body)
-    habit_id_to_delete = str(data.get('habit_id'))  # Ensure it's a string for comparison
-
-    # Create a new list excluding the habit to be deleted
-    # This is a common and safe way to remove items from a list while iterating
-    initial_habits_count = len(request.user.habits)
-    request.user.habits = [
-        habit for habit in request.user.habits
-        if habit.get('id') != habit_id_to_delete
-    ]
+    habit_id_to_delete = _habit_id(data.get('habit_id'))
+
+    deleted, _ = Habit.objects.filter(user=request.user, id=habit_id_to_delete).delete()
 
-    if len(request.user.habits) < initial_habits_count:
-        request.user.save()  # Save changes if a habit was actually removed
+    if deleted:
+        invalidate_daily_questions(request.user)
+        bump_dashboard_version(request.user)
         return JsonResponse({'status': 'success', 'message': 'Habit deleted successfully'})
     else:
         return JsonResponse({'status': 'error', 'message': 'Habit not found'}, status=404)
@@ -463,6 +496,21 @@ def delete_habit(request):
 
 @login_required
 @require_http_methods(["POST"])
+@query_budget(4)
+def complete_habit(request):
+    """Mark a habit as done for the user's current day (repeat calls are no-ops)."""
+    data = json.loads(request.body)
+    habit = Habit.objects.filter(user=request.user, id=_habit_id(data.get('habit_id'))).first()
+    if habit is None:
+        return JsonResponse({'status': 'error', 'message': 'Habit not found'}, status=404)
+
+    _, created = HabitCompletion.objects.get_or_create(habit=habit, date=timezone.localdate())
+    return JsonResponse({'status': 'success', 'message': 'Habit completed', 'created': created})
+
+
+@login_required
+@require_http_methods(["POST"])
+@query_budget(0)
 def get_habit_category_suggestions(request):
     try:
         payload = json.loads(request.body or "{}")
@@ -486,108 +534,26 @@ def get_habit_category_suggestions(request):
 
 
 @login_required
+@query_budget(8)
 def get_questions(request):
     if request.method != "POST":
         return HttpResponseRedirect(reverse('index'))
 
-    sample_questions = [
-        {
-            "id": "q1",
-            "question": "How did you commute today?",
-            "options": [
-                {"text": "🚶 Walk/Cycle", "value": "Walk/Cycle"},
-                {"text": "🚌 Public Transport", "value": "Public Transport"},
-                {"text": "🚗 Car (single)", "value": "Car (single)"},
-                {"text": "👥 Car (carpool)", "value": "Car (carpool)"},
-            ],
-        },
-        {
-            "id": "q2",
-            "question": "Did you consume meat today?",
-            "options": [
-                {"text": "🥩 Yes", "value": "Yes"},
-                {"text": "🥬 No (or Plant-based)", "value": "No"},
-            ],
-        },
-        {
-            "id": "q3",
-            "question": "Did you unplug unused electronics?",
-            "options": [
-                {"text": "✅ Yes, all", "value": "Yes, all"},
-                {"text": "⚡ Some", "value": "Some"},
-                {"text": "❌ No", "value": "No"},
-            ],
-        },
-    ]
-
-    client = genai.Client()
-
-    prompt = f"""
-    Give me a few questions based on user's habits to access their habits which they created to reduce carbon footprint.
-     **Do not include any explanations, formatting, double quotes or backticks and make sure there is atleast one question related to each habit.
-      Only provide a raw RFC8259 compliant JSON array.
-     ** Here is an output example: {sample_questions}
-     ** Here is the list of user's habits: {request.user.habits}
-    """
-
-    response = client.models.generate_content(
-        model="gemini-2.5-flash",
-        contents=prompt,
-    )
-
-    raw_text = response.text.strip()
-    suggestions = None
-    if raw_text:
-        try:
-            suggestions = json.loads(raw_text)
-        except json.JSONDecodeError:
-            start = raw_text.find("[")
-            end = raw_text.rfind("]")
-            if start != -1 and end != -1 and end > start:
-                try:
-                    suggestions = json.loads(raw_text[start : end + 1])
-                except json.JSONDecodeError:
-                    suggestions = None
-
-    if suggestions is None:
-        return JsonResponse(
-            {
-                'status': 'error',
-                'message': 'Gemini returned malformed data. Please try again.',
-            },
-            status=502,
-        )
+    # Served from today's stored set; Gemini is only called on a miss
+    questions = get_daily_questions(request.user)
 
-    return JsonResponse({'status': 'success', 'data': suggestions})
+    return JsonResponse({'status': 'success', 'data': public_questions(questions)})
 
 @login_required
+@query_budget(3)
 def submit_questionnaire(request):
     if request.method != "POST":
         return HttpResponseRedirect(reverse('index'))
 
     data = json.loads(request.body)
-    client = genai.Client()
-
-    sample_output = {
-        "score": 5
-    }
 
-    prompt = f"""
-    Given data of survey conducted on a user's habits to access their habits which they created to reduce carbon footprint.
-    Give each response to question a score of 1 if the response helps their goal(reduce carbon footprint) and 0 if it does not.
-    Return the total score of the survey in JSON format
-     **Do not include any explanations, formatting, or backticks and make sure there is atleast one question related to each habit.
-      Only provide a raw RFC8259 compliant JSON array.
-      ** Here is the data: {data}
-     ** Here is an output example: {sample_output}
-    """
-
-    response = client.models.generate_content(
-        model="gemini-2.5-flash",
-        contents=prompt,
-    )
-
-    score = int(json.loads(response.text)['score'])
+    # Scored locally against today's question set; Gemini only sees free-form answers
+    score = score_answers(request.user, data)
 
     if score:
         request.user.sustainability_score += score
@@ -610,14 +576,23 @@ def submit_questionnaire(request):
     request.user.last_checkin = timezone.now()
     request.user.days_since_last_survey += 1
     request.user.habits_today = score
-    request.user.achievements += check_achievements(request.user)
-    request.user.achievements = list(set(request.user.achievements))
-    request.user.save()
+    request.user.achievements = merge_achievements(request.user.achievements, check_achievements(request.user))
+    # Never write the in-memory dashboard_version back: a concurrent bump would be lost
+    request.user.save(update_fields=[
+        'sustainability_score',
+        'streak',
+        'last_checkin',
+        'days_since_last_survey',
+        'habits_today',
+        'achievements',
+    ])
+    bump_dashboard_version(request.user)
 
     return JsonResponse({'status': 'success', 'message': 'Questionnaire submitted successfully'})
 
 
 @login_required
+@query_budget(1)
 def get_suggestions(request):
     sample_suggestions = [
         {
@@ -655,33 +630,33 @@ def get_suggestions(request):
         requested_category if requested_category in category_descriptions else "general"
     )
     category_focus = category_descriptions[category]
+    habits = request.user.habit_list()
 
-    api_key = getattr(settings, "GEMINI_API_KEY", None) or os.environ.get("GEMINI_API_KEY")
-    if not api_key:
-        return JsonResponse(
-            {
-                'status': 'error',
-                'message': 'Gemini API key not configured on the server.',
-            },
-            status=500,
-        )
-
-    client = genai.Client(api_key=api_key)
+    # Identical (category, habits) requests reuse the last Gemini response
+    cached_suggestions = get_cached_suggestions(category, habits)
+    if cached_suggestions is not None:
+        return JsonResponse({'status': 'success', 'data': cached_suggestions})
 
     prompt = f"""
     Give me a few suggestions of habits to perform to reduce carbon footprint.
      **Do not include any explanations, formatting, or backticks. Only provide a raw RFC8259 compliant JSON array.
      ** Here is an output example: {sample_suggestions}
      ** The suggestions must focus on {category_focus}.
-** Here are the user's existing habits: {request.user.habits}
+** Here are the user's existing habits: {habits}
     """
 
-    response = client.models.generate_content(
-        model="gemini-2.5-flash",
-        contents=prompt,
-    )
+    try:
+        suggestions = LLMService.generate_json(prompt)
+    except LLMUnavailable as e:
+        logger.warning(f"Serving sample suggestions, Gemini unavailable: {e}")
+        return JsonResponse({'status': 'success', 'data': sample_suggestions})
 
-    return JsonResponse({'status': 'success', 'data': json.loads(response.text)})
+    if not isinstance(suggestions, list):
+        return JsonResponse({'status': 'success', 'data': sample_suggestions})
+
+    set_cached_suggestions(category, habits, suggestions)
+
+    return JsonResponse({'status': 'success', 'data': suggestions})
 
 # Android Device and Push Notification Views
 import json
@@ -691,114 +666,54 @@ from .firebase_service import FCMService
 from datetime import datetime, time
 
 
+def _has_secret(request, expected):
+    """Simple bearer-like secret check: ?token=... or Authorization: Bearer ..."""
+    token = request.GET.get('token') or request.headers.get('Authorization', '').replace('Bearer ', '').strip()
+    return bool(expected) and token == expected
+
+
 # Cron-job.org dispatcher: call this every minute to send scheduled notifications
 @require_GET
 @csrf_exempt  # This is a server-to-server endpoint; we'll protect with a secret instead of CSRF
+@query_budget(3)
 def cron_dispatch(request):
-    """Send scheduled push notifications to Android devices"""
-    # Simple bearer-like secret check: /api/cron/dispatch?token=... or Authorization: Bearer ...
-    token = request.GET.get('token') or request.headers.get('Authorization', '').replace('Bearer ', '').strip()
-    expected = getattr(settings, 'CRON_SECRET', '')
-    if not expected or token != expected:
+    """Queue a dispatch of scheduled push notifications to Android devices"""
+    if not _has_secret(request, getattr(settings, 'CRON_SECRET', '')):
         return JsonResponse({'status': 'error', 'message': 'Unauthorized'}, status=401)
 
-    # Use Django timezone utilities so we honor settings.TIME_ZONE
-    now = timezone.localtime(timezone.now())
-    current_time = time(hour=now.hour, minute=now.minute)
-    today = now.date()
-
-    # Pick Android devices scheduled for this minute, active, and not already sent for this exact minute today
-    qs = AndroidDevice.objects.filter(
-        is_active=True,
-        daily_reminders_enabled=True,
-        notification_time__hour=current_time.hour,
-        notification_time__minute=current_time.minute,
-    ).exclude(
-        last_sent_date=today,
-        last_sent_time=current_time,
-    ).select_related('user')
-
-    total = qs.count()
-    sent = 0
-    failed = 0
-    failed_ids = []
-
-    # Collect valid FCM tokens
-    tokens = []
-    devices_by_token = {}
-    for device in qs:
-        if device.has_valid_fcm_token():
-            token = device.get_fcm_token()
-            tokens.append(token)
-            devices_by_token[token] = device
-        else:
-            failed += 1
-            failed_ids.append(device.id)
-            
-            
-    client = genai.Client()
+    # Use Django timezone utilities so the reported time honors settings.TIME_ZONE
+    now = timezone.now()
+    local_now = timezone.localtime(now)
+    current_time = time(hour=local_now.hour, minute=local_now.minute)
+    today = local_now.date()
 
-    prompt = f"""
-                Generate 1 single short, catchy, and engaging notification message strictly to encourage users to fill out the EcoTrack check-in form.
-                EcoTrack is an app that helps users track their sustainability habits and promotes eco-friendly behavior. It includes features like:
-                - Daily surveys to track eco actions 🌱
-                - Personalized sustainability score 📊
-                - AI chatbot to guide users 🤖
-                - Personalized suggestions for greener living 💡
-                - Achievements for completing surveys and taking eco-friendly actions 🎁
-                - Daily streaks kept alive by submitting check-in everyday
-                 Ensure the notifications are:
-                - under 60 characters
-                - Friendly, heartwarming, motivating, and aligned with EcoTrack's eco-conscious mission
-                - Include clear call-to-actions like "Share your thoughts", "fill now", "complete now"
-                - Include relevant emojis for engagement
-                - Highlight rewards or benefits if possible
-                Give the message a human touch, with some warmth, inviting gesture and showing that you care for the user.
-            """
-
-    if tokens:
-        try:
-            response = client.models.generate_content(
-            model="gemini-2.5-flash",
-            contents=prompt,
-        ).text
-        except:
-            response = f"Hey user!, time to track your footprints 🌱"
-
-        title = 'EcoTrack Reminder'
-        body = response
-        
-        # Send per token to avoid environments where FCM batch (/batch) is blocked or returns 404
-        for t in tokens:
-            ok = FCMService.send_notification(t, title, body, data={'type': 'daily_reminder'})
-            device = devices_by_token.get(t)
-            if ok:
-                sent += 1
-                if device:
-                    # Use enhanced AndroidDevice methods for better tracking
-                    device.increment_notification_count()
-                    device.last_sent_date = today
-                    device.last_sent_time = current_time
-                    device.save(update_fields=['last_sent_date', 'last_sent_time'])
-            else:
-                failed += 1
-                if device:
-                    failed_ids.append(device.id)
+    # Only enqueue; the run_dispatch_worker command performs the actual sends so this
+    # request never waits on Gemini or FCM. Retries within a minute reuse the same job.
+    job, created = enqueue_dispatch(now)
 
     return JsonResponse({
-        'status': 'success',
+        'status': 'queued',
         'time': current_time.strftime('%H:%M'),
         'date': today.isoformat(),
-        'total_candidates': total,
-        'sent': sent,
-        'failed': failed,
-        'failed_ids': failed_ids,
-    })
+        'job_id': job.id,
+        'job_status': job.status,
+        'created': created,
+    }, status=202)
+
+
+@require_GET
+@csrf_exempt  # Scraped by Prometheus; protected with a secret like cron_dispatch
+def metrics_view(request):
+    """This process's request, database and external-call metrics in the Prometheus text format"""
+    if not _has_secret(request, getattr(settings, 'METRICS_SECRET', '')):
+        return JsonResponse({'status': 'error', 'message': 'Unauthorized'}, status=401)
+    return HttpResponse(render_prometheus(), content_type='text/plain; version=0.0.4; charset=utf-8')
 
 
 @login_required
 @csrf_protect
 @require_http_methods(["POST"])
+@query_budget(8)
 def register_android_device(request):
     """
     Register an Android device for push notifications using FCM.
@@ -971,6 +886,7 @@ def register_android_device(request):
 @login_required
 @csrf_protect
 @require_http_methods(["POST"])
+@query_budget(2)
 def unregister_android_device(request):
     """Unregister an Android device from push notifications"""
     try:
@@ -985,7 +901,7 @@ def unregister_android_device(request):
             message = 'Android device unregistered successfully'
         else:
             # Deactivate all user's devices
-            updated = AndroidDevice.objects.filter(user=request.user).update(is_active=False)
+            updated = AndroidDevice.objects.filter(user=request.user).update(is_active=False, next_fire_at=None)
             message = 'All Android devices unregistered successfully' if updated else 'No devices to unregister'
         
         return JsonResponse({
@@ -1014,6 +930,7 @@ def unregister_android_device(request):
 @login_required
 @csrf_protect
 @require_http_methods(["POST"])
+@query_budget(3)
 def update_notification_settings(request):
     """Update Android device notification settings"""
     try:
@@ -1087,9 +1004,16 @@ def update_notification_settings(request):
         }, status=500)
 
 
+def _mark_devices_seen(device_ids):
+    """Set last_seen on every device in `device_ids` with one UPDATE"""
+    if device_ids:
+        AndroidDevice.objects.filter(id__in=device_ids).update(last_seen=timezone.now())
+
+
 @login_required
 @csrf_protect
 @require_http_methods(["POST"])
+@query_budget(2)
 def test_notification(request):
     """Send a test push notification to Android device using FCM"""
     try:
@@ -1112,6 +1036,7 @@ def test_notification(request):
 
         success_count = 0
         failed_count = 0
+        seen_device_ids = []
         
         for device in devices:
             token = device.get_fcm_token()
@@ -1134,9 +1059,11 @@ def test_notification(request):
             
             if success:
                 success_count += 1
-                device.update_last_seen()
+                seen_device_ids.append(device.id)
             else:
                 failed_count += 1
+
+        _mark_devices_seen(seen_device_ids)
         
         if success_count > 0:
             return JsonResponse({
@@ -1169,6 +1096,7 @@ def test_notification(request):
 
 
 @login_required
+@query_budget(1)
 def get_android_devices(request):
     """Get user's registered Android devices and notification settings"""
     try:
@@ -1229,6 +1157,7 @@ def get_android_devices(request):
 @login_required
 @csrf_protect 
 @require_http_methods(["POST"])
+@query_budget(2)
 def send_achievement_notification(request):
     """Send achievement notification to user's Android devices"""
     try:
@@ -1252,6 +1181,7 @@ def send_achievement_notification(request):
         
         success_count = 0
         failed_count = 0
+        seen_device_ids = []
         
         for device in devices:
             token = device.get_fcm_token()
@@ -1273,9 +1203,11 @@ def send_achievement_notification(request):
             
             if success:
                 success_count += 1
-                device.update_last_seen()
+                seen_device_ids.append(device.id)
             else:
                 failed_count += 1
+
+        _mark_devices_seen(seen_device_ids)
         
         return JsonResponse({
             'status': 'success',
@@ -1353,6 +1285,7 @@ def send_community_notification_to_members(community_id, title, message, sender_
 @login_required
 @csrf_protect
 @require_http_methods(["POST"])
+@query_budget(6)
 def create_community(request):
     """Create a new community"""
     try:
@@ -1374,20 +1307,21 @@ def create_community(request):
                 'message': 'A community with this name already exists'
             }, status=400)
             
-        # Create community
-        community = Community.objects.create(
-            name=name,
-            description=description,
-            creator=request.user,
-            is_private=is_private
-        )
-        
-        # Auto-join creator as a regular member (no special admin role)
-        CommunityMembership.objects.create(
-            community=community,
-            user=request.user,
-            role='member'
-        )
+        # Create community; member_count starts at 1 for the creator's membership
+        with transaction.atomic():
+            community = Community.objects.create(
+                name=name,
+                description=description,
+                creator=request.user,
+                is_private=is_private
+            )
+            
+            # Auto-join creator as a regular member (no special admin role)
+            CommunityMembership.objects.create(
+                community=community,
+                user=request.user,
+                role='member'
+            )
         
         return JsonResponse({
             'status': 'success',
@@ -1411,6 +1345,7 @@ def create_community(request):
 @login_required
 @csrf_protect
 @require_http_methods(["POST"])
+@query_budget(8)
 def join_community(request):
     """Join a community by join code or community ID"""
     try:
@@ -1442,27 +1377,14 @@ def join_community(request):
                 'message': 'Join code or community ID is required'
             }, status=400)
             
-        # Check if user is already a member
-        if CommunityMembership.objects.filter(community=community, user=request.user, is_active=True).exists():
+        # Join community (member_count is incremented in the same transaction)
+        membership, joined = add_member(community, request.user)
+        if not joined:
             return JsonResponse({
                 'status': 'error',
                 'message': 'You are already a member of this community'
             }, status=400)
-            
-        # Join community
-        membership, created = CommunityMembership.objects.get_or_create(
-            community=community,
-            user=request.user,
-            defaults={'is_active': True}
-        )
-        
-        if not created:
-            membership.is_active = True
-            membership.save()
-            
-        # Update member count
-        community.member_count = community.memberships.filter(is_active=True).count()
-        community.save()
+        community.refresh_from_db(fields=['member_count'])
         
         return JsonResponse({
             'status': 'success',
@@ -1484,6 +1406,7 @@ def join_community(request):
 
 @login_required
 @require_http_methods(["GET"])
+@query_budget(1)
 def get_user_communities(request):
     """Get all communities the user is a member of"""
     try:
@@ -1502,7 +1425,7 @@ def get_user_communities(request):
                 'member_count': community.member_count,
                 'role': membership.role,
                 'joined_at': membership.joined_at.isoformat(),
-                'is_creator': community.creator == request.user,
+                'is_creator': community.creator_id == request.user.id,
                 'join_code': community.join_code,  # Include join code for members
                 'is_private': community.is_private
             })
@@ -1519,38 +1442,65 @@ def get_user_communities(request):
         }, status=500)
 
 
+def _serialize_public_community(community):
+    return {
+        'id': community.id,
+        'name': community.name,
+        'description': community.description,
+        'member_count': community.member_count,
+        'created_at': community.created_at.isoformat()
+    }
+
+
 @login_required
 @require_http_methods(["GET"])
+@query_budget(1)
 def get_public_communities(request):
-    """Get public communities that user can join"""
+    """Get the most active public communities that user can join"""
     try:
-        # Get communities user is not already a member of
-        user_community_ids = CommunityMembership.objects.filter(
-            user=request.user, 
-            is_active=True
-        ).values_list('community_id', flat=True)
-        
-        communities = Community.objects.filter(
-            is_private=False
-        ).exclude(
-            id__in=user_community_ids
-        ).annotate(
-            actual_member_count=Count('memberships', filter=Q(memberships__is_active=True))
-        )[:20]  # Limit to 20 communities
+        communities, _ = public_communities_page(request.user)
+        return JsonResponse({
+            'status': 'success',
+            'data': [_serialize_public_community(community) for community in communities]
+        })
         
-        result = []
-        for community in communities:
-            result.append({
-                'id': community.id,
-                'name': community.name,
-                'description': community.description,
-                'member_count': community.actual_member_count,
-                'created_at': community.created_at.isoformat()
-            })
-            
+    except Exception as e:
+        return JsonResponse({
+            'status': 'error',
+            'message': str(e)
+        }, status=500)
+
+
+@login_required
+@require_http_methods(["GET"])
+@query_budget(1)
+def discover_communities(request):
+    """
+    Page through the public communities the user can join, most active first.
+    ?q= searches names and descriptions (word prefixes), ?cursor= is the
+    next_cursor of the previous page and ?limit= sets the page size.
+    """
+    try:
+        try:
+            limit = int(request.GET['limit']) if request.GET.get('limit') else None
+            communities, next_cursor = public_communities_page(
+                request.user,
+                query=request.GET.get('q', '').strip(),
+                cursor=request.GET.get('cursor') or None,
+                limit=limit,
+            )
+        except ValueError:
+            return JsonResponse({
+                'status': 'error',
+                'message': 'Invalid cursor or limit'
+            }, status=400)
+
         return JsonResponse({
             'status': 'success',
-            'data': result
+            'data': {
+                'communities': [_serialize_public_community(community) for community in communities],
+                'next_cursor': next_cursor,
+            }
         })
         
     except Exception as e:
@@ -1563,6 +1513,7 @@ def get_public_communities(request):
 @login_required
 @csrf_protect
 @require_http_methods(["POST"])
+@query_budget(3)
 def send_message(request):
     """Send a message to a community"""
     try:
@@ -1581,7 +1532,7 @@ def send_message(request):
             
         # Verify user is a member of the community
         try:
-            membership = CommunityMembership.objects.get(
+            membership = CommunityMembership.objects.select_related('community').get(
                 community_id=community_id,
                 user=request.user,
                 is_active=True
@@ -1600,10 +1551,11 @@ def send_message(request):
             message_type=message_type,
             metadata=metadata
         )
+        publish_message(message)
         
         # Send push notifications to community members
         try:
-            community = Community.objects.get(id=community_id)
+            community = membership.community
             notification_title = f"New message in {community.name}"
             notification_body = f"{request.user.username}: {content[:50]}{'...' if len(content) > 50 else ''}"
             
@@ -1640,54 +1592,87 @@ def send_message(request):
         }, status=500)
 
 
+# Messages per get_community_messages response (?limit= may ask for up to MAX_MESSAGE_PAGE_SIZE)
+MESSAGE_PAGE_SIZE = 50
+MAX_MESSAGE_PAGE_SIZE = 100
+
+
+def _messages_beside(messages, community_id, message_id, newer):
+    """
+    Narrow `messages` to those after (newer=True) or before the cursor message in
+    (created_at, id) order. The redundant created_at bound lets the
+    (community, created_at, id) index serve the range scan.
+    """
+    created_at = CommunityMessage.objects.filter(
+        community_id=community_id, id=message_id
+    ).values_list('created_at', flat=True).first()
+    if created_at is None:
+        # The cursor message is gone; ids follow creation order
+        return messages.filter(id__gt=message_id) if newer else messages.filter(id__lt=message_id)
+    if newer:
+        return messages.filter(Q(created_at__gt=created_at) | Q(id__gt=message_id), created_at__gte=created_at)
+    return messages.filter(Q(created_at__lt=created_at) | Q(id__lt=message_id), created_at__lte=created_at)
+
+
 @login_required
 @require_http_methods(["GET"])
+@query_budget(3)
 def get_community_messages(request, community_id):
-    """Get messages from a community"""
+    """
+    Get a page of a community's messages, newest first.
+
+    Without a cursor this is the latest page. ?before_id=<id> pages back through
+    older messages and ?after_id=<id> returns only the messages sent after the
+    client's newest one (empty when nothing changed). has_more says whether
+    another page exists in the same direction.
+    """
     try:
         # Verify user is a member of the community
-        try:
-            CommunityMembership.objects.get(
-                community_id=community_id,
-                user=request.user,
-                is_active=True
-            )
-        except CommunityMembership.DoesNotExist:
+        if not CommunityMembership.objects.filter(
+            community_id=community_id,
+            user=request.user,
+            is_active=True
+        ).exists():
             return JsonResponse({
                 'status': 'error',
                 'message': 'You are not a member of this community'
             }, status=403)
-            
-        # Get messages with pagination
-        page = int(request.GET.get('page', 1))
-        messages = CommunityMessage.objects.filter(
-            community_id=community_id
-        ).select_related('sender').order_by('-created_at')
-        
-        paginator = Paginator(messages, 50)  # 50 messages per page
-        page_obj = paginator.get_page(page)
-        
-        result = []
-        for message in page_obj:
-            result.append({
-                'id': message.id,
-                'content': message.content,
-                'message_type': message.message_type,
-                'metadata': message.metadata,
-                'sender': message.sender.username,
-                'sender_id': message.sender.id,
-                'created_at': message.created_at.isoformat(),
-                'is_pinned': message.is_pinned
-            })
-            
+
+        try:
+            before_id = int(request.GET['before_id']) if request.GET.get('before_id') else None
+            after_id = int(request.GET['after_id']) if request.GET.get('after_id') else None
+            limit = min(max(int(request.GET.get('limit', MESSAGE_PAGE_SIZE)), 1), MAX_MESSAGE_PAGE_SIZE)
+        except ValueError:
+            return JsonResponse({
+                'status': 'error',
+                'message': 'before_id, after_id and limit must be integers'
+            }, status=400)
+        if before_id is not None and after_id is not None:
+            return JsonResponse({
+                'status': 'error',
+                'message': 'Pass either before_id or after_id, not both'
+            }, status=400)
+
+        messages = CommunityMessage.objects.filter(community_id=community_id).select_related('sender')
+        if after_id is not None:
+            messages = _messages_beside(messages, community_id, after_id, newer=True)
+            page = list(messages.order_by('created_at', 'id')[:limit + 1])
+            has_more = len(page) > limit
+            page = page[:limit][::-1]
+        else:
+            if before_id is not None:
+                messages = _messages_beside(messages, community_id, before_id, newer=False)
+            page = list(messages.order_by('-created_at', '-id')[:limit + 1])
+            has_more = len(page) > limit
+            page = page[:limit]
+
         return JsonResponse({
             'status': 'success',
             'data': {
-                'messages': result,
-                'has_next': page_obj.has_next(),
-                'has_previous': page_obj.has_previous(),
-                'current_page': page,
-                'total_pages': paginator.num_pages
+                'messages': [serialize_message(message) for message in page],
+                'has_more': has_more,
+                'newest_id': page[0].id if page else None,
+                'oldest_id': page[-1].id if page else None,
             }
         })
         
@@ -1698,9 +1683,105 @@ def get_community_messages(request, community_id):
         }, status=500)
 
 
+@login_required
+@require_http_methods(["GET"])
+@query_budget(3)
+def search_community_messages(request, community_id):
+    """
+    Search a community's messages. ?q= matches every term as a word prefix,
+    ?order= is relevance (default) or recent, ?cursor= is the next_cursor of
+    the previous page and ?limit= sets the page size.
+    """
+    try:
+        if not CommunityMembership.objects.filter(
+            community_id=community_id,
+            user=request.user,
+            is_active=True
+        ).exists():
+            return JsonResponse({
+                'status': 'error',
+                'message': 'You are not a member of this community'
+            }, status=403)
+
+        query = request.GET.get('q', '').strip()
+        if not query:
+            return JsonResponse({
+                'status': 'error',
+                'message': 'A search query is required'
+            }, status=400)
+
+        try:
+            limit = int(request.GET['limit']) if request.GET.get('limit') else None
+            results, next_cursor = search_messages(
+                community_id,
+                query,
+                order=request.GET.get('order', 'relevance'),
+                cursor=request.GET.get('cursor') or None,
+                limit=limit,
+            )
+        except ValueError:
+            return JsonResponse({
+                'status': 'error',
+                'message': 'Invalid order, cursor or limit'
+            }, status=400)
+
+        return JsonResponse({
+            'status': 'success',
+            'data': {
+                'messages': [serialize_message(message) for message, _ in results],
+                'next_cursor': next_cursor,
+            }
+        })
+
+    except Exception as e:
+        return JsonResponse({
+            'status': 'error',
+            'message': str(e)
+        }, status=500)
+
+
+@login_required
+@require_GET
+async def community_message_stream(request, community_id):
+    """Stream new messages of a community as server-sent events (needs an ASGI server)"""
+    if not isinstance(request, ASGIRequest):
+        # Under WSGI the stream would pin a worker thread; the client falls back to polling
+        return JsonResponse({
+            'status': 'error',
+            'message': 'Message streaming requires the ASGI server'
+        }, status=501)
+
+    user = await request.auser()
+    if not await CommunityMembership.objects.filter(
+        community_id=community_id,
+        user=user,
+        is_active=True
+    ).aexists():
+        return JsonResponse({
+            'status': 'error',
+            'message': 'You are not a member of this community'
+        }, status=403)
+
+    # EventSource sends Last-Event-ID when it reconnects; the first connection passes after_id
+    last_id = request.headers.get('Last-Event-ID') or request.GET.get('after_id')
+    try:
+        last_id = int(last_id) if last_id else None
+    except ValueError:
+        return JsonResponse({
+            'status': 'error',
+            'message': 'after_id must be a message id'
+        }, status=400)
+
+    response = StreamingHttpResponse(message_events(community_id, last_id), content_type='text/event-stream')
+    response['Cache-Control'] = 'no-cache'
+    response['X-Accel-Buffering'] = 'no'  # Stop nginx from buffering the stream
+    return response
+
+
 @login_required
 @csrf_protect
 @require_http_methods(["POST"])
+@query_budget(4)
 def leave_community(request):
     """Leave a community"""
     try:
@@ -1715,7 +1796,7 @@ def leave_community(request):
             }, status=400)
             
         try:
-            membership = CommunityMembership.objects.get(
+            membership = CommunityMembership.objects.select_related('community').get(
                 community_id=community_id,
                 user=request.user,
                 is_active=True
@@ -1728,13 +1809,8 @@ def leave_community(request):
             
         community = membership.community
         
-        # Leave community
-        membership.is_active = False
-        membership.save()
-        
-        # Update member count
-        community.member_count = community.memberships.filter(is_active=True).count()
-        community.save()
+        # Leave community (member_count is decremented in the same transaction)
+        remove_member(membership)
         
         return JsonResponse({
             'status': 'success',